@@ -1,11 +1,17 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 import ast
-from matplotlib.patches import Arc
 import math
 import pickle
+import argparse
+from edge_render import draw_graph_edges
+from render_pool import render_all, add_render_arguments, render_params
 
-def plot_graph_from_multiplication_table(M, table_index):
+# Drawing settings, part of the cache key of every image
+STYLE = {'node_size': 300, 'linewidths': 1.0, 'font_size': 8, 'dpi': 150,
+         'edges': {'arrowsize': 8, 'pair_rads': (0.2, -0.2), 'loop_radius': 0.15, 'loop_theta2': 300}}
+
+def build_graph(M):
     n = len(M)  # Number of nodes, should be 16 after modification
     edges = set()  # Use a set to avoid duplicate edges
 
@@ -15,19 +21,24 @@ def plot_graph_from_multiplication_table(M, table_index):
             k = M[i][j]  # Compute i * j
             edges.add((i, k))
             edges.add((k, j))
-    #print(f"Edges for graph {table_index}: {edges}")
 
     # Create a DiGraph since we don't need multiple edges between nodes
     G = nx.DiGraph()
     G.add_nodes_from(range(n))
     G.add_edges_from(edges)
+    return G
 
+def save_graph(G, table_index):
     # Save the graph to a file using pickle
     graph_filename = f'graph_{table_index}.pkl'
     with open(graph_filename, 'wb') as f:
         pickle.dump(G, f)
     print(f"Graph {table_index} data saved as '{graph_filename}'.")
 
+def plot_graph_from_multiplication_table(G, table_index, image_filename):
+    # Only draws the image: it is skipped when the image is up to date or cached
+    n = G.number_of_nodes()
+
     # Define fixed positions for nodes arranged in a circle
     pos = {}
     for i in range(n):
@@ -37,82 +48,12 @@ def plot_graph_from_multiplication_table(M, table_index):
         pos[i] = (x, y)
 
     # Draw nodes with labels
-    nx.draw_networkx_nodes(G, pos, node_size=300, node_color='skyblue',
-                           edgecolors='black', linewidths=1.0)
-    nx.draw_networkx_labels(G, pos, font_size=8, font_weight='bold')
-
-    ax = plt.gca()
-
-    # Prepare a set to keep track of drawn edges
-    drawn_edges = set()
-
-    # Iterate over all edges to draw them
-    for u, v in G.edges():
-        # Avoid drawing the same edge multiple times
-        if (u, v) in drawn_edges:
-            continue
-
-        # First, handle self-loops
-        if u == v:
-            # Draw self-loop using Arc
-            x, y = pos[u]
-            radius = 0.15  # Adjust the radius of the self-loop
-            theta1 = 0
-            theta2 = 300  # Partial loop for better visibility
-            # Create an Arc object
-            arc = Arc((x, y), radius * 2, radius * 2, angle=0,
-                      theta1=theta1, theta2=theta2,
-                      color='green', lw=1)
-            ax.add_patch(arc)
-
-            # Optionally, add an arrowhead manually
-            # Calculate the position for the arrowhead
-            arrow_angle = 45  # degrees
-            arrow_x = x + radius * math.cos(math.radians(arrow_angle))
-            arrow_y = y + radius * math.sin(math.radians(arrow_angle))
-            ax.annotate("",
-                        xy=(arrow_x, arrow_y),
-                        xytext=(x, y),
-                        arrowprops=dict(arrowstyle="->", color='black', lw=1))
-            # Mark edge as drawn
-            drawn_edges.add((u, v))
-
-        # Then, check for bidirectional edges
-        elif G.has_edge(v, u) and (v, u) not in drawn_edges:
-            # Bidirectional edge
-            # Draw edge from u to v
-            nx.draw_networkx_edges(G, pos,
-                                   edgelist=[(u, v)],
-                                   arrowstyle='-|>',
-                                   arrowsize=8,
-                                   edge_color='red',
-                                   connectionstyle="arc3,rad=0.2",
-                                   min_source_margin=15,
-                                   min_target_margin=15)
-            # Draw edge from v to u
-            nx.draw_networkx_edges(G, pos,
-                                   edgelist=[(v, u)],
-                                   arrowstyle='-|>',
-                                   arrowsize=8,
-                                   edge_color='red',
-                                   connectionstyle="arc3,rad=-0.2",
-                                   min_source_margin=15,
-                                   min_target_margin=15)
-            # Mark both edges as drawn
-            drawn_edges.add((u, v))
-            drawn_edges.add((v, u))
-        else:
-            # Unidirectional edge
-            nx.draw_networkx_edges(G, pos,
-                                   edgelist=[(u, v)],
-                                   arrowstyle='-|>',
-                                   arrowsize=8,
-                                   edge_color='black',
-                                   connectionstyle="arc3,rad=0.0",
-                                   min_source_margin=15,
-                                   min_target_margin=15)
-            # Mark edge as drawn
-            drawn_edges.add((u, v))
+    nx.draw_networkx_nodes(G, pos, node_size=STYLE['node_size'], node_color='skyblue',
+                           edgecolors='black', linewidths=STYLE['linewidths'])
+    nx.draw_networkx_labels(G, pos, font_size=STYLE['font_size'], font_weight='bold')
+
+    # Self-loops, bidirectional pairs and single edges, one collection each
+    draw_graph_edges(plt.gca(), G, pos, node_size=STYLE['node_size'], **STYLE['edges'])
 
     # Remove axes for clarity
     plt.axis('off')
@@ -121,9 +62,8 @@ def plot_graph_from_multiplication_table(M, table_index):
     plt.tight_layout()
 
     # Save the graph image to a file
-    image_filename = f'graph_{table_index}_16x16_circular.png'
     plt.savefig(image_filename, format='png',
-                bbox_inches='tight', pad_inches=0.1, dpi=150)
+                bbox_inches='tight', pad_inches=0.1, dpi=STYLE['dpi'])
     plt.close()
     print(f"Graph {table_index} plotted and saved as '{image_filename}'.")
 
@@ -150,6 +90,10 @@ def read_multiplication_tables_from_file(filename):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Plot the graph of every 16x16 multiplication table on a circle.")
+    add_render_arguments(parser)
+    args = parser.parse_args()
+
     # File containing multiplication tables (one per row in list format)
     filename = 'magma_16.txt'
 
@@ -160,9 +104,16 @@ def main():
         print("No valid 16x16 multiplication tables found. Exiting.")
         return
 
-    # Plot each multiplication table and save graphs to files
+    # Save the graph of every table, then plot it (one rendering task per table)
+    tasks = []
     for index, M in enumerate(multiplication_tables, 1):
-        plot_graph_from_multiplication_table(M, index)
+        G = build_graph(M)
+        save_graph(G, index)
+        image_filename = f'graph_{index}_16x16_circular.png'
+        tasks.append((image_filename, plot_graph_from_multiplication_table, (G, index, image_filename),
+                      render_params(M, 'circle', STYLE)))
+    rendered, skipped = render_all(tasks, jobs=args.jobs, resume=not args.force, cache_dir=args.cache_dir)
+    print(f"{rendered} graphs plotted, {skipped} up to date.")
 
 
 if __name__ == '__main__':
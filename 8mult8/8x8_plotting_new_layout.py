@@ -1,10 +1,9 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 import ast
-from matplotlib.patches import Arc
-import math
 import pickle
 import numpy as np  # Import numpy for linspace
+from edge_render import draw_graph_edges
 
 def plot_graph_from_multiplication_table(M, table_index):
     n = len(M)  # Number of nodes, should be 8 after modification
@@ -61,78 +60,8 @@ def plot_graph_from_multiplication_table(M, table_index):
                            edgecolors='black', linewidths=1.5)
     nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
 
-    ax = plt.gca()
-
-    # Prepare a set to keep track of drawn edges
-    drawn_edges = set()
-
-    # Iterate over all edges to draw them
-    for u, v in G.edges():
-        # Avoid drawing the same edge multiple times
-        if (u, v) in drawn_edges:
-            continue
-
-        # First, handle self-loops
-        if u == v:
-            # Draw self-loop using Arc
-            x, y = pos[u]
-            radius = 0.1  # Adjust the radius of the self-loop
-            theta1 = 0
-            theta2 = 360  # Full circle
-            # Create an Arc object
-            arc = Arc((x, y), radius * 2, radius * 2, angle=0,
-                      theta1=theta1, theta2=theta2,
-                      color='green', lw=1)
-            ax.add_patch(arc)
-
-            # Optionally, add an arrowhead manually
-            # Calculate the position for the arrowhead
-            arrow_angle = 45  # degrees
-            arrow_x = x + radius * math.cos(math.radians(arrow_angle))
-            arrow_y = y + radius * math.sin(math.radians(arrow_angle))
-            ax.annotate("",
-                        xy=(arrow_x, arrow_y),
-                        xytext=(x, y),
-                        arrowprops=dict(arrowstyle="->", color='black', lw=1))
-            # Mark edge as drawn
-            drawn_edges.add((u, v))
-
-        # Then, check for bidirectional edges
-        elif G.has_edge(v, u) and (v, u) not in drawn_edges:
-            # Bidirectional edge
-            # Edge from u to v
-            nx.draw_networkx_edges(G, pos,
-                                   edgelist=[(u, v)],
-                                   arrowstyle='-|>',
-                                   arrowsize=10,
-                                   edge_color='red',
-                                   connectionstyle="arc3,rad=-0.1",
-                                   min_source_margin=15,
-                                   min_target_margin=15)
-            # Edge from v to u
-            nx.draw_networkx_edges(G, pos,
-                                   edgelist=[(v, u)],
-                                   arrowstyle='-|>',
-                                   arrowsize=10,
-                                   edge_color='red',
-                                   connectionstyle="arc3,rad=0.1",
-                                   min_source_margin=15,
-                                   min_target_margin=15)
-            # Mark both edges as drawn
-            drawn_edges.add((u, v))
-            drawn_edges.add((v, u))
-        else:
-            # Unidirectional edge
-            nx.draw_networkx_edges(G, pos,
-                                   edgelist=[(u, v)],
-                                   arrowstyle='-|>',
-                                   arrowsize=10,
-                                   edge_color='black',
-                                   connectionstyle="arc3,rad=0.05",
-                                   min_source_margin=15,
-                                   min_target_margin=15)
-            # Mark edge as drawn
-            drawn_edges.add((u, v))
+    # Self-loops, bidirectional pairs and single edges, one collection each
+    draw_graph_edges(plt.gca(), G, pos, rad=0.05, pair_rads=(-0.1, 0.1))
 
     # Remove axes for clarity
     plt.axis('off')
@@ -1,14 +1,20 @@
 import networkx as nx
-import matplotlib.pyplot as plt
 import ast
-from matplotlib.patches import Arc
 import math
 import pickle
 import numpy as np
 import itertools
 import random  # Import random for random sampling
+import argparse
+from layout_figure import LayoutFigure, reuse_figure
+from layout_orbits import distinct_layouts, identity_group, write_layout_classes
+from layout_scores import layout_array, score_layouts, rank_layouts, write_layout_scores
+from render_pool import render_all, add_render_arguments, use_agg, render_params, layout_points
 
-def plot_graph_from_multiplication_table(M, table_index, num_permutations=100):
+# LayoutFigure settings, part of the cache key of every image
+STYLE = {'figsize': (8, 6), 'node_size': 500, 'rad': 0.05, 'pair_rads': (-0.1, 0.1)}
+
+def build_graph(M):
     n = len(M)  # Number of nodes, should be 8 after modification
     edges = set()  # Use a set to avoid duplicate edges
 
@@ -24,22 +30,34 @@ def plot_graph_from_multiplication_table(M, table_index, num_permutations=100):
     G.add_nodes_from(range(n))
     G.add_edges_from(edges)
 
-    # Save the graph to a file using pickle
-    graph_filename = f'graph_{table_index}_reordered_nodes.pkl'
-    with open(graph_filename, 'wb') as f:
-        pickle.dump(G, f)
-    print(f"Graph {table_index} data saved as '{graph_filename}'.")
+    return G
+
+def render_permutation(M, pos, table_index, perm_index, image_filename):
+    # Reuse the figure of the previous permutation of this table and only move the nodes
+    figure = reuse_figure(str(M), lambda: LayoutFigure(build_graph(M), pos, **STYLE))
+    figure.set_positions(pos)
+
+    # Save the graph image to a file
+    figure.save(image_filename)
+    print(f"Graph {table_index} permutation {perm_index} plotted and saved as '{image_filename}'.")
 
+def four_layer_layouts(G, table_index, num_permutations=100, max_samples=None):
+    """
+    Yields (permuted_nodes, pos) for permutations of the nodes of G, placed two per level on
+    four levels: every permutation when there are at most num_permutations of them, random
+    samples otherwise (at most max_samples, default 20 * num_permutations).
+    """
     # Generate permutations of all 8 nodes
     all_nodes = list(G.nodes())
     total_permutations = math.factorial(len(all_nodes))
     if total_permutations <= num_permutations:
-        permutations = list(itertools.permutations(all_nodes))
+        permutations = itertools.permutations(all_nodes)
     else:
-        # Randomly sample permutations
-        permutations = [random.sample(all_nodes, len(all_nodes)) for _ in range(num_permutations)]
+        # Randomly sample permutations, seeded by the table so reruns produce the same layouts
+        rng = random.Random(table_index)
+        permutations = (rng.sample(all_nodes, len(all_nodes)) for _ in range(max_samples or 20 * num_permutations))
 
-    for perm_index, permuted_nodes in enumerate(permutations, 1):
+    for permuted_nodes in permutations:
         pos = {}
 
         # Assign positions based on the permutation
@@ -52,105 +70,99 @@ def plot_graph_from_multiplication_table(M, table_index, num_permutations=100):
                 pos[node] = (x_coords[x_idx], y)
             idx += 2  # Move to the next pair
 
-        # Draw nodes with labels
-        plt.figure(figsize=(8, 6))  # Create a new figure for each permutation
-        nx.draw_networkx_nodes(G, pos, node_size=500, node_color='skyblue',
-                               edgecolors='black', linewidths=1.5)
-        nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
-
-        ax = plt.gca()
-
-        # Prepare a set to keep track of drawn edges
-        drawn_edges = set()
-
-        # Iterate over all edges to draw them
-        for u, v in G.edges():
-            # Avoid drawing the same edge multiple times
-            if (u, v) in drawn_edges:
-                continue
-
-            # First, handle self-loops
-            if u == v:
-                # Draw self-loop using Arc
-                x, y = pos[u]
-                radius = 0.1  # Adjust the radius of the self-loop
-                theta1 = 0
-                theta2 = 360  # Full circle
-                # Create an Arc object
-                arc = Arc((x, y), radius * 2, radius * 2, angle=0,
-                          theta1=theta1, theta2=theta2,
-                          color='green', lw=1)
-                ax.add_patch(arc)
-
-                # Optionally, add an arrowhead manually
-                # Calculate the position for the arrowhead
-                arrow_angle = 45  # degrees
-                arrow_x = x + radius * math.cos(math.radians(arrow_angle))
-                arrow_y = y + radius * math.sin(math.radians(arrow_angle))
-                ax.annotate("",
-                            xy=(arrow_x, arrow_y),
-                            xytext=(x, y),
-                            arrowprops=dict(arrowstyle="->", color='black', lw=1))
-                # Mark edge as drawn
-                drawn_edges.add((u, v))
-
-            # Then, check for bidirectional edges
-            elif G.has_edge(v, u) and (v, u) not in drawn_edges:
-                # Bidirectional edge
-                # Edge from u to v
-                nx.draw_networkx_edges(G, pos,
-                                       edgelist=[(u, v)],
-                                       arrowstyle='-|>',
-                                       arrowsize=10,
-                                       edge_color='red',
-                                       connectionstyle="arc3,rad=-0.1",
-                                       min_source_margin=15,
-                                       min_target_margin=15)
-                # Edge from v to u
-                nx.draw_networkx_edges(G, pos,
-                                       edgelist=[(v, u)],
-                                       arrowstyle='-|>',
-                                       arrowsize=10,
-                                       edge_color='red',
-                                       connectionstyle="arc3,rad=0.1",
-                                       min_source_margin=15,
-                                       min_target_margin=15)
-                # Mark both edges as drawn
-                drawn_edges.add((u, v))
-                drawn_edges.add((v, u))
-            else:
-                # Unidirectional edge
-                nx.draw_networkx_edges(G, pos,
-                                       edgelist=[(u, v)],
-                                       arrowstyle='-|>',
-                                       arrowsize=10,
-                                       edge_color='black',
-                                       connectionstyle="arc3,rad=0.05",
-                                       min_source_margin=15,
-                                       min_target_margin=15)
-                # Mark edge as drawn
-                drawn_edges.add((u, v))
-
-        # Remove axes for clarity
-        plt.axis('off')
-
-        # Adjust plot margins
-        plt.tight_layout()
-
-        # Save the graph image to a file
-        image_filename = f'graph_{table_index}_perm_4layer_{perm_index}_8x8_reordered_nodes.png'
-        plt.savefig(image_filename, format='png',
-                    bbox_inches='tight', pad_inches=0.1, dpi=100)
-        plt.close()
-        print(f"Graph {table_index} permutation {perm_index} plotted and saved as '{image_filename}'.")
+        yield permuted_nodes, pos
 
-        # Optional: Limit the number of permutations
-        if perm_index >= num_permutations:
-            break
+def save_graph(G, table_index):
+    # Save the graph to a file using pickle
+    graph_filename = f'graph_{table_index}_reordered_nodes.pkl'
+    with open(graph_filename, 'wb') as f:
+        pickle.dump(G, f)
+    print(f"Graph {table_index} data saved as '{graph_filename}'.")
 
-    print(f"{perm_index} permutations plotted for graph {table_index}.")
+def select_layouts(G, table_index, num_permutations=100, candidates=0, all_layouts=False):
+    """
+    Picks the four-layer layouts to render.
+
+    Without candidates, these are the first num_permutations sampled layouts that differ up to an
+    automorphism of the graph. With candidates, that many distinct layouts are sampled and scored
+    by edge crossings, and the num_permutations best ones are kept, best first.
+
+    Returns:
+    - chosen: List of (perm_index, permuted_nodes, pos), perm_index counting every sample.
+    - classes: Dict mapping each chosen perm_index to the samples in its automorphism orbit.
+    - scores: Dict mapping each chosen perm_index to its rank and scores (empty without candidates).
+    """
+    classes = {}
+    group = identity_group(G) if all_layouts else None
+    pool_size = max(candidates, num_permutations)
+    layouts = distinct_layouts(G, four_layer_layouts(G, table_index, pool_size), classes, group)
+    chosen = list(itertools.islice(layouts, pool_size))
+
+    scores = {}
+    if candidates:
+        # Score every candidate at once and keep the top num_permutations
+        batch = score_layouts(G, layout_array(G, [pos for _, _, pos in chosen]))
+        order = rank_layouts(batch)[:num_permutations]
+        for rank, i in enumerate(order, 1):
+            scores[chosen[i][0]] = {'rank': rank, **{name: values[i] for name, values in batch.items()}}
+        chosen = [chosen[i] for i in order]
+    else:
+        chosen = chosen[:num_permutations]
+    return chosen, {perm_index: classes[perm_index] for perm_index, _, _ in chosen}, scores
+
+def plot_graph_from_multiplication_table(M, table_index, num_permutations=100, all_layouts=False, candidates=0):
+    """
+    Saves the graph of M and returns one rendering task per layout chosen by select_layouts.
+    """
+    G = build_graph(M)
+    save_graph(G, table_index)
+
+    chosen, classes, scores = select_layouts(G, table_index, num_permutations, candidates, all_layouts)
+    image_filenames = {}
+    tasks = []
+    for perm_index, permuted_nodes, pos in chosen:
+        image_filename = f'graph_{table_index}_perm_4layer_{perm_index}_8x8_reordered_nodes.png'
+        image_filenames[perm_index] = image_filename
+        tasks.append((image_filename, render_permutation, (M, pos, table_index, perm_index, image_filename),
+                      render_params(M, layout_points(pos), STYLE)))
+
+    # Record which samples every image stands for, and how the images rank
+    classes_filename = f'graph_{table_index}_perm_4layer_classes.csv'
+    write_layout_classes(classes, image_filenames, classes_filename)
+    print(f"Graph {table_index}: {len(classes)} of {sum(map(len, classes.values()))} sampled permutations rendered, classes saved as '{classes_filename}'.")
+    if scores:
+        write_layout_scores(scores, image_filenames, f'graph_{table_index}_perm_4layer_scores.csv')
+    return tasks
+
+def plot_permutations_pdf(M, table_index, num_permutations=100, all_layouts=False, candidates=0):
+    """
+    Saves the graph of M and writes the layouts chosen by select_layouts as pages of one PDF.
+    """
+    G = build_graph(M)
+    save_graph(G, table_index)
+
+    chosen, classes, scores = select_layouts(G, table_index, num_permutations, candidates, all_layouts)
+    figure = LayoutFigure(G, chosen[0][2], **STYLE)
+    pdf_filename = f'graph_{table_index}_perm_4layer_8x8_reordered_nodes.pdf'
+    pages = figure.save_pages([pos for _, _, pos in chosen], pdf_filename)
+    figure.close()
+    print(f"Graph {table_index}: {pages} permutations plotted and saved as '{pdf_filename}'.")
+
+    # Record which samples every page stands for, and how the pages rank
+    page_names = {perm_index: f'{pdf_filename}#page={page}' for page, (perm_index, _, _) in enumerate(chosen, 1)}
+    write_layout_classes(classes, page_names, f'graph_{table_index}_perm_4layer_classes.csv')
+    if scores:
+        write_layout_scores(scores, page_names, f'graph_{table_index}_perm_4layer_scores.csv')
 
 def main():
+    parser = argparse.ArgumentParser(description="Plot sampled four-layer node permutations of selected 8x8 multiplication tables.")
+    add_render_arguments(parser)
+    parser.add_argument("--pdf", action="store_true", help="Write the layouts of each table as pages of one PDF instead of PNG files.")
+    parser.add_argument("--all-layouts", action="store_true", help="Keep sampled permutations that are equal up to a graph automorphism.")
+    parser.add_argument("-k", "--top-k", type=int, default=100, help="Number of layouts to plot for each graph.")
+    parser.add_argument("--candidates", type=int, default=2000, help="Number of sampled layouts to score by edge crossings before keeping the top k (0 plots the first k samples).")
+    args = parser.parse_args()
+
     # File containing multiplication tables (one per row in list format)
     filename = 'magmas8x8(WIP).txt'
 
@@ -158,9 +170,10 @@ def main():
     desired_graph_indices = [1, 2, 6, 512, 513, 516, 518, 1536]
 
     # Number of permutations to plot for each graph
-    num_permutations = 100  # Adjust this number as needed
+    num_permutations = args.top_k
 
     # Read and process only the desired multiplication tables
+    selected_tables = []
     with open(filename, 'r') as file:
         for line_number, line in enumerate(file, 1):
             if line_number in desired_graph_indices:
@@ -171,7 +184,7 @@ def main():
                     if (isinstance(M, list) and all(isinstance(row, list) for row in M)):
                         n = len(M)
                         if n == 8 and all(len(row) == n for row in M):
-                            plot_graph_from_multiplication_table(M, line_number, num_permutations)
+                            selected_tables.append((M, line_number))
                         else:
                             print(f"Error on line {line_number}: The table must be 8x8.")
                     else:
@@ -179,5 +192,16 @@ def main():
                 except (SyntaxError, ValueError) as e:
                     print(f"Error on line {line_number}: {e}")
 
+    if args.pdf:
+        use_agg()
+        for M, line_number in selected_tables:
+            plot_permutations_pdf(M, line_number, num_permutations, args.all_layouts, args.candidates)
+        return
+
+    tasks = [task for M, line_number in selected_tables
+             for task in plot_graph_from_multiplication_table(M, line_number, num_permutations, args.all_layouts, args.candidates)]
+    rendered, skipped = render_all(tasks, jobs=args.jobs, resume=not args.force, cache_dir=args.cache_dir)
+    print(f"{rendered} permutations plotted, {skipped} up to date.")
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,13 +1,17 @@
 import networkx as nx
-import matplotlib.pyplot as plt
 import ast
-from matplotlib.patches import Arc
-import math
 import pickle
 import numpy as np
 import itertools  # Import itertools for permutations
+import argparse
+from layout_figure import LayoutFigure, reuse_figure
+from layout_orbits import distinct_layouts, identity_group, write_layout_classes
+from render_pool import render_all, add_render_arguments, use_agg, render_params, layout_points
 
-def plot_graph_from_multiplication_table(M, table_index):
+# LayoutFigure settings, part of the cache key of every image
+STYLE = {'figsize': (8, 6), 'node_size': 500, 'rad': 0.05, 'pair_rads': (-0.1, 0.1)}
+
+def build_graph(M):
     n = len(M)  # Number of nodes, should be 8 after modification
     edges = set()  # Use a set to avoid duplicate edges
 
@@ -23,12 +27,21 @@ def plot_graph_from_multiplication_table(M, table_index):
     G.add_nodes_from(range(n))
     G.add_edges_from(edges)
 
-    # Save the graph to a file using pickle
-    graph_filename = f'graph_{table_index}_reordered_nodes.pkl'
-    with open(graph_filename, 'wb') as f:
-        pickle.dump(G, f)
-    print(f"Graph {table_index} data saved as '{graph_filename}'.")
+    return G
+
+def render_permutation(M, pos, table_index, perm_index, image_filename):
+    # Reuse the figure of the previous permutation of this table and only move the nodes
+    figure = reuse_figure(str(M), lambda: LayoutFigure(build_graph(M), pos, **STYLE))
+    figure.set_positions(pos)
+
+    # Save the graph image to a file
+    figure.save(image_filename)
+    print(f"Graph {table_index} permutation {perm_index} plotted and saved as '{image_filename}'.")
 
+def permutation_layouts(G):
+    """
+    Yields (permuted_top_nodes, pos) for every permutation of the degree-8 nodes of G.
+    """
     # Compute total degrees
     total_degrees = {node: G.in_degree(node) + G.out_degree(node) for node in G.nodes()}
 
@@ -37,10 +50,8 @@ def plot_graph_from_multiplication_table(M, table_index):
     nodes_degree_4 = [node for node, deg in total_degrees.items() if deg == 4]
     nodes_other = [node for node in G.nodes() if node not in nodes_degree_8 and node not in nodes_degree_4]
 
-    # Generate all permutations of the top nodes
-    permutations = list(itertools.permutations(nodes_degree_8))
-
-    for perm_index, permuted_top_nodes in enumerate(permutations, 1):
+    # Generate all permutations of the top nodes (lazily, there can be up to 8!)
+    for permuted_top_nodes in itertools.permutations(nodes_degree_8):
         pos = {}
 
         # Arrange permuted top nodes at the top (y=1)
@@ -59,101 +70,65 @@ def plot_graph_from_multiplication_table(M, table_index):
             for idx, node in enumerate(nodes_other):
                 pos[node] = (x_coords_other[idx], 0)
 
-        # Draw nodes with labels
-        plt.figure(figsize=(8, 6))  # Create a new figure for each permutation
-        nx.draw_networkx_nodes(G, pos, node_size=500, node_color='skyblue',
-                               edgecolors='black', linewidths=1.5)
-        nx.draw_networkx_labels(G, pos, font_size=10, font_weight='bold')
-
-        ax = plt.gca()
-
-        # Prepare a set to keep track of drawn edges
-        drawn_edges = set()
-
-        # Iterate over all edges to draw them
-        for u, v in G.edges():
-            # Avoid drawing the same edge multiple times
-            if (u, v) in drawn_edges:
-                continue
-
-            # First, handle self-loops
-            if u == v:
-                # Draw self-loop using Arc
-                x, y = pos[u]
-                radius = 0.1  # Adjust the radius of the self-loop
-                theta1 = 0
-                theta2 = 360  # Full circle
-                # Create an Arc object
-                arc = Arc((x, y), radius * 2, radius * 2, angle=0,
-                          theta1=theta1, theta2=theta2,
-                          color='green', lw=1)
-                ax.add_patch(arc)
-
-                # Optionally, add an arrowhead manually
-                # Calculate the position for the arrowhead
-                arrow_angle = 45  # degrees
-                arrow_x = x + radius * math.cos(math.radians(arrow_angle))
-                arrow_y = y + radius * math.sin(math.radians(arrow_angle))
-                ax.annotate("",
-                            xy=(arrow_x, arrow_y),
-                            xytext=(x, y),
-                            arrowprops=dict(arrowstyle="->", color='black', lw=1))
-                # Mark edge as drawn
-                drawn_edges.add((u, v))
-
-            # Then, check for bidirectional edges
-            elif G.has_edge(v, u) and (v, u) not in drawn_edges:
-                # Bidirectional edge
-                # Edge from u to v
-                nx.draw_networkx_edges(G, pos,
-                                       edgelist=[(u, v)],
-                                       arrowstyle='-|>',
-                                       arrowsize=10,
-                                       edge_color='red',
-                                       connectionstyle="arc3,rad=-0.1",
-                                       min_source_margin=15,
-                                       min_target_margin=15)
-                # Edge from v to u
-                nx.draw_networkx_edges(G, pos,
-                                       edgelist=[(v, u)],
-                                       arrowstyle='-|>',
-                                       arrowsize=10,
-                                       edge_color='red',
-                                       connectionstyle="arc3,rad=0.1",
-                                       min_source_margin=15,
-                                       min_target_margin=15)
-                # Mark both edges as drawn
-                drawn_edges.add((u, v))
-                drawn_edges.add((v, u))
-            else:
-                # Unidirectional edge
-                nx.draw_networkx_edges(G, pos,
-                                       edgelist=[(u, v)],
-                                       arrowstyle='-|>',
-                                       arrowsize=10,
-                                       edge_color='black',
-                                       connectionstyle="arc3,rad=0.05",
-                                       min_source_margin=15,
-                                       min_target_margin=15)
-                # Mark edge as drawn
-                drawn_edges.add((u, v))
-
-        # Remove axes for clarity
-        plt.axis('off')
-
-        # Adjust plot margins
-        plt.tight_layout()
-
-        # Save the graph image to a file
-        image_filename = f'graph_{table_index}_permutation_{perm_index}_8x8_reordered_nodes.png'
-        plt.savefig(image_filename, format='png',
-                    bbox_inches='tight', pad_inches=0.1, dpi=100)
-        plt.close()
-        print(f"Graph {table_index} permutation {perm_index} plotted and saved as '{image_filename}'.")
+        yield permuted_top_nodes, pos
 
-    print(f"All {len(permutations)} permutations plotted for graph {table_index}.")
+def save_graph(G, table_index):
+    # Save the graph to a file using pickle
+    graph_filename = f'graph_{table_index}_reordered_nodes.pkl'
+    with open(graph_filename, 'wb') as f:
+        pickle.dump(G, f)
+    print(f"Graph {table_index} data saved as '{graph_filename}'.")
+
+def plot_graph_from_multiplication_table(M, table_index, all_layouts=False):
+    """
+    Saves the graph of M and yields one rendering task per permutation of the top nodes,
+    skipping permutations that only relabel the picture by an automorphism of the graph.
+    """
+    G = build_graph(M)
+    save_graph(G, table_index)
+
+    classes, image_filenames = {}, {}
+    group = identity_group(G) if all_layouts else None
+    for perm_index, permuted_top_nodes, pos in distinct_layouts(G, permutation_layouts(G), classes, group):
+        image_filename = f'graph_{table_index}_permutation_{perm_index}_8x8_reordered_nodes.png'
+        image_filenames[perm_index] = image_filename
+        yield (image_filename, render_permutation, (M, pos, table_index, perm_index, image_filename),
+               render_params(M, layout_points(pos), STYLE))
+
+    # Record which permutations every image stands for
+    classes_filename = f'graph_{table_index}_permutation_classes.csv'
+    write_layout_classes(classes, image_filenames, classes_filename)
+    print(f"Graph {table_index}: {len(classes)} of {sum(map(len, classes.values()))} permutations rendered, classes saved as '{classes_filename}'.")
+
+def plot_permutations_pdf(M, table_index, all_layouts=False):
+    """
+    Saves the graph of M and writes one permutation of the top nodes per automorphism class
+    as one page of a PDF.
+    """
+    G = build_graph(M)
+    save_graph(G, table_index)
+
+    classes = {}
+    group = identity_group(G) if all_layouts else None
+    layouts = (pos for _, _, pos in distinct_layouts(G, permutation_layouts(G), classes, group))
+    first = next(layouts)
+    figure = LayoutFigure(G, first, **STYLE)
+    pdf_filename = f'graph_{table_index}_permutations_8x8_reordered_nodes.pdf'
+    pages = figure.save_pages(itertools.chain([first], layouts), pdf_filename)
+    figure.close()
+    print(f"Graph {table_index}: {pages} permutations plotted and saved as '{pdf_filename}'.")
+
+    # Record which permutations every page stands for
+    page_names = {representative: f'{pdf_filename}#page={page}' for page, representative in enumerate(classes, 1)}
+    write_layout_classes(classes, page_names, f'graph_{table_index}_permutation_classes.csv')
 
 def main():
+    parser = argparse.ArgumentParser(description="Plot every permutation of the degree-8 nodes of selected 8x8 multiplication tables.")
+    add_render_arguments(parser)
+    parser.add_argument("--pdf", action="store_true", help="Write the permutations of each table as pages of one PDF instead of PNG files.")
+    parser.add_argument("--all-layouts", action="store_true", help="Render every permutation, also those equal up to a graph automorphism.")
+    args = parser.parse_args()
+
     # File containing multiplication tables (one per row in list format)
     filename = 'magmas8x8(WIP).txt'
 
@@ -161,6 +136,7 @@ def main():
     desired_graph_indices = [1, 2, 6, 512, 513, 516, 518, 1536]
 
     # Read and process only the desired multiplication tables
+    selected_tables = []
     with open(filename, 'r') as file:
         for line_number, line in enumerate(file, 1):
             if line_number in desired_graph_indices:
@@ -171,7 +147,7 @@ def main():
                     if (isinstance(M, list) and all(isinstance(row, list) for row in M)):
                         n = len(M)
                         if n == 8 and all(len(row) == n for row in M):
-                            plot_graph_from_multiplication_table(M, line_number)
+                            selected_tables.append((M, line_number))
                         else:
                             print(f"Error on line {line_number}: The table must be 8x8.")
                     else:
@@ -179,5 +155,16 @@ def main():
                 except (SyntaxError, ValueError) as e:
                     print(f"Error on line {line_number}: {e}")
 
+    if args.pdf:
+        use_agg()
+        for M, line_number in selected_tables:
+            plot_permutations_pdf(M, line_number, args.all_layouts)
+        return
+
+    tasks = itertools.chain.from_iterable(plot_graph_from_multiplication_table(M, line_number, args.all_layouts)
+                                          for M, line_number in selected_tables)
+    rendered, skipped = render_all(tasks, jobs=args.jobs, resume=not args.force, cache_dir=args.cache_dir)
+    print(f"{rendered} permutations plotted, {skipped} up to date.")
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,233 @@
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.transforms import IdentityTransform
+
+# Edge drawing for the plotting scripts with a few collections instead of one
+# draw_networkx_edges / Arc / annotate call per edge.
+#
+# Straight and curved edges are quadratic Bezier curves built like matplotlib's
+# "arc3,rad=r" connection style: the control point is the midpoint moved by r times the
+# chord turned by -90 degrees, in display coordinates. The curves are trimmed by the node
+# margins (in points) and capped with arrow heads. That geometry depends on the final axes
+# size and the output dpi, so ArrowCollection recomputes it at draw time, like
+# FancyArrowPatch does. Self-loops are circles in data coordinates with a short arrow from
+# the node center, as drawn by the Arc + annotate code they replace.
+
+CURVE_SAMPLES = 65
+SEGMENT_POINTS = 24
+
+def _bezier(start, control, end, t):
+    # start, control, end: (E, 2); t: (E, T) -> (E, T, 2)
+    t = t[..., None]
+    return (1 - t) ** 2 * start[:, None] + 2 * (1 - t) * t * control[:, None] + t ** 2 * end[:, None]
+
+def _crossing(distances, grid, margin, from_end):
+    """
+    Parameter where the distance to an endpoint first reaches margin, interpolated between samples.
+    """
+    if from_end:
+        distances, grid = distances[:, ::-1], grid[::-1]
+    inside = distances < margin[:, None]
+    k = np.clip(np.argmin(inside, axis=1), 1, len(grid) - 1)
+    rows = np.arange(len(distances))
+    d0, d1 = distances[rows, k - 1], distances[rows, k]
+    fraction = np.clip((margin - d0) / np.where(d1 > d0, d1 - d0, 1), 0, 1)
+    t = grid[k - 1] + fraction * (grid[k] - grid[k - 1])
+    # No sample inside the margin: keep the endpoint
+    return np.where(inside[:, 0], t, grid[0])
+
+def arrow_geometry(start, end, rads, shrink_a, shrink_b, head_length, head_width):
+    """
+    Trimmed arc3 curves and arrow heads in display coordinates.
+
+    Parameters:
+    - start, end: Arrays of shape (E, 2) with the endpoints in pixels.
+    - rads: Array of shape (E,) with the arc3 curvature of every edge.
+    - shrink_a, shrink_b: Margins at the start and end in pixels.
+    - head_length, head_width: Head length and half width in pixels.
+
+    Returns:
+    - curves: Array of shape (E, SEGMENT_POINTS, 2).
+    - tips, left, right: Arrays of shape (E, 2) with the head tip and its two back corners.
+    """
+    chord = end - start
+    control = (start + end) / 2 + rads[:, None] * np.stack([chord[:, 1], -chord[:, 0]], axis=1)
+
+    grid = np.linspace(0, 1, CURVE_SAMPLES)
+    samples = _bezier(start, control, end, np.broadcast_to(grid, (len(start), CURVE_SAMPLES)))
+    t_start = _crossing(np.linalg.norm(samples - start[:, None], axis=2), grid, np.full(len(start), shrink_a), False)
+    t_end = _crossing(np.linalg.norm(samples - end[:, None], axis=2), grid, np.full(len(start), shrink_b), True)
+    t_end = np.maximum(t_end, t_start)
+
+    t = t_start[:, None] + (t_end - t_start)[:, None] * np.linspace(0, 1, SEGMENT_POINTS)[None, :]
+    curves = _bezier(start, control, end, t)
+
+    # Head along the curve tangent at the trimmed end
+    te = t_end[:, None]
+    tangent = 2 * (1 - te) * (control - start) + 2 * te * (end - control)
+    length = np.linalg.norm(tangent, axis=1, keepdims=True)
+    direction = tangent / np.where(length > 0, length, 1)
+    normal = np.stack([-direction[:, 1], direction[:, 0]], axis=1)
+    tips = curves[:, -1]
+    base = tips - head_length * direction
+    return curves, tips, base + head_width * normal, base - head_width * normal
+
+class ArrowCollection(Artist):
+    """
+    Arrows between data points with arc3 curvature, point margins and filled ('-|>') or open
+    ('->') heads, drawn as one LineCollection plus one head collection.
+    """
+    def __init__(self, start, end, rads, colors, shrink_a, shrink_b, arrowsize=10, head='filled', linewidth=1.0):
+        super().__init__()
+        self.set_endpoints(start, end)
+        self.rads = np.broadcast_to(np.asarray(rads, dtype=float), (len(self.start),))
+        self.colors = np.broadcast_to(to_rgba_array(colors), (len(self.start), 4)) if len(self.start) else np.zeros((0, 4))
+        self.shrink_a, self.shrink_b = shrink_a, shrink_b
+        # ArrowStyle '-|>' and '->' defaults: head_length=0.4 and head_width=0.2 times the mutation scale
+        self.head_length, self.head_width = 0.4 * arrowsize, 0.2 * arrowsize
+        self.head = head
+        self.lines = LineCollection([], colors=self.colors, linewidths=linewidth, transform=IdentityTransform())
+        if head == 'filled':
+            self.heads = PolyCollection([], facecolors=self.colors, edgecolors=self.colors, linewidths=linewidth,
+                                        transform=IdentityTransform())
+        else:
+            # Both wings of every head are separate segments
+            self.heads = LineCollection([], colors=np.concatenate([self.colors, self.colors]), linewidths=linewidth,
+                                        transform=IdentityTransform())
+
+    def set_endpoints(self, start, end):
+        """Moves the arrows, e.g. when only the node positions change."""
+        self.start = np.asarray(start, dtype=float).reshape(-1, 2)
+        self.end = np.asarray(end, dtype=float).reshape(-1, 2)
+        self.stale = True
+
+    def draw(self, renderer):
+        if not self.get_visible() or len(self.start) == 0:
+            return
+        to_pixels = self.axes.transData.transform
+        scale = renderer.points_to_pixels(1.0)
+        curves, tips, left, right = arrow_geometry(to_pixels(self.start), to_pixels(self.end), self.rads,
+                                                   self.shrink_a * scale, self.shrink_b * scale,
+                                                   self.head_length * scale, self.head_width * scale)
+        self.lines.set_segments(curves)
+        if self.head == 'filled':
+            self.heads.set_verts(np.stack([tips, left, right], axis=1))
+        else:
+            self.heads.set_segments(np.concatenate([np.stack([left, tips], axis=1), np.stack([right, tips], axis=1)]))
+        for collection in (self.lines, self.heads):
+            collection.set_figure(self.figure)
+            collection.draw(renderer)
+        self.stale = False
+
+def classify_edges(G):
+    """
+    Splits the edges of G the way the plotting scripts draw them.
+
+    Returns:
+    - loops: Nodes with a self-loop.
+    - one_way: Edges (u, v) without a reverse edge.
+    - two_way: One (u, v) per pair of opposite edges, in the order they are first met.
+    """
+    loops, one_way, two_way = [], [], []
+    drawn_edges = set()
+    for u, v in G.edges():
+        if (u, v) in drawn_edges:
+            continue
+        if u == v:
+            loops.append(u)
+        elif G.has_edge(v, u) and (v, u) not in drawn_edges:
+            two_way.append((u, v))
+            drawn_edges.add((v, u))
+        else:
+            one_way.append((u, v))
+        drawn_edges.add((u, v))
+    return loops, one_way, two_way
+
+def _loop_paths(centers, radius, theta1, theta2, samples=64):
+    angles = np.radians(np.linspace(theta1, theta2, samples))
+    circle = radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    return centers[:, None, :] + circle[None, :, :]
+
+def _loop_arrow_ends(centers, radius, angle):
+    return centers + radius * np.array([np.cos(np.radians(angle)), np.sin(np.radians(angle))])
+
+def draw_graph_edges(ax, G, pos, node_size=500, arrowsize=10, margin=15, rad=0.0, pair_rads=(0.0, 0.0),
+                     color='black', pair_color='red', loop_radius=0.1, loop_theta2=360, loop_color='green',
+                     loop_arrow_angle=45, width=1.0):
+    """
+    Draws all edges of G with three collections and returns them for later updates.
+
+    The arguments mirror the per-edge calls they replace: one-way edges use rad and color,
+    the two edges of a bidirectional pair use pair_rads (u -> v, then v -> u) and pair_color,
+    and margin is min_source_margin/min_target_margin of draw_networkx_edges.
+
+    Returns:
+    - A dict with the 'arrows', 'loops' and 'loop_arrows' artists and the 'edges' and
+      'loop_nodes' they were built from (in drawing order).
+    """
+    loops, one_way, two_way = classify_edges(G)
+    edges = one_way + [edge for u, v in two_way for edge in ((u, v), (v, u))]
+    rads = [rad] * len(one_way) + list(pair_rads) * len(two_way)
+    colors = [color] * len(one_way) + [pair_color] * (2 * len(two_way))
+
+    # Same node margin as draw_networkx_edges for circular markers
+    shrink = max(np.sqrt(node_size) / 2, margin)
+    points = np.array([pos[node] for node in G.nodes()], dtype=float)
+    index = {node: i for i, node in enumerate(G.nodes())}
+    start = points[[index[u] for u, _ in edges]].reshape(-1, 2)
+    end = points[[index[v] for _, v in edges]].reshape(-1, 2)
+    arrows = ArrowCollection(start, end, rads, colors if edges else 'black', shrink, shrink, arrowsize=arrowsize,
+                             linewidth=width)
+    arrows.set_zorder(1)
+    ax.add_artist(arrows)
+
+    centers = points[[index[node] for node in loops]].reshape(-1, 2)
+    loop_lines = LineCollection(_loop_paths(centers, loop_radius, 0, loop_theta2), colors=loop_color, linewidths=1)
+    loop_lines.set_zorder(1)
+    ax.add_collection(loop_lines, autolim=False)
+    # annotate("", xy, xytext, arrowprops=dict(arrowstyle="->")) defaults: 10 pt head scale, 2 pt shrink
+    loop_arrows = ArrowCollection(centers, _loop_arrow_ends(centers, loop_radius, loop_arrow_angle), 0.0, 'black',
+                                  2, 2, arrowsize=10, head='open', linewidth=1)
+    loop_arrows.set_zorder(3)
+    ax.add_artist(loop_arrows)
+
+    _update_limits(ax, start, end, centers, loop_radius)
+    return {'arrows': arrows, 'loops': loop_lines, 'loop_arrows': loop_arrows, 'edges': edges, 'loop_nodes': loops,
+            'index': index, 'loop_radius': loop_radius, 'loop_theta2': loop_theta2, 'loop_arrow_angle': loop_arrow_angle}
+
+def update_graph_edges(edges, pos):
+    """
+    Moves the edges returned by draw_graph_edges to new node positions, without creating artists.
+
+    Parameters:
+    - edges: The dict returned by draw_graph_edges.
+    - pos: Dict mapping every node to its new (x, y) position.
+    """
+    index = edges['index']
+    points = np.empty((len(index), 2))
+    for node, i in index.items():
+        points[i] = pos[node]
+    start = points[[index[u] for u, _ in edges['edges']]].reshape(-1, 2)
+    end = points[[index[v] for _, v in edges['edges']]].reshape(-1, 2)
+    edges['arrows'].set_endpoints(start, end)
+
+    centers = points[[index[node] for node in edges['loop_nodes']]].reshape(-1, 2)
+    edges['loops'].set_segments(_loop_paths(centers, edges['loop_radius'], 0, edges['loop_theta2']))
+    edges['loop_arrows'].set_endpoints(centers, _loop_arrow_ends(centers, edges['loop_radius'], edges['loop_arrow_angle']))
+
+    _update_limits(edges['arrows'].axes, start, end, centers, edges['loop_radius'])
+
+def _update_limits(ax, start, end, centers, loop_radius):
+    # draw_networkx_edges pads every edge's bounding box by 5%, Arc patches add their circle
+    corners = []
+    if len(start):
+        low, high = np.minimum(start, end), np.maximum(start, end)
+        pad = 0.05 * (high - low)
+        corners += [low - pad, high + pad]
+    if len(centers):
+        corners += [centers - loop_radius, centers + loop_radius]
+    if corners:
+        ax.update_datalim(np.concatenate(corners))
+        ax.autoscale_view()
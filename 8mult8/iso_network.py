@@ -0,0 +1,100 @@
+import math
+import numpy as np
+import networkx as nx
+
+# Isomorphism classes from the pairwise results of check_isomorphism.py.
+#
+# The 'Yes' rows are selected as two integer arrays with vectorized pandas indexing instead of
+# iterrows. Classes are the connected components of those pairs, found in NumPy by min-label
+# propagation with pointer jumping. The contracted plot draws every class as one node whose
+# area grows with its membership. Isomorphism is transitive, so no edges join two classes and
+# a force layout has nothing to work with: the classes are placed on a grid, largest first.
+
+def isomorphic_pairs(df):
+    """
+    Returns the (Graph1, Graph2) index arrays of the rows marked isomorphic.
+    """
+    yes = df['Isomorphic'].to_numpy() == 'Yes'
+    return df['Graph1'].to_numpy()[yes], df['Graph2'].to_numpy()[yes]
+
+def isomorphism_graph(df):
+    """
+    Graph with one edge per isomorphic pair, in file order.
+    """
+    first, second = isomorphic_pairs(df)
+    G = nx.Graph()
+    G.add_edges_from(zip(first.tolist(), second.tolist()))
+    return G
+
+def isomorphism_classes(first, second):
+    """
+    Connected components of the isomorphic pairs.
+
+    Parameters:
+    - first, second: Index arrays of the isomorphic pairs.
+
+    Returns:
+    - nodes: Sorted graph indices that occur in some pair.
+    - labels: Class of every node, numbered from 0 in order of the smallest member.
+    """
+    nodes, inverse = np.unique(np.concatenate([first, second]), return_inverse=True)
+    u, v = inverse[:len(first)], inverse[len(first):]
+
+    # Every node takes the smallest label among its neighbours, then follows its label to that
+    # node's label, until the endpoints of every pair agree (the label of a class ends up
+    # being its smallest member)
+    labels = np.arange(len(nodes))
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, u, labels[v])
+        np.minimum.at(labels, v, labels[u])
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            break
+    return nodes, np.unique(labels, return_inverse=True)[1]
+
+def class_grid(sizes):
+    """
+    Grid positions of the classes, largest first, row by row from the top left.
+
+    Returns:
+    - Dict mapping class number -> (x, y).
+    """
+    columns = max(math.ceil(math.sqrt(len(sizes))), 1)
+    order = np.argsort(-np.asarray(sizes), kind='stable')
+    return {int(k): (slot % columns, -(slot // columns)) for slot, k in enumerate(order)}
+
+def draw_contracted(ax, representatives, sizes, pos, figsize=(10, 10)):
+    """
+    Draws every class as one node labeled with its representative and membership.
+
+    Parameters:
+    - ax: Matplotlib axes.
+    - representatives, sizes: Smallest member and member count of every class.
+    - pos: Class positions from class_grid.
+    - figsize: Figure size in inches, used to fit the largest node into its grid cell.
+
+    Without classes the axes only say that there are no isomorphic pairs.
+    """
+    sizes = np.asarray(sizes)
+    if len(sizes) == 0:
+        # No isomorphic pairs: an empty figure that says so
+        ax.text(0.5, 0.5, "No isomorphic pairs", ha='center', va='center', fontsize=15, transform=ax.transAxes)
+        return
+    columns = max(math.ceil(math.sqrt(len(sizes))), 1)
+    rows = max(-(-len(sizes) // columns), 1)
+    # Marker areas in points^2: the largest class fills most of its cell (the default axes take
+    # about 3/4 of the figure), area proportional to size
+    cell = 72 * 0.75 * min(figsize) / max(columns, rows)
+    node_size = np.maximum((0.8 * cell) ** 2 * sizes / sizes.max(), 200)
+
+    H = nx.Graph()
+    H.add_nodes_from(range(len(sizes)))
+    nx.draw_networkx_nodes(H, pos, ax=ax, node_size=node_size, node_color="skyblue", edgecolors="black")
+    labels = {k: f"{rep}\n({size} graphs)" for k, (rep, size) in enumerate(zip(representatives, sizes))}
+    nx.draw_networkx_labels(H, pos, labels, ax=ax, font_size=10, font_color="black", font_weight="bold")
+    # One cell per class, so the largest node is not clipped
+    side = max(columns, rows)
+    ax.set_xlim(-0.5, side - 0.5)
+    ax.set_ylim(-side + 0.5, 0.5)
+    ax.set_aspect('equal')
@@ -0,0 +1,93 @@
+import numpy as np
+import networkx as nx
+import matplotlib.pyplot as plt
+from edge_render import draw_graph_edges, update_graph_edges
+
+# One figure per graph, reused for all of its layouts.
+#
+# The permutation scripts draw the same graph many times and only the node positions
+# change. LayoutFigure creates the nodes, labels and edges once; set_positions moves the
+# node markers, the label texts and the edge collections, and save writes the current
+# layout. reuse_figure keeps the figure of the last graph in each process, so consecutive
+# rendering tasks for the same table (render_pool runs them in order) share it.
+
+class LayoutFigure:
+    """
+    Figure of a graph drawn like the plotting scripts, with movable nodes.
+
+    Parameters:
+    - G: The graph.
+    - pos: Dict mapping every node to its initial (x, y) position.
+    - figsize, node_size: As in the plotting scripts.
+    - edge_options: Extra keyword arguments for draw_graph_edges (rad, pair_rads, ...).
+    """
+    def __init__(self, G, pos, figsize=(8, 6), node_size=500, **edge_options):
+        self.nodes_order = list(G.nodes())
+        self.figure = plt.figure(figsize=figsize)
+        self.ax = self.figure.gca()
+
+        # Draw nodes with labels
+        self.nodes = nx.draw_networkx_nodes(G, pos, ax=self.ax, node_size=node_size, node_color='skyblue',
+                                            edgecolors='black', linewidths=1.5)
+        self.labels = nx.draw_networkx_labels(G, pos, ax=self.ax, font_size=10, font_weight='bold')
+        self.edges = draw_graph_edges(self.ax, G, pos, node_size=node_size, **edge_options)
+
+        # Remove axes for clarity and adjust plot margins once
+        self.ax.axis('off')
+        self.figure.tight_layout()
+
+    def set_positions(self, pos):
+        """Moves every node, label and edge to the positions in pos."""
+        points = np.array([pos[node] for node in self.nodes_order], dtype=float)
+        self.nodes.set_offsets(points)
+        for node, text in self.labels.items():
+            text.set_position(pos[node])
+
+        # Same data limits as a figure drawn from scratch at these positions
+        self.ax.dataLim.set_points(np.array([[np.inf, np.inf], [-np.inf, -np.inf]]))
+        self.ax.ignore_existing_data_limits = True
+        self.ax.update_datalim(points)
+        update_graph_edges(self.edges, pos)
+
+    def save(self, image_filename, dpi=100):
+        self.figure.savefig(image_filename, format='png', bbox_inches='tight', pad_inches=0.1, dpi=dpi)
+
+    def save_pages(self, layouts, pdf_filename):
+        """
+        Writes one page per layout into a multi-page PDF.
+
+        Parameters:
+        - layouts: Iterable of position dicts.
+        - pdf_filename: Output PDF file.
+
+        Returns:
+        - The number of pages written.
+        """
+        from matplotlib.backends.backend_pdf import PdfPages
+        pages = 0
+        with PdfPages(pdf_filename) as pdf:
+            for pos in layouts:
+                self.set_positions(pos)
+                pdf.savefig(self.figure, bbox_inches='tight', pad_inches=0.1)
+                pages += 1
+        return pages
+
+    def close(self):
+        plt.close(self.figure)
+
+# Figure of the last graph rendered in this process, as (key, LayoutFigure)
+_CURRENT = {}
+
+def reuse_figure(key, build):
+    """
+    Returns the figure built for key, calling build() only when key differs from the last one.
+
+    Parameters:
+    - key: Hashable description of the graph and drawing options (e.g. the table as a string).
+    - build: Function returning a new LayoutFigure.
+    """
+    if _CURRENT.get('key') != key:
+        if 'figure' in _CURRENT:
+            _CURRENT['figure'].close()
+        _CURRENT['key'], _CURRENT['figure'] = key, build()
+    return _CURRENT['figure']
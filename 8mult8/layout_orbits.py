@@ -0,0 +1,76 @@
+import csv
+import networkx as nx
+
+# Layouts that differ only by a graph automorphism.
+#
+# If sigma is an automorphism of G, moving every node v to the position of sigma(v) draws
+# the same picture with other labels. The automorphism group splits the layouts into orbits
+# (one per coset of the automorphisms that preserve the layout family), and the plotting
+# scripts render one layout per orbit. An orbit is identified by the smallest tuple of node
+# positions over all relabelings of a layout.
+
+def automorphisms(G):
+    """
+    Returns every automorphism of G as a dict mapping each node to its image.
+    """
+    matcher = nx.algorithms.isomorphism.DiGraphMatcher(G, G) if G.is_directed() else nx.algorithms.isomorphism.GraphMatcher(G, G)
+    return list(matcher.isomorphisms_iter())
+
+def layout_key(pos, group):
+    """
+    Orbit key of a layout: equal for two layouts exactly when an automorphism in group maps one to the other.
+
+    Parameters:
+    - pos: Dict mapping every node to its (x, y) position.
+    - group: List of automorphisms, as returned by automorphisms().
+    """
+    nodes = sorted(pos)
+    points = {node: (float(pos[node][0]), float(pos[node][1])) for node in nodes}
+    return min(tuple(points[sigma[node]] for node in nodes) for sigma in group)
+
+def distinct_layouts(G, layouts, classes, group=None):
+    """
+    Yields one layout per automorphism orbit, in the order the orbits are first met.
+
+    Parameters:
+    - G: The graph.
+    - layouts: Iterable of (item, pos) pairs, where item describes the layout (e.g. a permutation).
+    - classes: Dict filled with representative index -> list of the indices of all layouts in its orbit.
+      Indices start at 1 and count every layout, rendered or not.
+    - group: Automorphisms to identify layouts by (all automorphisms of G if None; only the
+      identity keeps every layout).
+
+    Yields:
+    - (index, item, pos) for the first layout of every orbit.
+    """
+    if group is None:
+        group = automorphisms(G)
+    representatives = {}
+    for index, (item, pos) in enumerate(layouts, 1):
+        key = layout_key(pos, group)
+        if key in representatives:
+            classes[representatives[key]].append(index)
+            continue
+        representatives[key] = index
+        classes[index] = [index]
+        yield index, item, pos
+
+def identity_group(G):
+    """The trivial group, for rendering every layout."""
+    return [{node: node for node in G.nodes()}]
+
+def write_layout_classes(classes, image_filenames, filename):
+    """
+    Writes which layout indices each rendered image stands for.
+
+    Parameters:
+    - classes: Dict filled by distinct_layouts.
+    - image_filenames: Dict mapping representative index -> rendered file.
+    - filename: Output CSV file.
+    """
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['Image', 'Representative', 'Count', 'Permutations'])
+        writer.writeheader()
+        for representative, members in classes.items():
+            writer.writerow({'Image': image_filenames[representative], 'Representative': representative,
+                             'Count': len(members), 'Permutations': ' '.join(map(str, members))})
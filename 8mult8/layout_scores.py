@@ -0,0 +1,98 @@
+import csv
+import numpy as np
+
+# Readability scores of many candidate layouts at once.
+#
+# A batch of layouts is an array of shape (L, n, 2) with the position of every node (in
+# G.nodes() order) in every layout. Edges are scored as straight segments between their
+# nodes, which is what the slightly curved arrows of the plotting scripts look like. For
+# every layout we count the pairs of edges without a common node that cross or overlap,
+# and the edges that run through a node they do not belong to, with orientation tests on
+# all (layout, edge pair) combinations in one pass.
+
+EPS = 1e-9
+
+def layout_array(G, layouts):
+    """
+    Stacks position dicts into an array of shape (L, n, 2), nodes in G.nodes() order.
+    """
+    nodes = list(G.nodes())
+    return np.array([[pos[node] for node in nodes] for pos in layouts], dtype=float).reshape(-1, len(nodes), 2)
+
+def _edge_indices(G):
+    # Drawn edges without self-loops, as index pairs into G.nodes()
+    index = {node: i for i, node in enumerate(G.nodes())}
+    return np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=np.intp).reshape(-1, 2)
+
+def score_layouts(G, positions):
+    """
+    Edge crossings and edge lengths of every layout in a batch.
+
+    Parameters:
+    - G: The graph.
+    - positions: Array of shape (L, n, 2), e.g. from layout_array.
+
+    Returns:
+    - A dict of arrays of shape (L,): 'crossings' (crossing or overlapping edge pairs),
+      'node_overlaps' (edges through other nodes), 'mean_length' and 'max_length'.
+    """
+    edges = _edge_indices(G)
+    n = positions.shape[1]
+    a, b = positions[:, edges[:, 0]], positions[:, edges[:, 1]]
+    direction = b - a
+
+    # Side of every edge each node lies on: +1, -1 or 0 (on the line), shape (L, E, n)
+    relative = positions[:, None, :, :] - a[:, :, None, :]
+    cross = direction[:, :, None, 0] * relative[..., 1] - direction[:, :, None, 1] * relative[..., 0]
+    side = (cross > EPS).astype(np.int8) - (cross < -EPS)
+
+    # Pairs of edges that do not share a node
+    first, second = np.triu_indices(len(edges), k=1)
+    disjoint = ~((edges[first, :, None] == edges[second, None, :]).any(axis=(1, 2)))
+    first, second = first[disjoint], second[disjoint]
+    o1, o2 = side[:, first, edges[second, 0]], side[:, first, edges[second, 1]]
+    o3, o4 = side[:, second, edges[first, 0]], side[:, second, edges[first, 1]]
+    crossing = (o1 * o2 < 0) & (o3 * o4 < 0)
+
+    # Collinear pairs count when their extents overlap by more than a point
+    layout, pair = np.nonzero((o1 == 0) & (o2 == 0))
+    if len(layout):
+        p, q = a[layout, first[pair]], b[layout, first[pair]]
+        r, t = a[layout, second[pair]], b[layout, second[pair]]
+        overlap = np.minimum(np.maximum(p, q), np.maximum(r, t)) - np.maximum(np.minimum(p, q), np.minimum(r, t))
+        crossing[layout, pair] |= (overlap >= -EPS).all(axis=-1) & (overlap > EPS).any(axis=-1)
+    crossings = crossing.sum(axis=1)
+
+    # Nodes strictly inside an edge they are not an endpoint of
+    between = (relative * (positions[:, None, :, :] - b[:, :, None, :])).sum(axis=-1) < -EPS
+    endpoint = (np.arange(n)[None, :] == edges[:, :1]) | (np.arange(n)[None, :] == edges[:, 1:])
+    node_overlaps = ((side == 0) & between & ~endpoint[None]).sum(axis=(1, 2))
+
+    lengths = np.linalg.norm(direction, axis=-1)
+    return {'crossings': crossings, 'node_overlaps': node_overlaps,
+            'mean_length': lengths.mean(axis=1) if len(edges) else np.zeros(len(positions)),
+            'max_length': lengths.max(axis=1) if len(edges) else np.zeros(len(positions))}
+
+def rank_layouts(scores):
+    """
+    Indices of the layouts from best to worst: fewest crossings plus node overlaps, then
+    shortest mean edge length.
+    """
+    return np.lexsort((scores['mean_length'], scores['crossings'] + scores['node_overlaps']))
+
+def write_layout_scores(scores, image_filenames, filename):
+    """
+    Writes the rank and scores of every rendered layout.
+
+    Parameters:
+    - scores: Dict mapping layout index -> dict with 'rank' and the score_layouts values.
+    - image_filenames: Dict mapping layout index -> rendered file.
+    - filename: Output CSV file.
+    """
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['Image', 'Permutation', 'Rank', 'Crossings', 'NodeOverlaps', 'MeanLength', 'MaxLength'])
+        writer.writeheader()
+        for index, score in sorted(scores.items(), key=lambda item: item[1]['rank']):
+            writer.writerow({'Image': image_filenames[index], 'Permutation': index, 'Rank': score['rank'],
+                             'Crossings': int(score['crossings']), 'NodeOverlaps': int(score['node_overlaps']),
+                             'MeanLength': round(float(score['mean_length']), 4), 'MaxLength': round(float(score['max_length']), 4)})
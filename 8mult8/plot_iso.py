@@ -1,34 +1,58 @@
+import argparse
+import numpy as np
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
-
-# Load the dataset
-file_path = 'isomorphism_results.csv'  # Replace with the actual path to your file
-df = pd.read_csv(file_path)
-
-# Filter the dataset for isomorphic pairs
-isomorphic_pairs = df[df['Isomorphic'] == 'Yes']
-
-# Create the graph
-G = nx.Graph()
-
-# Add edges for each isomorphic pair
-for _, row in isomorphic_pairs.iterrows():
-    G.add_edge(row['Graph1'], row['Graph2'])
-
-# Define the size of the plot
-plt.figure(figsize=(10, 10), dpi=600)
-
-# Draw the graph with custom node and edge styles
-pos = nx.spring_layout(G, seed=42)  # Positions the nodes for a better layout
-nx.draw_networkx_nodes(G, pos, node_size=800, node_color="skyblue", edgecolors="black")
-nx.draw_networkx_edges(G, pos, width=2, edge_color="gray")
-nx.draw_networkx_labels(G, pos, font_size=12, font_color="black", font_weight="bold")
-
-# Add a title and remove the axes for a cleaner look
-plt.title("Isomorphic Graph Network", size=15, weight='bold')
-plt.axis("off")
-
-# Show the plot
-#plt.show()
-plt.savefig("isomorphism_graph_plot_8x8.png",dpi=600, transparent=True)
\ No newline at end of file
+from iso_network import isomorphic_pairs, isomorphism_graph, isomorphism_classes, class_grid, draw_contracted
+
+def plot_network(df):
+    # Create the graph, one edge per isomorphic pair
+    G = isomorphism_graph(df)
+
+    # Define the size of the plot
+    plt.figure(figsize=(10, 10), dpi=600)
+
+    # Draw the graph with custom node and edge styles
+    pos = nx.spring_layout(G, seed=42)  # Positions the nodes for a better layout
+    nx.draw_networkx_nodes(G, pos, node_size=800, node_color="skyblue", edgecolors="black")
+    nx.draw_networkx_edges(G, pos, width=2, edge_color="gray")
+    nx.draw_networkx_labels(G, pos, font_size=12, font_color="black", font_weight="bold")
+
+    # Add a title and remove the axes for a cleaner look
+    plt.title("Isomorphic Graph Network", size=15, weight='bold')
+    plt.axis("off")
+
+    # Show the plot
+    #plt.show()
+    plt.savefig("isomorphism_graph_plot_8x8.png",dpi=600, transparent=True)
+
+def plot_classes(df):
+    # One supernode per isomorphism class, sized by membership
+    nodes, labels = isomorphism_classes(*isomorphic_pairs(df))
+    sizes = np.bincount(labels)
+    representatives = [int(nodes[labels == k].min()) for k in range(len(sizes))]
+
+    plt.figure(figsize=(10, 10), dpi=600)
+    draw_contracted(plt.gca(), representatives, sizes, class_grid(sizes))
+
+    plt.title(f"Isomorphism Classes ({len(nodes)} graphs)", size=15, weight='bold')
+    plt.axis("off")
+    plt.savefig("isomorphism_classes_plot_8x8.png", dpi=600, transparent=True)
+    print(f"{len(sizes)} classes of {len(nodes)} graphs plotted and saved as 'isomorphism_classes_plot_8x8.png'.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Plot the network of isomorphic graph pairs.")
+    parser.add_argument("--contract", action="store_true", help="Draw one node per isomorphism class instead of one per graph.")
+    args = parser.parse_args()
+
+    # Load the dataset
+    file_path = 'isomorphism_results.csv'  # Replace with the actual path to your file
+    df = pd.read_csv(file_path)
+
+    if args.contract:
+        plot_classes(df)
+    else:
+        plot_network(df)
+
+if __name__ == '__main__':
+    main()
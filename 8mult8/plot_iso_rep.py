@@ -1,52 +1,79 @@
+import argparse
+import numpy as np
 import pandas as pd
 import networkx as nx
 import matplotlib.pyplot as plt
+from iso_network import isomorphic_pairs, isomorphism_graph, isomorphism_classes, class_grid, draw_contracted
 
-# Load the dataset (Replace this with the actual path to your file)
-file_path = 'isomorphism_results.csv'
-df = pd.read_csv(file_path)
+def save_representatives(representatives):
+    # Save the representatives to a file
+    with open('representative_graphs.txt', 'w') as f:
+        for rep in representatives:
+            f.write(f"{rep}\n")
 
-# Filter the dataset for isomorphic pairs
-isomorphic_pairs = df[df['Isomorphic'] == 'Yes']
+def plot_network(df):
+    # Create the graph, one edge per isomorphic pair
+    G = isomorphism_graph(df)
 
-# Create the graph
-G = nx.Graph()
+    # **New code to save a representative from each connected subgraph**
+    # Get connected components
+    components = list(nx.connected_components(G))
 
-# Add edges for each isomorphic pair
-for _, row in isomorphic_pairs.iterrows():
-    G.add_edge(row['Graph1'], row['Graph2'])
+    # For each component, pick a representative node
+    representatives = [next(iter(comp)) for comp in components]
+    save_representatives(representatives)
 
-# **New code to save a representative from each connected subgraph**
-# Get connected components
-components = list(nx.connected_components(G))
+    # Define the size of the plot
+    plt.figure(figsize=(10, 10), dpi=600)
 
-# For each component, pick a representative node
-representatives = [next(iter(comp)) for comp in components]
+    # Draw the graph with custom node and edge styles
+    # Increase spacing between nodes using the 'k' parameter to make them more sparse
+    pos = nx.spring_layout(G, seed=42, k=0.5)
+    nx.draw_networkx_nodes(G, pos, node_size=800, node_color="skyblue", edgecolors="black")
+    nx.draw_networkx_edges(G, pos, width=2, edge_color="gray")
+    nx.draw_networkx_labels(G, pos, font_size=12, font_color="black", font_weight="bold")
 
-# Save the representatives to a file
-with open('representative_graphs.txt', 'w') as f:
-    for rep in representatives:
-        f.write(f"{rep}\n")
+    # Add representative labels (node numbers) near the connected components
+    for i, rep_node in enumerate(representatives):
+        x, y = pos[rep_node]
+        plt.text(x, y + 0.05, f"Rep {i+1} (Node {rep_node})", fontsize=10, fontweight="bold", color="red")
 
-# Define the size of the plot
-plt.figure(figsize=(10, 10), dpi=600)
+    # Add a title and remove the axes for a cleaner look
+    plt.title("Isomorphic Graph Network", size=15, weight='bold')
+    plt.axis("off")
 
-# Draw the graph with custom node and edge styles
-# Increase spacing between nodes using the 'k' parameter to make them more sparse
-pos = nx.spring_layout(G, seed=42, k=0.5)
-nx.draw_networkx_nodes(G, pos, node_size=800, node_color="skyblue", edgecolors="black")
-nx.draw_networkx_edges(G, pos, width=2, edge_color="gray")
-nx.draw_networkx_labels(G, pos, font_size=12, font_color="black", font_weight="bold")
+    # Save the plot to a file
+    plt.savefig("isomorphism_graph_plot_8x8.png", dpi=600)
+    plt.show()
 
-# Add representative labels (node numbers) near the connected components
-for i, rep_node in enumerate(representatives):
-    x, y = pos[rep_node]
-    plt.text(x, y + 0.05, f"Rep {i+1} (Node {rep_node})", fontsize=10, fontweight="bold", color="red")
+def plot_classes(df):
+    # One supernode per isomorphism class (its smallest member is the representative)
+    nodes, labels = isomorphism_classes(*isomorphic_pairs(df))
+    sizes = np.bincount(labels)
+    representatives = [int(nodes[labels == k].min()) for k in range(len(sizes))]
+    save_representatives(representatives)
 
-# Add a title and remove the axes for a cleaner look
-plt.title("Isomorphic Graph Network", size=15, weight='bold')
-plt.axis("off")
+    plt.figure(figsize=(10, 10), dpi=600)
+    draw_contracted(plt.gca(), [f"Rep {i+1} (Node {rep})" for i, rep in enumerate(representatives)], sizes, class_grid(sizes))
 
-# Save the plot to a file
-plt.savefig("isomorphism_graph_plot_8x8.png", dpi=600)
-plt.show()
\ No newline at end of file
+    plt.title(f"Isomorphism Classes ({len(nodes)} graphs)", size=15, weight='bold')
+    plt.axis("off")
+    plt.savefig("isomorphism_classes_plot_8x8.png", dpi=600)
+    print(f"{len(sizes)} representatives saved to 'representative_graphs.txt', classes plotted as 'isomorphism_classes_plot_8x8.png'.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Save one representative per isomorphism class and plot the network of isomorphic pairs.")
+    parser.add_argument("--contract", action="store_true", help="Draw one node per isomorphism class instead of one per graph.")
+    args = parser.parse_args()
+
+    # Load the dataset (Replace this with the actual path to your file)
+    file_path = 'isomorphism_results.csv'
+    df = pd.read_csv(file_path)
+
+    if args.contract:
+        plot_classes(df)
+    else:
+        plot_network(df)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Rendering scheduler for the plotting scripts.
+#
+# A task is (image_filename, render, args, params): render(*args) draws and saves
+# image_filename, and params describes everything the image depends on (table, layout, ...).
+# Tasks are consumed lazily and at most max_pending of them are in flight, so generating the
+# k! permutation layouts of a table never builds the whole task list in memory. Workers use
+# the Agg backend. The manifest records the params digest of every finished image; with
+# resume, a task is skipped when its image exists and was rendered with the same params.
+# Skipped and cached tasks never run, so render must write nothing but image_filename: other
+# outputs (e.g. the pickled graphs) are written by the caller for every table.
+#
+# The params digest is also the key of an image cache shared by all scripts and runs: a
+# finished image is hard-linked into <cache_dir>/<digest[:2]>/<digest>.png, and a task whose
+# digest is cached gets the cached file linked to its filename (hard link, else symlink, else
+# a copy) instead of being rendered. Images survive cleaned output directories and renumbered
+# tables, and tables drawn the same way by several scripts are rendered once.
+
+MANIFEST_FILE = '.render_manifest.json'
+DEFAULT_CACHE_DIR = '.render_cache'
+
+# Part of every cache key; bump it when edge_render or layout_figure change how images look
+RENDER_VERSION = 1
+
+def use_agg():
+    import matplotlib.pyplot as plt
+    plt.switch_backend('Agg')
+
+def params_digest(params):
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def render_params(table, layout, style):
+    """
+    Everything an image depends on.
+
+    Parameters:
+    - table: Multiplication table (list of lists), packed into one byte per entry.
+    - layout: JSON-serializable layout, a name (e.g. 'circle') or node positions from layout_points.
+    - style: JSON-serializable drawing settings of the script (node size, edge options, dpi, ...).
+    """
+    packed = bytes(value for row in table for value in row)
+    return {'version': RENDER_VERSION, 'size': len(table), 'table': packed.hex(), 'layout': layout, 'style': style}
+
+def layout_points(pos):
+    """Node positions as a list of [x, y] in node order."""
+    return [[float(x), float(y)] for _, (x, y) in sorted(pos.items())]
+
+def load_manifest(path):
+    if os.path.isfile(path):
+        with open(path, 'r') as file:
+            return json.load(file)
+    return {}
+
+def save_manifest(manifest, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, digest[:2], f"{digest}.png")
+
+def _place(source, target, symlink=True):
+    # Atomically make target a hard link to source, falling back to a symlink and then a copy
+    tmp_path = f"{target}.tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        try:
+            if not symlink:
+                raise
+            os.symlink(os.path.abspath(source), tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+def cache_lookup(cache_dir, digest, image_filename):
+    """
+    Gives image_filename the cached image with digest. Returns False if there is none.
+    """
+    entry = _cache_path(cache_dir, digest)
+    if not os.path.isfile(entry):
+        return False
+    if not (os.path.isfile(image_filename) and os.path.samefile(entry, image_filename)):
+        _place(entry, image_filename)
+    return True
+
+def cache_store(cache_dir, digest, image_filename):
+    """
+    Adds a rendered image to the cache under digest (a hard link, or a copy across file systems).
+    """
+    entry = _cache_path(cache_dir, digest)
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    _place(image_filename, entry, symlink=False)
+
+def render_all(tasks, jobs=1, resume=True, max_pending=None, manifest_path=MANIFEST_FILE, save_every=100, cache_dir=None):
+    """
+    Renders every task, in a process pool when jobs > 1.
+
+    Parameters:
+    - tasks: Iterable of (image_filename, render, args, params) tuples; render(*args) only
+      writes image_filename, as it is not called for skipped or cached images.
+    - jobs: Number of worker processes (1 renders in this process).
+    - resume: Skip images that exist and were rendered with the same params.
+    - max_pending: Maximum number of submitted, unfinished tasks (default 4 per worker).
+    - manifest_path: JSON file mapping image filenames to params digests.
+    - save_every: Write the manifest after this many finished images (and at the end).
+    - cache_dir: Image cache directory (None disables the cache).
+
+    Returns:
+    - (rendered, skipped) counts; skipped includes images taken from the cache.
+    """
+    manifest = load_manifest(manifest_path)
+    max_pending = max_pending or 4 * jobs
+    rendered = skipped = 0
+
+    def todo():
+        nonlocal skipped
+        for image_filename, render, args, params in tasks:
+            digest = params_digest(params)
+            if resume and os.path.isfile(image_filename) and manifest.get(image_filename) == digest:
+                skipped += 1
+                continue
+            if resume and cache_dir and cache_lookup(cache_dir, digest, image_filename):
+                manifest[image_filename] = digest
+                skipped += 1
+                continue
+            # The old file may be linked to a cache entry; savefig must not write through it
+            if os.path.lexists(image_filename):
+                os.remove(image_filename)
+            yield image_filename, render, args, digest
+
+    def finished(image_filename, digest):
+        nonlocal rendered
+        if cache_dir:
+            cache_store(cache_dir, digest, image_filename)
+        manifest[image_filename] = digest
+        rendered += 1
+        if rendered % save_every == 0:
+            save_manifest(manifest, manifest_path)
+
+    try:
+        if jobs <= 1:
+            use_agg()
+            for image_filename, render, args, digest in todo():
+                render(*args)
+                finished(image_filename, digest)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=use_agg) as executor:
+                pending = {}
+                for image_filename, render, args, digest in todo():
+                    if len(pending) >= max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                            finished(*pending.pop(future))
+                    pending[executor.submit(render, *args)] = (image_filename, digest)
+                for future in list(pending):
+                    future.result()
+                    finished(*pending.pop(future))
+    finally:
+        # Keep the progress of an interrupted run
+        save_manifest(manifest, manifest_path)
+    return rendered, skipped
+
+def add_render_arguments(parser):
+    """--jobs, --force and --cache-dir options shared by the plotting scripts."""
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of rendering processes.")
+    parser.add_argument("-f", "--force", action="store_true", help="Re-render images even if they exist or are cached with the same parameters.")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory of rendered images keyed by table, layout and style ('' disables the cache).")
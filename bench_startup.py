@@ -0,0 +1,76 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup budgets for the compute-only CLIs that run_all_bash.sh style loops start over and
+# over. A script's startup is the wall time of "python <script> --help": interpreter start,
+# module imports and argument parsing, but no work. Every script needs NumPy, so a budget is
+# the time allowed on top of "python -c 'import numpy'" on the same machine, which keeps the
+# check meaningful on slow and fast machines alike.
+#
+# To stay within budget, the transform scripts import matplotlib, scipy and tqdm inside the
+# functions that use them (plotting, the convolution transforms, progress bars). coeff.py and
+# coeff_antiguo.py import sympy only when a result needs exact rationals or pretty printing,
+# which their default (not -q) runs do. coeff_extensive.py and coeff_extensive_1.py import it
+# only to solve or print, so coeff_sharded.py, which reuses their helpers, never loads it.
+# expression.py, expression_matrix_information.py and solved_systems.py are symbolic by
+# design (the solved-system cache is keyed by the canonical SymPy offset) and import sympy
+# at the top.
+BUDGETS_MS = {
+    'every_operation_fdiff.py': 50,
+}
+
+# Reported for comparison, without a budget
+REPORTED = [
+    'every_operation_fdiff_laplace.py',
+    'every_operation_order.py',
+    'every_operation_fourth_order.py',
+    'fused_zeros.py',
+    'pipeline.py',
+    'coeff.py',
+    'coeff_sharded.py',
+]
+
+def measure_startup(arguments, runs=7):
+    """
+    Median wall time in milliseconds of running the interpreter with the given arguments.
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI startup time and enforce the startup budgets.")
+    parser.add_argument("-n", "--runs", type=int, default=7, help="Number of runs per script (the median is reported).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget, e.g. for noisy machines.")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    print(f"{'python -c pass':40s} {measure_startup(['-c', 'pass'], args.runs):8.1f} ms")
+    baseline = measure_startup(['-c', 'import numpy'], args.runs)
+    print(f"{'python -c import numpy (baseline)':40s} {baseline:8.1f} ms")
+
+    failed = False
+    for script in list(BUDGETS_MS) + REPORTED:
+        elapsed = measure_startup([script, '--help'], args.runs)
+        budget = BUDGETS_MS.get(script)
+        if budget is None:
+            print(f"{script:40s} {elapsed:8.1f} ms")
+            continue
+        budget *= args.scale
+        overhead = elapsed - baseline
+        status = 'ok' if overhead <= budget else 'OVER BUDGET'
+        failed |= overhead > budget
+        print(f"{script:40s} {elapsed:8.1f} ms  (+{overhead:.0f} ms over NumPy, budget +{budget:.0f} ms, {status})")
+
+    if failed:
+        exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+import argparse
+import os
+import numpy as np
+from permutations import read_matrices_from_file, factorial, relabel_batch
+from every_operation_fdiff import finite_difference_transform_stack
+from fused_zeros import write_zeros_file
+
+# Branch-and-bound over partial relabelings for the order 1 (mixed difference) transform.
+#
+# Elements are placed position by position: seq[pos] is the element that gets label pos,
+# so an element's label is known exactly when it has been placed. A difference cell (i, j)
+# reads the relabeled table at rows/columns i, i+1 and j, j+1, so once positions 0..k-1 are
+# filled every cell with i, j <= k-2 has known table elements, and its value
+#     p[a] - p[b] - p[c] + p[d]
+# is a linear form in the labels of those elements. The last row and column of the
+# transformed table are always zero.
+#
+# Prefixes are handled in blocks, like the coefficient search of coeff_extensive.py: a block
+# of prefixes of the same length is extended by every unplaced element at once, the bounds of
+# all children are computed with NumPy, children that cannot reach the incumbent are dropped
+# and the rest are pushed on a stack in chunks, best bound on top. Relabeling by n-1-p turns
+# the difference table by 180 degrees and negates it, which keeps the zero count, so only
+# prefixes that can end with seq[n-1] > seq[0] are searched and the mirrored relabelings are
+# added to the result.
+#
+# Scope: the search is exact and proves the optimum, but the bounds only prune in the last
+# two or three positions, so it still visits a large part of the tree. It finishes up to
+# about order 9 (a random order 9 table takes ~10 s), and even there the enumeration of
+# fused_zeros.py is faster. Its use is a check of the brute-force files with a bounded
+# memory footprint, not a way past n!. At orders 12-16 the root bounds are close to n*n and
+# a --max-nodes run is no better than sampling random relabelings.
+
+BLOCK_SIZE = 4096
+SIGNS = np.array([1, -1, -1, 1])
+
+def block_zero_counts(M, seqs, labels):
+    """
+    Upper bound on the zeros of the placed block (cells i, j <= k-2) of every prefix.
+
+    A cell counts unless it cannot be zero in any completion: all its labels are known and
+    the value is not zero, or a single free element is left and the label it would need is
+    not an integer in [k, n).
+
+    Parameters:
+    - M: Operation table (array of shape (n, n)).
+    - seqs: Placed elements of every prefix, shape (B, k).
+    - labels: labels[b, e] is the position of element e, or -1 if it has not been placed.
+
+    Returns:
+    - Integer array of length B.
+    """
+    B, k = seqs.shape
+    n = len(M)
+    if k < 2:
+        return np.zeros(B, dtype=np.int64)
+    G = M[seqs[:, :, None], seqs[:, None, :]]
+    # Elements at (i+1, j+1), (i+1, j), (i, j+1) and (i, j) of every block cell
+    E = np.stack([G[:, 1:, 1:], G[:, 1:, :-1], G[:, :-1, 1:], G[:, :-1, :-1]], axis=-1)
+    L = labels[np.arange(B)[:, None, None, None], E]
+    known = L >= 0
+    const = (SIGNS * np.where(known, L, 0)).sum(axis=-1)
+    # Net coefficient of the element in every slot (repeated elements add up or cancel)
+    net = ((E[..., :, None] == E[..., None, :]) * SIGNS).sum(axis=-1)
+    free = ~known & (net != 0)
+    any_free = free.any(axis=-1)
+    first = free.argmax(axis=-1)[..., None]
+    e0 = np.take_along_axis(E, first, axis=-1)
+    c0 = np.where(any_free, np.take_along_axis(net, first, axis=-1)[..., 0], 1)
+    single = (~free | (E == e0)).all(axis=-1)
+    # The single free label would have to equal -const / c0
+    q, rem = np.divmod(-const, c0)
+    single_ok = (rem == 0) & (q >= k) & (q < n)
+    possible = np.where(any_free, ~single | single_ok, const == 0)
+    return possible.sum(axis=(1, 2))
+
+def distinct_lower_bound(U, W, labels):
+    """
+    Lower bound on the number of distinct values of p[w] - p[u] over the pairs (U, W) of every
+    row of a stack.
+
+    Pairs with the same u but different w (or the other way round) always differ, and pairs
+    whose labels are both known give their exact values.
+
+    Parameters:
+    - U, W: Element arrays of shape (B, R, m), one sequence of m pairs per (prefix, row).
+    - labels: Labels of every prefix, shape (B, n).
+
+    Returns:
+    - Integer array of shape (B, R).
+    """
+    B, R, m = U.shape
+    n = labels.shape[1]
+    rows = np.arange(B * R).reshape(B, R, 1)
+
+    def most_partners(X, Y):
+        # Largest number of distinct Y paired with one X
+        codes = np.sort(X * n + Y, axis=-1)
+        new = np.ones(codes.shape, dtype=bool)
+        new[..., 1:] = codes[..., 1:] != codes[..., :-1]
+        counts = np.bincount((rows * n + codes // n)[new], minlength=B * R * n)
+        return counts.reshape(B, R, n).max(axis=-1)
+
+    b = np.arange(B)[:, None, None]
+    LU, LW = labels[b, U], labels[b, W]
+    known = (LU >= 0) & (LW >= 0)
+    values = np.zeros(B * R * (2 * n - 1), dtype=bool)
+    values[(rows * (2 * n - 1) + LW - LU + n - 1)[known]] = True
+    known_values = values.reshape(B, R, 2 * n - 1).sum(axis=-1)
+    return np.maximum(np.maximum(most_partners(U, W), most_partners(W, U)), known_values)
+
+def pair_zero_bounds(M):
+    """
+    Label-independent bound on the zeros of one difference row for every pair of adjacent rows.
+
+    If rows x and y of the relabeled table are adjacent, the difference row is taken over the
+    sequence p[M[y][e]] - p[M[x][e]], and a length-n sequence with d distinct values has at
+    most n - d equal neighbours.
+
+    Returns:
+    - bounds: bounds[x, y] is the maximum zero count of a difference row between rows x and y.
+    """
+    n = len(M)
+    x, y = np.divmod(np.arange(n * n), n)
+    distinct = distinct_lower_bound(M[x][None], M[y][None], np.full((1, n), -1))
+    return (n - distinct).reshape(n, n)
+
+def remaining_path_bound(bounds, seqs, unplaced):
+    """
+    Upper bound on the zeros of the difference rows still to be placed, for every prefix.
+
+    The remaining rows form a path from the last placed element through every unplaced one,
+    so each of those elements except the final one contributes one outgoing pair.
+    """
+    B, k = seqs.shape
+    n = len(bounds)
+    count = unplaced.sum(axis=1)
+    if k == 0 and count[0] <= 1:
+        return np.zeros(B, dtype=np.int64)
+    targets = unplaced[:, None, :] & ~np.eye(n, dtype=bool)
+    best_out = np.where(targets, bounds, 0).max(axis=2)
+    sources = unplaced.copy()
+    if k > 0:
+        sources[np.arange(B), seqs[:, -1]] = True
+    total = np.where(sources, best_out, 0).sum(axis=1)
+    smallest = np.where(sources, best_out, np.iinfo(np.int64).max).min(axis=1)
+    return np.where(count > 0, total - smallest, 0)
+
+def zero_upper_bounds(M, seqs, labels, row_pair_bounds, col_pair_bounds):
+    """
+    Upper bound on the zero count of any full relabeling that extends each prefix of a block.
+
+    With positions 0..k-1 placed, the (n-1)^2 difference cells split into the placed block
+    (i, j <= k-2), the cells right of it (placed rows), the cells below it (placed columns)
+    and the rest:
+    - block cells are bounded by block_zero_counts,
+    - along a placed row pair (x, y) the remaining cells are the equal neighbours of the
+      sequence p[M[y][e]] - p[M[x][e]] over e = seq[k-1] followed by the unplaced elements,
+      and a length-m sequence with d distinct values has at most m - d equal neighbours,
+    - placed column pairs are bounded the same way,
+    - the rows (columns) not placed yet are bounded by remaining_path_bound.
+    At full length every cell is known and the bound is the exact zero count.
+
+    Returns:
+    - Integer array of length B.
+    """
+    B, k = seqs.shape
+    n = len(M)
+    block = max(k - 1, 0)  # placed difference rows/columns
+    rest = n - 1 - block
+    unplaced = labels < 0
+    right = below = np.zeros(B, dtype=np.int64)
+    if block:
+        tail = np.concatenate([seqs[:, -1:], np.nonzero(unplaced)[1].reshape(B, n - k)], axis=1)
+        x, y, t = seqs[:, :-1, None], seqs[:, 1:, None], tail[:, None, :]
+        right = (tail.shape[1] - distinct_lower_bound(M[x, t], M[y, t], labels)).sum(axis=1)
+        below = (tail.shape[1] - distinct_lower_bound(M[t, x], M[t, y], labels)).sum(axis=1)
+    rows_left = remaining_path_bound(row_pair_bounds, seqs, unplaced)
+    cols_left = remaining_path_bound(col_pair_bounds, seqs, unplaced)
+    outside = np.minimum(np.minimum(right + below + rest * rest, right + rows_left), below + cols_left)
+    # Add the 2n-1 cells of the zero last row and column
+    return block_zero_counts(M, seqs, labels) + outside + 2 * n - 1
+
+def extend(seqs, labels):
+    """
+    Every child of every prefix: each unplaced element appended in turn, parent by parent.
+
+    Children that can no longer end with seq[n-1] > seq[0] are left out (their mirror images
+    are searched instead).
+    """
+    B, k = seqs.shape
+    n = labels.shape[1]
+    parent, elem = np.nonzero(labels < 0)
+    seqs = np.concatenate([seqs[parent], elem[:, None]], axis=1)
+    labels = labels[parent]
+    labels[np.arange(len(elem)), elem] = k
+    if k + 1 == n:
+        keep = seqs[:, -1] > seqs[:, 0]
+    else:
+        keep = np.where(labels < 0, np.arange(n), -1).max(axis=1) > seqs[:, 0]
+    return seqs[keep], labels[keep]
+
+def permutation_rank(p):
+    """
+    Returns the 0-based position of p in itertools.permutations(range(len(p))).
+    """
+    n = len(p)
+    rank = 0
+    for i in range(n):
+        smaller_after = sum(1 for j in range(i + 1, n) if p[j] < p[i])
+        rank += smaller_after * factorial(n - 1 - i)
+    return rank
+
+def search_max_zero_relabelings(M, keep_ties=True, max_nodes=None, block_size=BLOCK_SIZE):
+    """
+    Depth-first branch-and-bound search for the relabelings of M with the most zeros after the
+    order 1 finite difference transform. Blocks of prefixes are bounded together, and the
+    children with the best bounds are extended first. Practical up to about order 9; see the
+    note at the top of the file.
+
+    Parameters:
+    - M: Operation table (list of lists).
+    - keep_ties: If True, return every optimal relabeling (subtrees are only pruned when they
+      cannot reach the incumbent); otherwise prune anything that cannot beat it and return one.
+    - max_nodes: Optional cap on bounded prefixes; when it is hit the incumbent is returned
+      without a proof of optimality (max_zeros -1 and no perms if no leaf was reached).
+    - block_size: Most prefixes extended at once.
+
+    Returns:
+    - max_zeros: The maximum zero count.
+    - perms: List of optimal permutations p in the convention of permutations.py.
+    - nodes: Number of prefixes bounded.
+    - complete: True if the search finished, so max_zeros is proven optimal.
+    """
+    M = np.asarray(M, dtype=np.int64)
+    n = len(M)
+    if n == 1:
+        return 1, [(0,)], 1, True
+    row_pair_bounds = pair_zero_bounds(M)
+    col_pair_bounds = pair_zero_bounds(M.T)
+    best = -1
+    best_perms = []
+    nodes = 0
+    complete = True
+
+    # Stack of (seqs, labels) blocks; the block on top has the best bounds of its level
+    stack = [(np.zeros((1, 0), dtype=np.int64), np.full((1, n), -1, dtype=np.int64))]
+    while stack:
+        if max_nodes is not None and nodes >= max_nodes:
+            complete = False
+            break
+        seqs, labels = extend(*stack.pop())
+        bounds = zero_upper_bounds(M, seqs, labels, row_pair_bounds, col_pair_bounds)
+        nodes += len(seqs)
+        if seqs.shape[1] == n:
+            # Every cell is determined, so the bound is the exact zero count
+            top = int(bounds.max(initial=-1))
+            if top > best or (top == best and keep_ties):
+                if top > best:
+                    best = top
+                    best_perms.clear()
+                hits = np.flatnonzero(bounds == best)
+                best_perms.extend(map(tuple, labels[hits[:None if keep_ties else 1]].tolist()))
+            continue
+        keep = bounds >= best if keep_ties else bounds > best
+        order = np.argsort(-bounds[keep], kind='stable')
+        seqs, labels = seqs[keep][order], labels[keep][order]
+        for start in reversed(range(0, len(seqs), block_size)):
+            stack.append((seqs[start:start + block_size], labels[start:start + block_size]))
+
+    if not keep_ties:
+        best_perms = best_perms[:1]
+    else:
+        # The mirror image n-1-p of every relabeling found
+        best_perms.extend(tuple(n - 1 - label for label in perm) for perm in list(best_perms))
+    return best, best_perms, nodes, complete
+
+def main():
+    parser = argparse.ArgumentParser(description="Find max-zero relabelings of operation tables by an exact branch-and-bound search (practical up to about order 9).")
+    parser.add_argument('input_filename', help='Input file containing the operation tables, one per line.')
+    parser.add_argument('output_prefix', help='Prefix for output files; matrix i is written to <prefix>_matrix_<i>_zeros.txt.')
+    parser.add_argument("--first", action="store_true", help="Stop at one optimal relabeling instead of collecting all ties.")
+    parser.add_argument("--max-nodes", type=int, default=None, help="Stop after bounding this many prefixes and report the best relabelings found so far (not proven optimal).")
+    parser.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite output files if they exist.")
+    args = parser.parse_args()
+
+    matrices = read_matrices_from_file(args.input_filename)
+    for idx, matrix in enumerate(matrices):
+        output_filename = f"{args.output_prefix}_matrix_{idx + 1}_zeros.txt"
+        if os.path.isfile(output_filename) and not args.yes:
+            print(f"Error: Output file '{output_filename}' already exists. Use -y to overwrite.")
+            exit(1)
+
+        max_zeros, perms, nodes, complete = search_max_zero_relabelings(matrix, keep_ties=not args.first, max_nodes=args.max_nodes)
+        if not perms:
+            print(f"Matrix {idx + 1}: no incumbent within the node budget ({nodes} search nodes), nothing saved.")
+            continue
+        # Report in permutations.py row order so the file matches check_zeros.py output
+        perms.sort(key=permutation_rank)
+        transformed = finite_difference_transform_stack(relabel_batch(matrix, np.array(perms)), order=1)
+        row_indices = [permutation_rank(p) + 1 for p in perms]
+        write_zeros_file(output_filename, max_zeros, row_indices, transformed)
+        status = "optimal" if complete else "best found, not proven optimal"
+        print(f"Matrix {idx + 1}: {len(perms)} relabelings with {max_zeros} zeros ({status}, {nodes} search nodes) saved to '{output_filename}'.")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,25 @@
-import sympy as sp
+import numpy as np
 import argparse
+import math
+from fractions import Fraction
 import ast  # To safely evaluate the matrix format from text
 
 # Set default size and coefficient matrix globally
 n = 4
-coeff_matrix = sp.Matrix([[1, 1, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0, 1]])
+coeff_matrix = [[1, 1, 0, 0], [1, 0, 0, 0], [1, 0, 0, 0], [0, 0, 0, 1]]
 
-# Function to read multiple matrices from a text file
-def read_matrices_from_file(filename):
+# Function to read multiple matrices from a text file (as SymPy matrices, or as plain lists)
+def read_matrices_from_file(filename, as_lists=False):
     matrices = []
     with open(filename, 'r') as file:
         lines = file.readlines()
         for line in lines:
             line = line.strip()
             if line:
-                matrix = sp.Matrix(ast.literal_eval(line))  # Convert each line to a SymPy matrix
+                matrix = ast.literal_eval(line)
+                if not as_lists:
+                    import sympy as sp
+                    matrix = sp.Matrix(matrix)  # Convert each line to a SymPy matrix
                 matrices.append(matrix)
     return matrices
 
@@ -22,7 +27,8 @@ def read_matrices_from_file(filename):
 def write_matrices_to_file(matrices, filename):
     with open(filename, 'w') as file:
         for matrix in matrices:
-            file.write(str(matrix.tolist()).replace(" ", "") + "\n")
+            rows = matrix.tolist() if hasattr(matrix, 'tolist') else matrix
+            file.write(str(rows).replace(" ", "") + "\n")
     print(f"\nResults have been saved to {filename}")
 
 # Function to print row and column sums, and check for symmetry
@@ -35,55 +41,131 @@ def analyze_matrix(matrix):
     print("Column sums:", col_sums)
     print("Symmetric:", is_symmetric)
 
+TITLES = {
+    'forward': "\nComputed matrix `a_star` from forward process with constant coefficients:",
+    'inverse': "\nReconstructed matrix `a` from inverse process with constant coefficients:",
+}
+
+# Affine maps of the forward and inverse processes, keyed by (process, n, coefficients)
+_OPERATORS = {}
+
+def _fraction(value):
+    # Exact value of an int, float, Fraction or SymPy number (SymPy ones go through their text)
+    return Fraction(value) if isinstance(value, (int, float, Fraction)) else Fraction(str(value))
+
+def process_operator(process, n, coeff_matrix):
+    """
+    The forward or inverse process as one exact affine map of row-major flattened matrices.
+
+    forward: a_star = offset - L a, with L[(i, j), (i', j')] = coeff_matrix[i'][j'] for i' <= i, j' <= j
+    and offset[(i, j)] = (i + 1) + (j + 1). L is lower triangular, so the inverse process
+    a = L^-1 (offset - a_star) exists exactly when every coefficient is nonzero.
+
+    Returns:
+    - (P, q, d) with result = (P @ x + q) / d: P and q hold Python integers, d is a positive integer.
+    """
+    rows = coeff_matrix.tolist() if hasattr(coeff_matrix, 'tolist') else coeff_matrix
+    coeffs = tuple(tuple(_fraction(rows[i][j]) for j in range(n)) for i in range(n))
+    key = (process, n, coeffs)
+    if key not in _OPERATORS:
+        size = n * n
+        L = [[Fraction(0)] * size for _ in range(size)]
+        for i in range(n):
+            for j in range(n):
+                for i_prime in range(i + 1):
+                    for j_prime in range(j + 1):
+                        L[i * n + j][i_prime * n + j_prime] = coeffs[i_prime][j_prime]
+        offset = [Fraction((i + 1) + (j + 1)) for i in range(n) for j in range(n)]
+
+        if process == 'forward':
+            M, v = [[-x for x in row] for row in L], offset
+        else:
+            zeros = [(i, j) for i in range(n) for j in range(n) if coeffs[i][j] == 0]
+            if zeros:
+                raise ValueError(f"The inverse process is not unique: the coefficients at {zeros} are zero.")
+            # L^-1 by forward substitution, one row at a time (L is lower triangular)
+            L_inv = [[Fraction(0)] * size for _ in range(size)]
+            for k in range(size):
+                for col in range(k):
+                    L_inv[k][col] = -sum(L[k][m] * L_inv[m][col] for m in range(col, k)) / L[k][k]
+                L_inv[k][k] = 1 / L[k][k]
+            M = [[-x for x in row] for row in L_inv]
+            v = [sum(L_inv[k][m] * offset[m] for m in range(k + 1)) for k in range(size)]
+
+        # Common denominator, so the batched product stays in integers
+        d = math.lcm(*(x.denominator for row in M for x in row), *(x.denominator for x in v))
+        P = np.array([[int(x * d) for x in row] for row in M], dtype=object)
+        q = np.array([int(x * d) for x in v], dtype=object)
+        _OPERATORS[key] = (P, q, d)
+    return _OPERATORS[key]
+
+def apply_process(process, matrices, n, coeff_matrix):
+    """
+    Runs the forward or inverse process on a batch of n x n matrices with one matrix product.
+
+    Parameters:
+    - process: 'forward' (a -> a_star) or 'inverse' (a_star -> a).
+    - matrices: SymPy matrices or lists of lists with integer or rational entries.
+    - n, coeff_matrix: Size and coefficients of the process.
+
+    Returns:
+    - List of n x n lists with exact entries (integers, or SymPy rationals when the map divides).
+    """
+    return apply_operator(process_operator(process, n, coeff_matrix), matrices, n)
+
+def apply_operator(operator, matrices, n):
+    """
+    Applies an exact affine map (P, q, d) as returned by process_operator to a batch of n x n
+    matrices, see apply_process.
+    """
+    P, q, d = operator
+    values = [value for m in matrices for row in (m.tolist() if hasattr(m, 'tolist') else m) for value in row]
+    if not values:
+        return []
+    if all(type(value) is int for value in values):
+        X = np.array(values, dtype=object).reshape(len(matrices), n * n)
+    else:
+        # Rational inputs are scaled to integers by their common denominator e
+        values = [_fraction(value) for value in values]
+        e = math.lcm(*{value.denominator for value in values})
+        X = np.array([int(value * e) for value in values], dtype=object).reshape(len(matrices), n * n)
+        q, d = q * e, d * e
+
+    # Machine integers when no product or sum can overflow, Python integers otherwise
+    bound = max(abs(x) for x in P.flat) * max(abs(x) for x in X.flat) * n * n + max(abs(x) for x in q)
+    if bound < 2 ** 62:
+        Y = X.astype(np.int64) @ P.astype(np.int64).T + q.astype(np.int64)
+    else:
+        Y = X.dot(P.T) + q
+
+    if d != 1:
+        import sympy as sp
+    results = []
+    for y in Y.tolist():
+        values = y if d == 1 else [value // d if value % d == 0 else sp.Rational(value, d) for value in y]
+        results.append([values[i * n:(i + 1) * n] for i in range(n)])
+    return results
+
 # Compute a_star from a (Forward process) with constant coefficients
 def forward_a_star(a_values, n):
-    a = sp.MatrixSymbol('a', n, n)
-    a_star = sp.MatrixSymbol('a_star', n, n)
-    equations = []
-    
-    for i in range(n):
-        for j in range(n):
-            sum_expr = sum(coeff_matrix[i_prime, j_prime] * a[i_prime, j_prime] 
-                           for i_prime in range(i + 1) for j_prime in range(j + 1))
-            equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1) - sum_expr)
-            equations.append(equation)
-    
-    # Substitute values into a and solve for a_star
-    a_subs = {a[i, j]: a_values[i, j] for i in range(n) for j in range(n)}
-    solution = sp.solve(equations, [a_star[i, j] for i in range(n) for j in range(n)])
-    a_star_values = {k: v.subs(a_subs) for k, v in solution.items()}
-    
-    a_star_matrix = sp.Matrix(n, n, lambda i, j: a_star_values[a_star[i, j]])
-    print("\nComputed matrix `a_star` from forward process with constant coefficients:")
-    sp.pprint(a_star_matrix)
-    analyze_matrix(a_star_matrix)
+    import sympy as sp
+    a_star_matrix = sp.Matrix(apply_process('forward', [a_values], n, coeff_matrix)[0])
+    report_matrix(TITLES['forward'], a_star_matrix)
     return a_star_matrix
 
 # Compute a from a_star (Inverse process) with constant coefficients
 def inverse_a_star(a_star_values, n):
-    a = sp.MatrixSymbol('a', n, n)
-    a_star = sp.MatrixSymbol('a_star', n, n)
-    equations = []
-    
-    for i in range(n):
-        for j in range(n):
-            sum_expr = sum(coeff_matrix[i_prime, j_prime] * a[i_prime, j_prime] 
-                           for i_prime in range(i + 1) for j_prime in range(j + 1))
-            equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1) - sum_expr)
-            equations.append(equation)
-    
-    # Substitute values into a_star and solve for a
-    a_star_subs = {a_star[i, j]: a_star_values[i, j] for i in range(n) for j in range(n)}
-    solution = sp.solve(equations, [a[i, j] for i in range(n) for j in range(n)])
-    print(solution)
-    a_reconstructed_values = {k: v.subs(a_star_subs) for k, v in solution.items()}
-    
-    a_reconstructed_matrix = sp.Matrix(n, n, lambda i, j: a_reconstructed_values[a[i, j]])
-    print("\nReconstructed matrix `a` from inverse process with constant coefficients:")
-    sp.pprint(a_reconstructed_matrix)
-    analyze_matrix(a_reconstructed_matrix)
+    import sympy as sp
+    a_reconstructed_matrix = sp.Matrix(apply_process('inverse', [a_star_values], n, coeff_matrix)[0])
+    report_matrix(TITLES['inverse'], a_reconstructed_matrix)
     return a_reconstructed_matrix
 
+def report_matrix(title, matrix):
+    import sympy as sp
+    print(title)
+    sp.pprint(matrix)
+    analyze_matrix(matrix)
+
 # Main function to handle arguments and run the specified computation on each matrix
 def main():
     parser = argparse.ArgumentParser(description="Compute a_star from a (forward) or a from a_star (inverse) for multiple matrices with constant coefficients.")
@@ -91,27 +173,30 @@ def main():
     parser.add_argument("input_filename", type=str, help="The path to the file containing the input matrix values")
     parser.add_argument("output_filename", type=str, help="The path for the output file to save results")
     parser.add_argument("process", choices=['forward', 'inverse'], help="Specify 'forward' for a -> a_star or 'inverse' for a_star -> a")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not print every result matrix and its row/column sums")
     
     args = parser.parse_args()
     global n, coeff_matrix  # Update global values
     n = args.n
-    coeff_matrix = sp.Matrix([[1,1,0,0],[1,0,0,0],[1,0,0,0],[0,0,0,1]])
+    coeff_matrix = [[1,1,0,0],[1,0,0,0],[1,0,0,0],[0,0,0,1]]
 
     input_filename = args.input_filename
     output_filename = args.output_filename
     process = args.process
     
     # Read all matrices from the file
-    matrices = read_matrices_from_file(input_filename)
-    results = []
+    matrices = read_matrices_from_file(input_filename, as_lists=True)
 
-    # Process each matrix according to the specified process
-    for matrix_values in matrices:
-        if process == 'forward':
-            result = forward_a_star(matrix_values, n)
-        elif process == 'inverse':
-            result = inverse_a_star(matrix_values, n)
-        results.append(result)
+    # Process all matrices at once with the cached linear map of the process
+    try:
+        results = apply_process(process, matrices, n, coeff_matrix)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+    if not args.quiet:
+        import sympy as sp
+        for result in results:
+            report_matrix(TITLES[process], sp.Matrix(result))
 
     # Write all results to the output file
     write_matrices_to_file(results, output_filename)
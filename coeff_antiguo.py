@@ -1,6 +1,6 @@
-import sympy as sp
 import argparse
 import ast  # To safely evaluate the matrix format from text
+from coeff import TITLES, apply_process
 
 # Set the coefficient matrix globally with all elements as 2 (or any other constant value)
 # This applies a constant coefficient across all elements in the summation
@@ -24,7 +24,8 @@ def read_matrices_from_file(filename):
 def write_matrices_to_file(matrices, filename):
     with open(filename, 'w') as file:
         for matrix in matrices:
-            file.write(str(matrix.tolist()).replace(" ", "") + "\n")
+            rows = matrix.tolist() if hasattr(matrix, 'tolist') else matrix
+            file.write(str(rows).replace(" ", "") + "\n")
     print(f"\nResults have been saved to {filename}")
 
 # Function to print row and column sums, and check for symmetry
@@ -39,56 +40,19 @@ def analyze_matrix(matrix):
 
 # Compute a_star from a (Forward process) with constant coefficients
 def forward_a_star(a_values, n):
-    a = sp.MatrixSymbol('a', n, n)
-    a_star = sp.MatrixSymbol('a_star', n, n)
-    equations = []
-    
-    for i in range(n):
-        for j in range(n):
-            sum_expr = 0
-            for i_prime in range(i + 1):
-                for j_prime in range(j + 1):
-                    # Use the constant coefficient matrix globally defined
-                    sum_expr += coeff_matrix[i_prime][j_prime] * a[i_prime, j_prime]
-            equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1) - sum_expr)
-            equations.append(equation)
-    
-    # Substitute values into a and solve for a_star
-    a_subs = {a[i, j]: a_values[i][j] for i in range(n) for j in range(n)}
-    solution = sp.solve(equations, [a_star[i, j] for i in range(n) for j in range(n)])
-    a_star_values = {k: v.subs(a_subs) for k, v in solution.items()}
-    
-    # Create the computed a_star matrix
-    a_star_matrix = sp.Matrix(n, n, lambda i, j: a_star_values[a_star[i, j]])
-    print("\nComputed matrix `a_star` from forward process with constant coefficients:")
+    # Cached linear map of the process instead of solving the equations again
+    import sympy as sp
+    a_star_matrix = sp.Matrix(apply_process('forward', [a_values], n, coeff_matrix)[0])
+    print(TITLES['forward'])
     sp.pprint(a_star_matrix)
     analyze_matrix(a_star_matrix)
     return a_star_matrix
 
 # Compute a from a_star (Inverse process) with constant coefficients
 def inverse_a_star(a_star_values, n):
-    a = sp.MatrixSymbol('a', n, n)
-    a_star = sp.MatrixSymbol('a_star', n, n)
-    equations = []
-    
-    for i in range(n):
-        for j in range(n):
-            sum_expr = 0
-            for i_prime in range(i + 1):
-                for j_prime in range(j + 1):
-                    # Use the constant coefficient matrix globally defined
-                    sum_expr += coeff_matrix[i_prime][j_prime] * a[i_prime, j_prime]
-            equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1) - sum_expr)
-            equations.append(equation)
-    
-    # Substitute values into a_star and solve for a
-    a_star_subs = {a_star[i, j]: a_star_values[i][j] for i in range(n) for j in range(n)}
-    solution = sp.solve(equations, [a[i, j] for i in range(n) for j in range(n)])
-    a_reconstructed_values = {k: v.subs(a_star_subs) for k, v in solution.items()}
-    
-    # Create the reconstructed a matrix
-    a_reconstructed_matrix = sp.Matrix(n, n, lambda i, j: a_reconstructed_values[a[i, j]])
-    print("\nReconstructed matrix `a` from inverse process with constant coefficients:")
+    import sympy as sp
+    a_reconstructed_matrix = sp.Matrix(apply_process('inverse', [a_star_values], n, coeff_matrix)[0])
+    print(TITLES['inverse'])
     sp.pprint(a_reconstructed_matrix)
     analyze_matrix(a_reconstructed_matrix)
     return a_reconstructed_matrix
@@ -100,6 +64,7 @@ def main():
     parser.add_argument("input_filename", type=str, help="The path to the file containing the input matrix values")
     parser.add_argument("output_filename", type=str, help="The path for the output file to save results")
     parser.add_argument("process", choices=['forward', 'inverse'], help="Specify 'forward' for a -> a_star or 'inverse' for a_star -> a")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not print every result matrix and its row/column sums")
     
     args = parser.parse_args()
     global n  # Update the global `n` if it's passed as an argument
@@ -115,15 +80,19 @@ def main():
     
     # Read all matrices from the file
     matrices = read_matrices_from_file(input_filename)
-    results = []
 
-    # Process each matrix according to the specified process
-    for matrix_values in matrices:
-        if process == 'forward':
-            result = forward_a_star(matrix_values, n)
-        elif process == 'inverse':
-            result = inverse_a_star(matrix_values, n)
-        results.append(result)
+    # Process all matrices at once with the cached linear map of the process
+    try:
+        results = apply_process(process, matrices, n, coeff_matrix)
+    except ValueError as e:
+        print(f"Error: {e}")
+        exit(1)
+    if not args.quiet:
+        import sympy as sp
+        for result in results:
+            print(TITLES[process])
+            sp.pprint(sp.Matrix(result))
+            analyze_matrix(sp.Matrix(result))
 
     # Write all results to the output file
     write_matrices_to_file(results, output_filename)
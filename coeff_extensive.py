@@ -1,9 +1,23 @@
 from tqdm import tqdm  # Import tqdm for progress tracking
-import sympy as sp
+import numpy as np
 import itertools
 import argparse
 import ast  # To safely evaluate the matrix format from text
 
+# Search for binary coefficient matrices C that make the forward process
+#     a_star[i, j] = (i + 1) + (j + 1) - sum_{i' <= i, j' <= j} C[i', j'] * a[i', j']
+# give only entries -1, 0 and 1.
+#
+# The weighted sums are 2-D prefix sums of C * a, so a_star is evaluated with NumPy for whole
+# blocks of coefficient matrices at once instead of one sp.solve per matrix. The coefficients
+# are assigned cell by cell in row-major order (the order of generate_binary_matrices, 0 before
+# 1): once cell (i, j) is set the prefix sum at (i, j) is final, so a partial assignment whose
+# a_star[i, j] is already out of range is dropped together with all of its completions. Blocks
+# of partial assignments are extended depth first, which keeps memory bounded and finds the
+# first valid matrix in enumeration order, so the reported index is the one of the old search.
+
+BLOCK_SIZE = 65536
+
 # Set matrix size
 n = 4  # Adjust the size as needed
 
@@ -36,6 +50,7 @@ def write_matrices_to_file(matrices, filename):
 
 # Compute a_star from a (Forward process) with given coefficients
 def forward_a_star(a_values, n, coeff_matrix):
+    import sympy as sp
     a = sp.MatrixSymbol('a', n, n)
     a_star = sp.MatrixSymbol('a_star', n, n)
     equations = []
@@ -63,12 +78,95 @@ def forward_a_star(a_values, n, coeff_matrix):
 def is_valid_matrix(matrix):
     return all(element in [-1, 0, 1] for element in matrix)
 
+# Forward process for a block of coefficient matrices
+def prefix_residuals(a_values, coeff_matrices):
+    """
+    a_star of one input matrix for a stack of coefficient matrices.
+
+    Parameters:
+    - a_values: n x n integer array-like (or a stack, broadcast against coeff_matrices).
+    - coeff_matrices: Array of shape (K, n, n).
+
+    Returns:
+    - Integer array of shape (K, n, n), a_star for every coefficient matrix.
+    """
+    a = np.asarray(a_values, dtype=np.int64)
+    n = a.shape[-1]
+    target = np.add.outer(np.arange(1, n + 1), np.arange(1, n + 1))
+    weighted = np.asarray(coeff_matrices, dtype=np.int64) * a
+    return target - weighted.cumsum(axis=-2).cumsum(axis=-1)
+
+def _extend(a, target, i, j, bits, sums):
+    # Both choices of C[i, j] for every partial assignment, parent by parent with 0 before 1,
+    # keeping those with a_star[i, j] in {-1, 0, 1}
+    n = len(a)
+    base = np.zeros(len(bits), dtype=np.int64)
+    if i > 0:
+        base += sums[:, i - 1, j]
+    if j > 0:
+        base += sums[:, i, j - 1]
+    if i > 0 and j > 0:
+        base -= sums[:, i - 1, j - 1]
+    value = np.repeat(base, 2)
+    value[1::2] += a[i, j]
+    child = np.flatnonzero(np.abs(target[i, j] - value) <= 1)
+    parent, choice, value = child >> 1, child & 1, value[child]
+    bits, sums = bits[parent], sums[parent]
+    bits[:, i * n + j] = choice
+    sums[:, i, j] = value
+    return bits, sums
+
+def search_coefficients(a_values, n, find_all=False, block_size=BLOCK_SIZE, prefix=()):
+    """
+    Binary coefficient matrices for which the forward process of a_values lies in {-1, 0, 1}.
+
+    Parameters:
+    - a_values: n x n integer matrix.
+    - n: The size of the matrix.
+    - find_all: Return every valid coefficient matrix instead of the first one.
+    - block_size: Most partial assignments extended at once.
+    - prefix: Fixed values of the first coefficients in row-major order, which restricts the
+      search to one aligned range of indices (empty searches all of them).
+
+    Returns:
+    - List of (index, coeff_matrix, a_star) in enumeration order, with index the 0-based
+      position of coeff_matrix in generate_binary_matrices(n) and both matrices n x n arrays.
+    """
+    a = np.asarray(a_values, dtype=np.int64).reshape(n, n)
+    target = np.add.outer(np.arange(1, n + 1), np.arange(1, n + 1))
+    found = []
+    bits, sums = np.zeros((1, n * n), dtype=np.uint8), np.zeros((1, n, n), dtype=np.int64)
+    for cell, bit in enumerate(prefix):
+        bits, sums = _extend(a, target, cell // n, cell % n, bits, sums)
+        keep = bits[:, cell] == bit
+        bits, sums = bits[keep], sums[keep]
+    # Stack of (next cell, bits, prefix sums); the block on top comes first in enumeration order
+    stack = [(len(prefix), bits, sums)]
+    while stack:
+        cell, bits, sums = stack.pop()
+        if cell == n * n:
+            for row, s in zip(bits, sums):
+                index = int(''.join(map(str, row.tolist())), 2)
+                found.append((index, row.reshape(n, n).astype(np.int64), target - s))
+                if not find_all:
+                    return found
+            continue
+        bits, sums = _extend(a, target, cell // n, cell % n, bits, sums)
+        starts = range(0, len(bits), block_size)
+        for start in reversed(starts):
+            stack.append((cell + 1, bits[start:start + block_size], sums[start:start + block_size]))
+    return found
+
 # Main function to handle arguments and run the specified computation on each matrix
 def main():
+    import sympy as sp
     parser = argparse.ArgumentParser(description="Compute a_star from a (forward) or a from a_star (inverse) for multiple matrices with binary coefficient matrix exploration.")
     parser.add_argument("n", type=int, help="The size of the matrix (n x n)")
     parser.add_argument("input_filename", type=str, help="The path to the file containing the input matrix values")
     parser.add_argument("output_filename", type=str, help="The path for the output file to save results")
+    parser.add_argument("--all", action="store_true", help="Keep every valid coefficient matrix instead of the first one")
+    parser.add_argument("--coeff-output", type=str, default=None, help="Also save the passing coefficient matrices, line by line with the results")
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE, help="Partial coefficient matrices evaluated at once")
     
     args = parser.parse_args()
     global n  # Update the global `n` if it's passed as an argument
@@ -80,30 +178,29 @@ def main():
     # Read all matrices from the file
     matrices = read_matrices_from_file(input_filename)
     results = []
-    
-    # Generate all possible binary coefficient matrices
-    binary_matrices = generate_binary_matrices(n)
-
-    # Process each input matrix and find a valid coefficient matrix
-    for matrix_values in matrices:
-        found_valid = False
-        print(f"\nTesting input matrix: {matrix_values}")
-        
-        # Use tqdm to track progress for binary_matrices
-        for index, coeff_matrix in enumerate(tqdm(binary_matrices, desc="Testing coefficient matrices")):
-            result_matrix = forward_a_star(matrix_values, n, coeff_matrix)
-            if is_valid_matrix(result_matrix):
-                print(f"Coefficient matrix {index + 1} passed:")
-                sp.pprint(sp.Matrix(coeff_matrix))
-                results.append(result_matrix)
-                found_valid = True
-                break
-
-        if not found_valid:
-            print("No valid coefficient matrix found for this input matrix.")
+    coefficients = []
+
+    # Process each input matrix and search its valid coefficient matrices
+    for matrix_values in tqdm(matrices, desc="Searching coefficient matrices"):
+        tqdm.write(f"\nTesting input matrix: {matrix_values}")
+        found = search_coefficients(matrix_values, n, find_all=args.all, block_size=args.block_size)
+
+        if not found:
+            tqdm.write("No valid coefficient matrix found for this input matrix.")
+            continue
+        index, coeff_matrix, _ = found[0]
+        tqdm.write(f"Coefficient matrix {index + 1} passed:")
+        tqdm.write(sp.pretty(sp.Matrix(coeff_matrix.tolist())))
+        if args.all:
+            tqdm.write(f"{len(found)} valid coefficient matrices in total.")
+        for _, coeff_matrix, result_matrix in found:
+            results.append(result_matrix)
+            coefficients.append(coeff_matrix)
 
     # Write all results to the output file
     write_matrices_to_file(results, output_filename)
+    if args.coeff_output:
+        write_matrices_to_file(coefficients, args.coeff_output)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,5 +1,3 @@
-import sympy as sp  # For symbolic math operations and solving equations
-import itertools  # To generate binary matrices
 import argparse  # For command-line argument parsing
 import ast  # To safely evaluate strings as Python literals, used for reading matrices from files
 
@@ -9,8 +7,10 @@ specified_index = 51329  # Set the index of the binary matrix to test (0-based i
 
 # Function to generate the specific binary matrix at a given index
 def get_binary_matrix_at_index(n, index):
-    values = list(itertools.product([0, 1], repeat=n*n))[index]
-    return [list(values[i * n:(i + 1) * n]) for i in range(n)]
+    # The index read in binary, first element most significant (the itertools.product order),
+    # without building the other 2^(n*n) - 1 matrices
+    values = [(index >> (n * n - 1 - k)) & 1 for k in range(n * n)]
+    return [values[i * n:(i + 1) * n] for i in range(n)]
 
 # Function to read multiple matrices from a text file
 def read_matrices_from_file(filename):
@@ -37,6 +37,7 @@ def is_valid_matrix(matrix):
 
 # Compute a_star from a (Forward process) with given coefficients
 def forward_a_star(a_values, n, coeff_matrix):
+    import sympy as sp  # For symbolic math operations and solving equations
     a = sp.MatrixSymbol('a', n, n)
     a_star = sp.MatrixSymbol('a_star', n, n)
     equations = []
@@ -63,10 +64,15 @@ def main():
     parser.add_argument("n", type=int, help="The size of the matrix (n x n)")
     parser.add_argument("input_filename", type=str, help="The path to the file containing the input matrix values")
     parser.add_argument("output_filename", type=str, help="The path for the output file to save results")
+    parser.add_argument("-i", "--index", type=int, default=specified_index, help="0-based index of the binary coefficient matrix to test")
     
     args = parser.parse_args()
     global n  
     n = args.n
+    index = args.index
+    if not 0 <= index < 2 ** (n * n):
+        print(f"Error: Index {index} is out of range for {n}x{n} coefficient matrices.")
+        exit(1)
     input_filename = args.input_filename
     output_filename = args.output_filename
     
@@ -75,17 +81,18 @@ def main():
     results = []
     
     # Retrieve the specific binary coefficient matrix
-    coeff_matrix = get_binary_matrix_at_index(n, specified_index)
+    coeff_matrix = get_binary_matrix_at_index(n, index)
     
     # Process each input matrix
     for matrix_values in matrices:
         result_matrix = forward_a_star(matrix_values, n, coeff_matrix)
         if is_valid_matrix(result_matrix):
-            print(f"\nCoefficient matrix {specified_index + 1} passed:")
+            print(f"\nCoefficient matrix {index + 1} passed:")
+            import sympy as sp
             sp.pprint(sp.Matrix(coeff_matrix))
             results.append(result_matrix)
         else:
-            print(f"\nCoefficient matrix {specified_index + 1} did not pass.")
+            print(f"\nCoefficient matrix {index + 1} did not pass.")
     
     # Write all results to the output file
     write_matrices_to_file(results, output_filename)
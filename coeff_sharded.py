@@ -0,0 +1,248 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from tqdm import tqdm
+import numpy as np
+from coeff_extensive import read_matrices_from_file, write_matrices_to_file, prefix_residuals, search_coefficients
+from coeff_extensive_1 import get_binary_matrix_at_index
+
+# Sharded, resumable version of the coeff_extensive.py search.
+#
+# The 2^(n*n) coefficient matrix indices are split into a power of two of aligned shards, so
+# a shard is the index range whose leading bits (the first coefficients in row-major order)
+# are the shard number. A worker searches one shard for a list of input matrices with
+# search_coefficients, starting from that prefix, so shards whose prefix already fails are
+# dropped at once. Shards are handed to a process pool in index order.
+#
+# Every finished shard is written to <state_dir>/shard_<k>.json (which inputs were searched
+# and how far, and their hits) and the manifest records n, the shard count and a digest of the inputs. A
+# rerun with the same state directory skips what the shard files already cover, so an
+# interrupted search resumes where it stopped. With --stop-when-found an input only needs
+# the shards up to its first hit, and the search ends once every input has one.
+
+DEFAULT_STATE_DIR = '.coeff_search'
+MANIFEST_FILE = 'manifest.json'
+
+# Step 1: Shards
+def shard_prefix(shard, shards):
+    """
+    Leading coefficients shared by every index of a shard, most significant first.
+    """
+    prefix_bits = shards.bit_length() - 1
+    return tuple((shard >> (prefix_bits - 1 - k)) & 1 for k in range(prefix_bits))
+
+def search_shard(task):
+    """
+    Searches one shard for several input matrices.
+
+    Parameters:
+    - task: (shard, n, shards, inputs, find_all) with inputs a list of (input number, matrix).
+
+    Returns:
+    - (shard, {input number: {'mode': 'all' or 'first', 'hits': [indices]}}).
+    """
+    shard, n, shards, inputs, find_all = task
+    prefix = shard_prefix(shard, shards)
+    mode = 'all' if find_all else 'first'
+    # The a_star entries of the prefix cells only depend on the prefix, so they are checked for
+    # all inputs at once and only inputs that pass are searched further
+    coeff_matrix = np.zeros(n * n, dtype=np.int64)
+    coeff_matrix[:len(prefix)] = prefix
+    residuals = prefix_residuals(np.array([matrix for _, matrix in inputs]), coeff_matrix.reshape(n, n))
+    viable = (np.abs(residuals.reshape(len(inputs), -1)[:, :len(prefix)]) <= 1).all(axis=1)
+    result = {}
+    for (number, matrix), ok in zip(inputs, viable):
+        hits = search_coefficients(matrix, n, find_all=find_all, prefix=prefix) if ok else []
+        result[number] = {'mode': mode, 'hits': [index for index, _, _ in hits]}
+    return shard, result
+
+# Step 2: Checkpoints
+def _shard_path(state_dir, shard):
+    return os.path.join(state_dir, f"shard_{shard}.json")
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as file:
+        file.write(json.dumps(data, separators=(',', ':')))
+    os.replace(tmp_path, path)
+
+def open_state(state_dir, n, shards, matrices, restart=False):
+    """
+    Loads the finished shards of a search, or starts a new one.
+
+    Returns:
+    - Dict mapping shard -> {input number: record}, or None if the directory holds another search
+      (different n, shard count or inputs) and restart is not set.
+    """
+    manifest = {'n': n, 'shards': shards,
+                'inputs': hashlib.sha256(json.dumps(matrices).encode()).hexdigest()}
+    manifest_path = os.path.join(state_dir, MANIFEST_FILE)
+    os.makedirs(state_dir, exist_ok=True)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, 'r') as file:
+            if json.load(file) != manifest and not restart:
+                return None
+    if restart:
+        for name in os.listdir(state_dir):
+            if name.startswith('shard_'):
+                os.remove(os.path.join(state_dir, name))
+    _write_json(manifest_path, manifest)
+
+    records = {}
+    for name in os.listdir(state_dir):
+        if name.startswith('shard_') and name.endswith('.json'):
+            with open(os.path.join(state_dir, name), 'r') as file:
+                data = json.load(file)
+            hits = data['hits']
+            records[data['shard']] = {number: {'mode': mode, 'hits': hits.get(str(number), [])}
+                                      for mode, numbers in data['searched'].items() for number in numbers}
+    return records
+
+def save_shard(state_dir, shard, record):
+    # Inputs listed by how far they were searched, hits only where there are some
+    searched = {'all': [], 'first': []}
+    hits = {}
+    for number, value in sorted(record.items()):
+        searched[value['mode']].append(number)
+        if value['hits']:
+            hits[str(number)] = value['hits']
+    _write_json(_shard_path(state_dir, shard), {'shard': shard, 'searched': searched, 'hits': hits})
+
+# Step 3: Scheduling
+def _pending(records, shard, count, find_all, first_hit):
+    # Inputs the shard still has to be searched for
+    record = records.get(shard, {})
+    if find_all:
+        return [number for number in range(count) if record.get(number, {}).get('mode') != 'all']
+    return [number for number in range(count) if number not in record and first_hit.get(number, shard) >= shard]
+
+def run_search(matrices, n, shards, state_dir, records, jobs=1, stop_when_found=False):
+    """
+    Searches every shard that is not checkpointed yet and returns the valid indices per input.
+
+    Parameters:
+    - matrices: Input matrices (lists of lists).
+    - n: The size of the matrices.
+    - shards: Number of shards, a power of two.
+    - state_dir: Directory of the shard files.
+    - records: Finished shards from open_state, updated in place.
+    - jobs: Number of worker processes (1 searches in this process).
+    - stop_when_found: Only look for the first valid coefficient matrix of every input.
+
+    Returns:
+    - List with the sorted valid indices of every input (only the first one with stop_when_found).
+    """
+    if not matrices:
+        return []
+    find_all = not stop_when_found
+    first_hit = {}
+    for shard, record in records.items():
+        for number, value in record.items():
+            if value['hits']:
+                first_hit[number] = min(first_hit.get(number, shard), shard)
+
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    in_flight = {}
+    next_shard = 0
+    progress = tqdm(total=shards, desc="Searching shards")
+    try:
+        while True:
+            # Keep the pool busy with the next shards in index order
+            while len(in_flight) < max(2 * jobs, 1) and next_shard < shards:
+                if not find_all and len(first_hit) == len(matrices) and max(first_hit.values()) < next_shard:
+                    # Every input has a hit before this shard, nothing further can come first
+                    progress.update(shards - next_shard)
+                    next_shard = shards
+                    break
+                pending = _pending(records, next_shard, len(matrices), find_all, first_hit)
+                if pending:
+                    task = (next_shard, n, shards, [(number, matrices[number]) for number in pending], find_all)
+                    if executor:
+                        future = executor.submit(search_shard, task)
+                    else:
+                        future = Future()
+                        future.set_result(search_shard(task))
+                    in_flight[future] = next_shard
+                else:
+                    progress.update(1)
+                next_shard += 1
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard, result = future.result()
+                del in_flight[future]
+                record = records.setdefault(shard, {})
+                record.update(result)
+                save_shard(state_dir, shard, record)
+                for number, value in result.items():
+                    if value['hits']:
+                        first_hit[number] = min(first_hit.get(number, shard), shard)
+                progress.update(1)
+    except KeyboardInterrupt:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+        progress.close()
+        print(f"\nInterrupted: finished shards are saved in '{state_dir}', rerun the same command to resume.")
+        exit(1)
+    if executor:
+        executor.shutdown()
+    progress.close()
+
+    found = [sorted(set(index for record in records.values() for index in record.get(number, {}).get('hits', [])))
+             for number in range(len(matrices))]
+    return [hits[:1] for hits in found] if stop_when_found else found
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the binary coefficient matrices of many input matrices in parallel shards, resumable after interruption.")
+    parser.add_argument("n", type=int, help="The size of the matrix (n x n)")
+    parser.add_argument("input_filename", type=str, help="The path to the file containing the input matrix values")
+    parser.add_argument("output_filename", type=str, help="The path for the output file to save results")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("-s", "--shards", type=int, default=64, help="Number of shards of the index space (a power of two)")
+    parser.add_argument("--stop-when-found", action="store_true", help="Stop once every input matrix has its first valid coefficient matrix")
+    parser.add_argument("--state-dir", type=str, default=DEFAULT_STATE_DIR, help="Directory of the manifest and the per-shard checkpoints")
+    parser.add_argument("--coeff-output", type=str, default=None, help="Also save the passing coefficient matrices, line by line with the results")
+    parser.add_argument("-f", "--restart", action="store_true", help="Discard the checkpoints in the state directory and start over")
+    args = parser.parse_args()
+
+    n = args.n
+    shards = min(args.shards, 2 ** (n * n))
+    if shards < 1 or shards & (shards - 1):
+        print(f"Error: The number of shards must be a power of two, got {args.shards}.")
+        exit(1)
+    if not os.path.isfile(args.input_filename):
+        print(f"Error: Input file '{args.input_filename}' does not exist.")
+        exit(1)
+
+    matrices = read_matrices_from_file(args.input_filename)
+    records = open_state(args.state_dir, n, shards, matrices, restart=args.restart)
+    if records is None:
+        print(f"Error: State directory '{args.state_dir}' belongs to another search. Use -f to start over.")
+        exit(1)
+    if records:
+        print(f"Resuming from {len(records)} checkpointed shards in '{args.state_dir}'.")
+
+    found = run_search(matrices, n, shards, args.state_dir, records, jobs=args.jobs, stop_when_found=args.stop_when_found)
+
+    results = []
+    coefficients = []
+    for matrix_values, hits in zip(matrices, found):
+        print(f"\nInput matrix: {matrix_values}")
+        if not hits:
+            print("No valid coefficient matrix found for this input matrix.")
+            continue
+        print(f"Coefficient matrix {hits[0] + 1} passed" + ("." if args.stop_when_found else f" ({len(hits)} valid in total)."))
+        coeff_matrices = np.array([get_binary_matrix_at_index(n, index) for index in hits])
+        results.extend(prefix_residuals(matrix_values, coeff_matrices))
+        coefficients.extend(coeff_matrices)
+
+    write_matrices_to_file(results, args.output_filename)
+    if args.coeff_output:
+        write_matrices_to_file(coefficients, args.coeff_output)
+
+if __name__ == '__main__':
+    main()
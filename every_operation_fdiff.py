@@ -1,12 +1,13 @@
 import ast
 import numpy as np
-import matplotlib.pyplot as plt
 import argparse
 import os
-from tqdm import tqdm
+from result_cache import DEFAULT_MAX_BYTES, data_digest, cached_call, report_stats
 
-# Step 1: Read matrices from a file
+# Step 1: Read matrices from a file (text, one matrix per line, or a binary .npy stack)
 def read_matrices(file_path):
+    if file_path.endswith('.npy'):
+        return np.load(file_path)
     matrices = []
     with open(file_path, 'r') as file:
         for line in file:
@@ -28,6 +29,45 @@ def read_matrices(file_path):
 #return sorted_matrix
 #import numpy as np
 
+# Step 3: Pick the narrowest integer dtype that cannot overflow
+def transform_value_bound(order, min_val, max_val):
+    """
+    Upper bound on the absolute value of any entry after `order` rounds of the finite difference transform.
+    
+    Arguments:
+    order : int : The order of the finite difference transformation.
+    min_val : int : Smallest entry of the input matrices.
+    max_val : int : Largest entry of the input matrices.
+    
+    Returns:
+    int : Bound B such that every transformed entry lies in [-B, B].
+    """
+    # The zero padding on the last row/column is part of the value range
+    low, high = min(min_val, 0), max(max_val, 0)
+    bound = max(high, -low)
+    for _ in range(order):
+        # a[i+1, j+1] - a[i+1, j] - a[i, j+1] + a[i, j] is at most twice the range width
+        bound = 2 * (high - low)
+        low, high = -bound, bound
+    return bound
+
+def narrowest_int_dtype(bound):
+    """
+    Return the smallest signed integer dtype that holds every value in [-bound, bound].
+    """
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if bound <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    raise OverflowError(f"No integer dtype can hold transformed values up to {bound}.")
+
+def transform_dtype(matrices, order):
+    """
+    Choose one dtype for a whole stack of matrices so it can be stored as a single array.
+    """
+    min_val = min(int(matrix.min()) for matrix in matrices)
+    max_val = max(int(matrix.max()) for matrix in matrices)
+    return narrowest_int_dtype(transform_value_bound(order, min_val, max_val))
+
 def compute_horizontal_difference(matrix):
     """
     Compute the horizontal finite difference of a matrix.
@@ -39,7 +79,7 @@ def compute_horizontal_difference(matrix):
     np.array : Horizontal differences with the same shape as the input matrix.
     """
     m, n = matrix.shape
-    D_x = np.zeros((m, n), dtype=int)  # Initialize horizontal difference matrix
+    D_x = np.zeros((m, n), dtype=matrix.dtype)  # Initialize horizontal difference matrix
     for i in range(m):
         for j in range(n - 1):
             D_x[i, j] = matrix[i, j + 1] - matrix[i, j]
@@ -56,25 +96,29 @@ def compute_vertical_difference(D_x):
     np.array : Vertical differences with the same shape as the input matrix.
     """
     m, n = D_x.shape
-    D = np.zeros((m, n), dtype=int)  # Initialize vertical difference matrix
+    D = np.zeros((m, n), dtype=D_x.dtype)  # Initialize vertical difference matrix
     for i in range(m - 1):
         for j in range(n):
             D[i, j] = D_x[i + 1, j] - D_x[i, j]
     return D
 
-def finite_difference_transform(matrix, order=2):
+def finite_difference_transform(matrix, order=2, dtype=None):
     """
     Compute the finite difference transformation with intermediate steps on a given matrix.
     
     Arguments:
     matrix : np.array : Input 2D matrix.
     order : int : The order of the finite difference transformation (default is 2).
+    dtype : np.dtype : Integer dtype of the result (default is the narrowest safe dtype for this matrix).
     
     Returns:
     dict : A dictionary with intermediate matrices for each transformation step.
     """
+    if dtype is None:
+        dtype = transform_dtype([matrix], order)
+
     # Initialize the result with the input matrix
-    result = matrix.copy().astype(int)
+    result = matrix.copy().astype(dtype)
     steps = {'Original Matrix': result}
     
     # Apply transformations step-by-step for the given order
@@ -92,16 +136,44 @@ def finite_difference_transform(matrix, order=2):
     
     return result
 
+def finite_difference_transform_stack(matrices, order=2, dtype=None):
+    """
+    Vectorized finite difference transformation of a whole stack of matrices at once.
+    
+    Arguments:
+    matrices : np.array : Input stack with shape (..., m, n).
+    order : int : The order of the finite difference transformation (default is 2).
+    dtype : np.dtype : Integer dtype of the result (default is the narrowest safe dtype for the stack).
+    
+    Returns:
+    np.array : Transformed stack, identical entry by entry to finite_difference_transform.
+    """
+    if dtype is None:
+        dtype = narrowest_int_dtype(transform_value_bound(order, int(matrices.min()), int(matrices.max())))
+
+    result = matrices.astype(dtype)
+    for _ in range(order):
+        # Horizontal difference, last column stays zero
+        D_x = np.zeros_like(result)
+        np.subtract(result[..., :, 1:], result[..., :, :-1], out=D_x[..., :, :-1])
+        # Vertical difference, last row stays zero
+        D = np.zeros_like(result)
+        np.subtract(D_x[..., 1:, :], D_x[..., :-1, :], out=D[..., :-1, :])
+        result = D
+    return result
+
 # Transform Matrix Function
-def transform_matrix(matrix, method='finite_difference', order=2):
+def transform_matrix(matrix, method='finite_difference', order=2, dtype=None):
     if method == 'finite_difference':
-        transformed_matrix = finite_difference_transform(matrix, order=order)
+        transformed_matrix = finite_difference_transform(matrix, order=order, dtype=dtype)
     else:
         raise ValueError(f"Unknown transformation method: {method}")
     return transformed_matrix
 
 # Step 4: Plot and save each matrix as a separate file (optional)
 def plot_and_save_matrices(matrices, output_dir='matrix_plots', annotate=True):
+    import matplotlib.pyplot as plt
+    from tqdm import tqdm
     os.makedirs(output_dir, exist_ok=True)
     all_values = np.concatenate([matrix.flatten() for matrix in matrices])
     min_val, max_val = all_values.min(), all_values.max()
@@ -125,19 +197,41 @@ def plot_and_save_matrices(matrices, output_dir='matrix_plots', annotate=True):
         plt.savefig(f"{output_dir}/matrix_{i + 1}.png")
         plt.close(fig)
 
+# Write matrices as text (one per line) or, for a .npy path, as one binary stack that keeps its dtype
+def write_matrices(file_path, matrices):
+    if file_path.endswith('.npy'):
+        np.save(file_path, np.stack(matrices))
+        return
+    from tqdm import tqdm
+    with open(file_path, 'w') as file:
+        for matrix in tqdm(matrices, desc="Writing matrices to output file"):
+            file.write(f"{matrix.tolist()}\n")
+
 # Step 5: Main function to execute all steps
-def main(input_file, output_file, method, order):
+def main(input_file, output_file, method, order, cache_dir=None, cache_size=DEFAULT_MAX_BYTES):
     matrices = read_matrices(input_file)
-    transformed_matrices = []
-    for matrix in tqdm(matrices, desc="Processing matrices"):
-        #sorted_matrix = sort_matrix_descending(matrix)
-        transformed_matrix = transform_matrix(matrix, method=method, order=order)
-        transformed_matrices.append(transformed_matrix)
+    dtype = transform_dtype(matrices, order)
+
+    def transform_all():
+        from tqdm import tqdm
+        transformed_matrices = []
+        for matrix in tqdm(matrices, desc="Processing matrices"):
+            #sorted_matrix = sort_matrix_descending(matrix)
+            transformed_matrix = transform_matrix(matrix, method=method, order=order, dtype=dtype)
+            transformed_matrices.append(transformed_matrix)
+        return np.stack(transformed_matrices)
+
+    # Identical inputs and parameters are served from the result cache instead of recomputed
+    if cache_dir:
+        transformed_matrices = cached_call(cache_dir, data_digest(np.stack(matrices)), 'transform',
+                                           {'method': method, 'order': order}, transform_all, cache_size)
+    else:
+        transformed_matrices = transform_all()
 
     # Write transformed matrices to the output file
-    with open(output_file, 'w') as file:
-        for matrix in tqdm(transformed_matrices, desc="Writing matrices to output file"):
-            file.write(f"{matrix.tolist()}\n")
+    write_matrices(output_file, transformed_matrices)
+    if cache_dir:
+        report_stats(cache_dir)
 
     # Optional: Plot and save matrices
     # plot_and_save_matrices(transformed_matrices)
@@ -151,6 +245,8 @@ if __name__ == '__main__':
                         help="Transformation method: 'finite_difference'.")
     parser.add_argument("-o", "--order", type=int, default=2, help="Order of the transformation (positive integer).")
     parser.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite output file if it exists.")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Directory of the result cache (disabled if not given).")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2, help="Maximum cache size in MB.")
     args = parser.parse_args()
 
     # Check if the input file exists
@@ -167,4 +263,4 @@ if __name__ == '__main__':
             exit(1)
 
     # Run the script with the specified input and output files and transformation method
-    main(args.input_file, args.output_file, args.method, args.order)
\ No newline at end of file
+    main(args.input_file, args.output_file, args.method, args.order, args.cache_dir, args.cache_size * 1024 ** 2)
\ No newline at end of file
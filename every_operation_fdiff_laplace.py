@@ -1,10 +1,8 @@
 import ast
 import numpy as np
-import matplotlib.pyplot as plt
 import argparse
 import os
 from tqdm import tqdm
-from scipy.signal import convolve2d
 
 # Step 1: Read matrices from a file
 def read_matrices(file_path):
@@ -49,6 +47,7 @@ def finite_difference_transform(matrix, order=1):
 
 # Laplacian Transform Function
 def laplacian_transform(matrix, order=1):
+    from scipy.signal import convolve2d
     if order < 1:
         raise ValueError("Order must be a positive integer.")
 
@@ -79,6 +78,7 @@ def transform_matrix(matrix, method='finite_difference', order=1):
 
 # Step 4: Plot and save each matrix as a separate file (optional)
 def plot_and_save_matrices(matrices, output_dir='matrix_plots', annotate=True):
+    import matplotlib.pyplot as plt
     os.makedirs(output_dir, exist_ok=True)
     all_values = np.concatenate([matrix.flatten() for matrix in matrices])
     min_val, max_val = all_values.min(), all_values.max()
@@ -1,10 +1,8 @@
 import ast
 import numpy as np
-import matplotlib.pyplot as plt
 import argparse
 import os
 from tqdm import tqdm
-from scipy.signal import convolve2d
 
 # Step 1: Read matrices from a file
 def read_matrices(file_path):
@@ -30,6 +28,7 @@ def sort_matrix_descending(matrix):
 
 # Updated Finite Difference Transform Function for First Derivative
 def finite_difference_transform(matrix):
+    from scipy.signal import convolve2d
     # Define the coefficients for the 4th-order centered finite difference approximation of the first derivative
     fd_coefficients = [1, -4, 0, 4, -1]  # Positions: [-2, -1, 0, 1, 2]
 
@@ -65,6 +64,7 @@ def finite_difference_transform(matrix):
 
 # Laplacian Transform Function
 def laplacian_transform(matrix):
+    from scipy.signal import convolve2d
     laplacian_kernel = np.array([[0, 1, 0],
                                  [1, -4, 1],
                                  [0, 1, 0]])
@@ -90,6 +90,7 @@ def transform_matrix(matrix, method='finite_difference'):
 
 # Step 4: Plot and save each matrix as a separate file (optional)
 def plot_and_save_matrices(matrices, output_dir='matrix_plots', annotate=True):
+    import matplotlib.pyplot as plt
     os.makedirs(output_dir, exist_ok=True)
     all_values = np.concatenate([matrix.flatten() for matrix in matrices])
     min_val, max_val = all_values.min(), all_values.max()
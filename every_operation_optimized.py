@@ -3,6 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 import argparse
+from matrix_mosaic import show_mosaic
 
 # Step 1: Read matrices from a file
 def read_matrices(file_path):
@@ -34,33 +35,9 @@ def transform_matrix(matrix):
 
 # Step 4: Plot matrices
 def plot_matrices(matrices, matrices_per_row=4, annotate=True):
-    num_matrices = len(matrices)
-    num_rows = (num_matrices + matrices_per_row - 1) // matrices_per_row
-
-    # Determine color map bounds based on the range of data
-    all_values = np.concatenate([matrix.flatten() for matrix in matrices])
-    min_val, max_val = all_values.min(), all_values.max()
-    cmap = plt.get_cmap('viridis')
-    norm = plt.Normalize(vmin=min_val, vmax=max_val)
-
-    fig, axes = plt.subplots(num_rows, matrices_per_row, figsize=(matrices_per_row * 3.5, num_rows * 3.5))
-    
-    # Ensure axes is a flat array
-    axes = np.array(axes).flatten()
-
-    for i, (ax, matrix) in enumerate(zip(axes, matrices)):
-        im = ax.imshow(matrix, cmap=cmap, norm=norm)
-        if annotate:
-            for y in range(matrix.shape[0]):
-                for x in range(matrix.shape[1]):
-                    ax.text(x, y, f"{matrix[y, x]}", ha='center', va='center', color="white", fontsize=8, weight='bold')
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ax.set_title(f'Matrix {i + 1}', fontsize=10, weight='bold')
-        plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-    # Hide any unused axes
-    for j in range(i + 1, len(axes)):
-        fig.delaxes(axes[j])
+    # One imshow of the tiled stack with stamped labels (matrix_mosaic) instead of a subplot,
+    # a colorbar and n^2 ax.text calls per matrix
+    show_mosaic(matrices, columns=matrices_per_row, annotate=annotate)
     plt.tight_layout()
     plt.show()
 
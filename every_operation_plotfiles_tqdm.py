@@ -1,7 +1,5 @@
 import ast
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
 import argparse
 import os
 from tqdm import tqdm
@@ -36,6 +34,7 @@ def transform_matrix(matrix):
 
 # Step 4: Plot and save each matrix as a separate file
 def plot_and_save_matrices(matrices, output_dir='matrix_plots', annotate=True):
+    import matplotlib.pyplot as plt
     # Create output directory if it does not exist
     os.makedirs(output_dir, exist_ok=True)
 
@@ -1,39 +1,13 @@
 import sympy as sp
+import argparse
+from solved_systems import DEFAULT_SOLVED_DIR, solve_system, solution_expressions
 
-def compute_a_star_and_inverse(n):
-    # Define symbolic matrices for `a` and `a_star`
-    a = sp.MatrixSymbol('a', n, n)
-    a_star = sp.MatrixSymbol('a_star', n, n)
-
-    # Compute a_star from a (Forward process)
-    def forward_a_star(a, n):
-        equations = []
-        for i in range(n):
-            for j in range(n):
-                i_prime, j_prime = sp.symbols('i_prime j_prime')
-                sum_expr = sp.summation(a[i_prime, j_prime], (i_prime, 0, i), (j_prime, 0, j))
-                equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1)-1 - sum_expr) #2*
-                equations.append(equation)
-        
-        solution = sp.solve(equations, [a_star[i, j] for i in range(n) for j in range(n)])
-        return solution
-
-    # Compute a from a_star (Inverse process)
-    def inverse_a_star(a_star, n):
-        equations = []
-        for i in range(n):
-            for j in range(n):
-                i_prime, j_prime = sp.symbols('i_prime j_prime')
-                sum_expr = sp.summation(a[i_prime, j_prime], (i_prime, 0, i), (j_prime, 0, j))
-                equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1)-1 - sum_expr)
-                equations.append(equation)
-        
-        solution = sp.solve(equations, [a[i, j] for i in range(n) for j in range(n)])
-        return solution
-
-    # Calculate and display both forward and inverse solutions
-    forward_solution = forward_a_star(a, n)
-    inverse_solution = inverse_a_star(a_star, n)
+def compute_a_star_and_inverse(n, cache_dir=DEFAULT_SOLVED_DIR):
+    # Compute a_star from a (Forward process) and a from a_star (Inverse process); both systems
+    # are solved once per n and then read from the solved-system cache
+    offset = '(i + 1) + (j + 1) - 1'  #2*
+    forward_solution = solution_expressions(solve_system('forward', n, offset=offset, cache_dir=cache_dir), n)
+    inverse_solution = solution_expressions(solve_system('inverse', n, offset=offset, cache_dir=cache_dir), n)
 
     # Display solutions
     print("Forward solution (a_star in terms of a):")
@@ -44,6 +18,12 @@ def compute_a_star_and_inverse(n):
     for key, value in inverse_solution.items():
         sp.pprint(f"{key} = {value}")
 
-#Example for n=2
-n = 8
-compute_a_star_and_inverse(n)
+def main():
+    parser = argparse.ArgumentParser(description="Print the forward (a_star in terms of a) and inverse (a in terms of a_star) solutions.")
+    parser.add_argument("n", type=int, nargs='?', default=8, help="The size of the matrix (n x n)")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_SOLVED_DIR, help="Directory of the solved-system cache ('' to always solve).")
+    args = parser.parse_args()
+    compute_a_star_and_inverse(args.n, cache_dir=args.cache_dir)
+
+if __name__ == '__main__':
+    main()
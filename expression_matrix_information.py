@@ -1,6 +1,10 @@
 import sympy as sp
 import argparse
 import ast  # To safely evaluate the matrix format from text
+from solved_systems import DEFAULT_SOLVED_DIR, evaluate_system
+
+# Constant term of a_star[i, j] in the forward process
+OFFSET = '(i + 1) + (j + 1) - 1'
 
 # Function to read multiple matrices from the text file
 def read_matrices_from_file(filename):
@@ -47,48 +51,17 @@ def analyze_matrix(matrix, index):
     print("Unique elements (sorted):", unique_elements)
 
 # Compute a_star from a (Forward process)
-def forward_a_star(a_values, n, index):
-    a = sp.MatrixSymbol('a', n, n)
-    a_star = sp.MatrixSymbol('a_star', n, n)
-    equations = []
-    for i in range(n):
-        for j in range(n):
-            i_prime, j_prime = sp.symbols('i_prime j_prime')
-            sum_expr = sp.summation(a[i_prime, j_prime], (i_prime, 0, i), (j_prime, 0, j))
-            equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1) -1 - sum_expr)
-            equations.append(equation)
-    
-    # Substitute values into a and solve for a_star
-    a_subs = {a[i, j]: a_values[i][j] for i in range(n) for j in range(n)}
-    solution = sp.solve(equations, [a_star[i, j] for i in range(n) for j in range(n)])
-    a_star_values = {k: v.subs(a_subs) for k, v in solution.items()}
-    
-    # Create the computed a_star matrix
-    a_star_matrix = sp.Matrix(n, n, lambda i, j: a_star_values[a_star[i, j]])
+def forward_a_star(a_values, n, index, cache_dir=DEFAULT_SOLVED_DIR):
+    # The solved system is evaluated as a linear map instead of solving and substituting per matrix
+    a_star_matrix = sp.Matrix(evaluate_system('forward', [a_values], n, offset=OFFSET, cache_dir=cache_dir)[0])
     print(f"\nComputed matrix `a_star` from forward process (matrix {index}):")
     sp.pprint(a_star_matrix)
     analyze_matrix(a_star_matrix, index)
     return a_star_matrix
 
 # Compute a from a_star (Inverse process)
-def inverse_a_star(a_star_values, n, index):
-    a = sp.MatrixSymbol('a', n, n)
-    a_star = sp.MatrixSymbol('a_star', n, n)
-    equations = []
-    for i in range(n):
-        for j in range(n):
-            i_prime, j_prime = sp.symbols('i_prime j_prime')
-            sum_expr = sp.summation(a[i_prime, j_prime], (i_prime, 0, i), (j_prime, 0, j))
-            equation = sp.Eq(a_star[i, j], (i + 1) + (j + 1)-1  - sum_expr)
-            equations.append(equation)
-    
-    # Substitute values into a_star and solve for a
-    a_star_subs = {a_star[i, j]: a_star_values[i][j] for i in range(n) for j in range(n)}
-    solution = sp.solve(equations, [a[i, j] for i in range(n) for j in range(n)])
-    a_reconstructed_values = {k: v.subs(a_star_subs) for k, v in solution.items()}
-    
-    # Create the reconstructed a matrix
-    a_reconstructed_matrix = sp.Matrix(n, n, lambda i, j: a_reconstructed_values[a[i, j]])
+def inverse_a_star(a_star_values, n, index, cache_dir=DEFAULT_SOLVED_DIR):
+    a_reconstructed_matrix = sp.Matrix(evaluate_system('inverse', [a_star_values], n, offset=OFFSET, cache_dir=cache_dir)[0])
     print(f"\nReconstructed matrix `a` from inverse process (matrix {index}):")
     sp.pprint(a_reconstructed_matrix)
     analyze_matrix(a_reconstructed_matrix, index)
@@ -101,6 +74,7 @@ def main():
     parser.add_argument("input_filename", type=str, help="The path to the file containing the input matrix values")
     parser.add_argument("output_filename", type=str, help="The path for the output file to save the initial results")
     parser.add_argument("process", choices=['forward', 'inverse'], help="Specify 'forward' for a -> a_star or 'inverse' for a_star -> a")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_SOLVED_DIR, help="Directory of the solved-system cache ('' to always solve)")
     
     args = parser.parse_args()
     n = args.n
@@ -115,9 +89,9 @@ def main():
     # Process each matrix according to the specified process
     for index, matrix_values in enumerate(matrices, start=1):
         if process == 'forward':
-            result = forward_a_star(matrix_values, n, index)
+            result = forward_a_star(matrix_values, n, index, cache_dir=args.cache_dir)
         elif process == 'inverse':
-            result = inverse_a_star(matrix_values, n, index)
+            result = inverse_a_star(matrix_values, n, index, cache_dir=args.cache_dir)
         initial_results.append(result)
 
     # Write initial results to the output file
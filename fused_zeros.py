@@ -0,0 +1,80 @@
+import argparse
+import os
+import numpy as np
+from tqdm import tqdm
+from permutations import read_matrices_from_file, factorial, permutation_batches, relabel_batch
+from every_operation_fdiff import transform_value_bound, narrowest_int_dtype, finite_difference_transform_stack
+
+# Fused permutations.py -> every_operation_fdiff.py -> check_zeros.py for a single operation table
+def max_zero_relabelings(m, order=1, batch_size=8192):
+    """
+    Relabels m by every permutation, transforms each table and keeps the ones with the most zeros.
+
+    Nothing is written to disk: relabelings are generated and transformed in batches and
+    only the max-zero tables survive each batch.
+
+    Parameters:
+    - m: Original operation table (list of lists).
+    - order: Order of the finite difference transformation (run_all_bash.sh uses 1).
+    - batch_size: Number of permutations processed at once.
+
+    Returns:
+    - max_zeros: The maximum zero count.
+    - row_indices: 1-based indices of the max-zero tables, i.e. their line numbers in the
+      permutations.py output file.
+    - matrices: The corresponding transformed tables.
+    """
+    n = len(m)
+    m = np.array(m)
+    dtype = narrowest_int_dtype(transform_value_bound(order, 0, n - 1))
+
+    max_zeros = 0
+    row_indices = []
+    matrices = []
+    offset = 1
+    with tqdm(total=factorial(n), desc="Relabel, transform and count zeros") as progress:
+        for perms in permutation_batches(n, batch_size):
+            transformed = finite_difference_transform_stack(relabel_batch(m, perms), order=order, dtype=dtype)
+            zero_counts = np.count_nonzero(transformed == 0, axis=(1, 2))
+            batch_max = int(zero_counts.max())
+            if batch_max > max_zeros:
+                max_zeros = batch_max
+                row_indices, matrices = [], []
+            if batch_max == max_zeros:
+                hits = np.flatnonzero(zero_counts == max_zeros)
+                row_indices.extend((hits + offset).tolist())
+                matrices.extend(transformed[hits])
+            offset += len(perms)
+            progress.update(len(perms))
+    return max_zeros, row_indices, matrices
+
+# Same layout as check_zeros.py so the files can be compared directly
+def write_zeros_file(output_filename, max_zeros, row_indices, matrices):
+    with open(output_filename, 'w') as output_file:
+        for idx, matrix in zip(row_indices, matrices):
+            output_file.write(f"Matrix at row index {idx} with {max_zeros} zeros:\n")
+            output_file.write(str(matrix.tolist()) + "\n")
+            output_file.write("="*40 + "\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the max-zero relabelings of each operation table without writing the intermediate permutation and transform files.")
+    parser.add_argument('input_filename', help='Input file containing the operation tables, one per line.')
+    parser.add_argument('output_prefix', help='Prefix for output files; matrix i is written to <prefix>_matrix_<i>_zeros.txt.')
+    parser.add_argument("-o", "--order", type=int, default=1, help="Order of the finite difference transformation (positive integer).")
+    parser.add_argument("-b", "--batch-size", type=int, default=8192, help="Number of permutations processed per batch.")
+    parser.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite output files if they exist.")
+    args = parser.parse_args()
+
+    matrices = read_matrices_from_file(args.input_filename)
+    for idx, matrix in enumerate(matrices):
+        output_filename = f"{args.output_prefix}_matrix_{idx + 1}_zeros.txt"
+        if os.path.isfile(output_filename) and not args.yes:
+            print(f"Error: Output file '{output_filename}' already exists. Use -y to overwrite.")
+            exit(1)
+
+        max_zeros, row_indices, max_matrices = max_zero_relabelings(matrix, order=args.order, batch_size=args.batch_size)
+        write_zeros_file(output_filename, max_zeros, row_indices, max_matrices)
+        print(f"Matrix {idx + 1}: {len(row_indices)} relabelings with {max_zeros} zeros saved to '{output_filename}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+import argparse
+import html
+import importlib
+import io
+import json
+import os
+import re
+import sys
+from contextlib import redirect_stdout
+import numpy as np
+
+# Static HTML gallery of a table corpus and its images.
+#
+# One index.html holds the corpus as JSON: per table its row, isomorphism class, invariant
+# columns (from magma_server.build_store) and the PNGs already written for it, found by file
+# name (graph_<row>_..._<n>x<n>...png and matrix_<row>.png) in the given directories. The page
+# filters rows in the browser and adds cards in pages while scrolling; thumbnails use
+# loading="lazy", so only images scrolled into view are read. Tables without an image can
+# point at magma_server's /render/<row>.png route, which draws the circular graph plot of
+# the table on first request, with the drawing code and style of the plotting loop of its
+# size (8mult8/<n>x<n>_plotting_loop.py). The image is kept in the render cache under the key
+# those scripts use (render_params of 8mult8/render_pool.py), so only what is viewed is ever
+# rendered, and an image drawn here or by the plotting loops is reused by the other.
+
+DEFAULT_RENDER_CACHE = '.render_cache'
+PAGE_SIZE = 120
+
+# Plotting loop of every table size (its STYLE is part of the cache key); other sizes are
+# drawn like the 8x8 tables
+PLOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '8mult8')
+PLOT_SCRIPTS = {8: '8x8_plotting_loop', 16: '16x16_plotting_loop'}
+
+# Step 1: On-demand graph plots through the render cache
+def _plot_script(n):
+    if PLOT_DIR not in sys.path:
+        sys.path.insert(0, PLOT_DIR)
+    return importlib.import_module(PLOT_SCRIPTS.get(n, PLOT_SCRIPTS[8]))
+
+def graph_png(table, row, cache_dir=DEFAULT_RENDER_CACHE):
+    """
+    PNG of the circular graph plot of a table (graph_<row>_<n>x<n>_circular.png of the plotting
+    loops), rendered once per table and style.
+
+    Parameters:
+    - table: Square integer array-like.
+    - row: Corpus row of the table, for the progress message of the plotting script.
+    - cache_dir: Render cache directory ('' or None renders without caching).
+
+    Returns:
+    - The PNG file contents as bytes.
+    """
+    script = _plot_script(len(table))
+    from render_pool import params_digest, render_params, use_agg
+    M = np.asarray(table).tolist()
+    digest = params_digest(render_params(M, 'circle', script.STYLE))
+    path = os.path.join(cache_dir, digest[:2], f"{digest}.png") if cache_dir else None
+    if path and os.path.isfile(path):
+        with open(path, 'rb') as file:
+            return file.read()
+
+    use_agg()
+    buffer = io.BytesIO()
+    # The script reports every saved image on stdout, which is not ours to write to here
+    with redirect_stdout(io.StringIO()):
+        script.plot_graph_from_multiplication_table(script.build_graph(M), row, buffer)
+    data = buffer.getvalue()
+    if path:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    return data
+
+# Step 2: Rows of the gallery
+def find_images(image_dirs, n, base_dir):
+    """
+    Maps corpus rows to the PNG files drawn for them.
+
+    Parameters:
+    - image_dirs: Directories to scan (not recursively).
+    - n: Table size; graph images must carry '<n>x<n>' in their name.
+    - base_dir: Directory the paths are made relative to (where index.html lives).
+
+    Returns:
+    - Dict mapping row -> sorted list of relative paths, circular layouts first.
+    """
+    graph_pattern = re.compile(rf'graph_(\d+)_.*{n}x{n}.*\.png$')
+    matrix_pattern = re.compile(r'matrix_(\d+)\.png$')
+    images = {}
+    for image_dir in image_dirs:
+        for name in os.listdir(image_dir):
+            match = graph_pattern.match(name) or matrix_pattern.match(name)
+            if match:
+                path = os.path.relpath(os.path.join(image_dir, name), base_dir)
+                images.setdefault(int(match.group(1)), []).append(path.replace(os.sep, '/'))
+    for paths in images.values():
+        paths.sort(key=lambda path: ('circular' not in path, path))
+    return images
+
+def gallery_rows(store, images):
+    """
+    One JSON-serializable record per table: row, class, invariants and images.
+    """
+    from magma_server import INVARIANTS
+    class_sizes = np.bincount(store['class_of'])
+    rows = []
+    for row in range(len(store['tables'])):
+        c = int(store['class_of'][row])
+        record = {'row': row + 1, 'class': c, 'class_size': int(class_sizes[c]), 'images': images.get(row + 1, [])}
+        record.update({name: store['invariants'][name][row].item() for name in INVARIANTS})
+        rows.append(record)
+    return rows
+
+# Step 3: The page
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+body { font-family: sans-serif; margin: 0; background: #fafafa; }
+header { position: sticky; top: 0; background: #fff; border-bottom: 1px solid #ccc; padding: 8px 12px; z-index: 1; }
+header label { margin-right: 12px; font-size: 14px; }
+#count { font-size: 14px; color: #555; }
+#grid { display: grid; grid-template-columns: repeat(auto-fill, minmax(220px, 1fr)); gap: 10px; padding: 12px; }
+figure { margin: 0; background: #fff; border: 1px solid #ddd; padding: 6px; }
+figure img { width: 100%; height: 180px; object-fit: contain; background: #fff; }
+figure .missing { height: 180px; display: flex; align-items: center; justify-content: center; color: #999; font-size: 13px; }
+figcaption { font-size: 12px; line-height: 1.4; }
+figcaption a { margin-right: 4px; }
+#more { height: 40px; }
+</style>
+</head>
+<body>
+<header>
+<strong>__TITLE__</strong>
+<span id="filters"></span>
+<label>class <input id="class" type="number" min="0" style="width: 5em"></label>
+<label><input id="with-images" type="checkbox"> with images only</label>
+<span id="count"></span>
+</header>
+<div id="grid"></div>
+<div id="more"></div>
+<script>
+const DATA = __DATA__;
+const grid = document.getElementById('grid');
+const more = document.getElementById('more');
+let shown = [], next = 0;
+
+// One select per invariant column, with the values that occur
+for (const column of DATA.columns) {
+  const values = [...new Set(DATA.rows.map(r => String(r[column])))].sort((a, b) => a.localeCompare(b, undefined, {numeric: true}));
+  const label = document.createElement('label');
+  label.textContent = column + ' ';
+  const select = document.createElement('select');
+  select.dataset.column = column;
+  select.add(new Option('any', ''));
+  for (const value of values) select.add(new Option(value, value));
+  select.onchange = update;
+  label.appendChild(select);
+  document.getElementById('filters').appendChild(label);
+}
+document.getElementById('class').oninput = update;
+document.getElementById('with-images').onchange = update;
+
+function card(r) {
+  const figure = document.createElement('figure');
+  const src = r.images.length ? r.images[0] : (DATA.server ? DATA.server + '/render/' + r.row + '.png' : null);
+  if (src) {
+    const img = document.createElement('img');
+    img.loading = 'lazy';
+    img.src = r.images.length ? encodeURI(src) : src;
+    img.alt = 'table ' + r.row;
+    figure.appendChild(img);
+  } else {
+    const missing = document.createElement('div');
+    missing.className = 'missing';
+    missing.textContent = 'not rendered';
+    figure.appendChild(missing);
+  }
+  const caption = document.createElement('figcaption');
+  caption.innerHTML = '<b>#' + r.row + '</b> class ' + r['class'] + ' (' + r.class_size + ')<br>' +
+    DATA.columns.map(c => c + ': ' + r[c]).join(', ') + '<br>' +
+    r.images.map((path, i) => '<a href="' + encodeURI(path) + '">' + (i + 1) + '</a>').join('');
+  figure.appendChild(caption);
+  return figure;
+}
+
+// Cards are added one page at a time when the end of the grid comes into view
+function addPage() {
+  const stop = Math.min(next + DATA.page_size, shown.length);
+  for (; next < stop; next++) grid.appendChild(card(shown[next]));
+  // The observer only fires on changes, so keep going while the end is still in view
+  if (next < shown.length && more.getBoundingClientRect().top < window.innerHeight) requestAnimationFrame(addPage);
+}
+new IntersectionObserver(entries => { if (entries[0].isIntersecting) addPage(); }).observe(more);
+
+function update() {
+  const selected = [...document.querySelectorAll('#filters select')].filter(s => s.value !== '');
+  const cls = document.getElementById('class').value;
+  const withImages = document.getElementById('with-images').checked;
+  shown = DATA.rows.filter(r => selected.every(s => String(r[s.dataset.column]) === s.value) &&
+    (cls === '' || r['class'] === Number(cls)) && (!withImages || r.images.length));
+  document.getElementById('count').textContent = shown.length + ' of ' + DATA.rows.length + ' tables';
+  grid.replaceChildren();
+  next = 0;
+  addPage();
+}
+update();
+</script>
+</body>
+</html>
+"""
+
+def write_gallery(rows, columns, filename, title='Magma gallery', server=None):
+    """
+    Writes the gallery page.
+
+    Parameters:
+    - rows: Records from gallery_rows.
+    - columns: Invariant columns offered as filters.
+    - filename: Output HTML file; image paths in rows are relative to its directory.
+    - title: Page title.
+    - server: Base URL of a running magma_server for tables without images (None shows a placeholder).
+    """
+    data = {'rows': rows, 'columns': list(columns), 'server': server, 'page_size': PAGE_SIZE}
+    # '</' would end the script element early
+    payload = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+    page = PAGE_TEMPLATE.replace('__TITLE__', html.escape(title)).replace('__DATA__', payload)
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write(page)
+
+def main():
+    from magma_server import INVARIANTS, build_store
+    from magma_client import DEFAULT_URL
+    from result_cache import DEFAULT_CACHE_DIR
+    parser = argparse.ArgumentParser(description="Write a static HTML gallery of a table corpus with lazy-loaded images.")
+    parser.add_argument("corpus_file", type=str, help="Corpus of tables, one per line (or a .npy stack).")
+    parser.add_argument("image_dirs", type=str, nargs='*', help="Directories with graph_<row>_*.png or matrix_<row>.png images.")
+    parser.add_argument("-o", "--output", type=str, default='gallery.html', help="Output HTML file.")
+    parser.add_argument("--title", type=str, default=None, help="Page title (the corpus file name by default).")
+    parser.add_argument("--server", type=str, nargs='?', const=DEFAULT_URL, default=None, help="Render missing images on demand through a running magma_server (default URL if no value).")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Result cache for the canonical forms ('' to disable).")
+    parser.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite the output file.")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.corpus_file):
+        print(f"Error: Corpus file '{args.corpus_file}' does not exist.")
+        exit(1)
+    for image_dir in args.image_dirs:
+        if not os.path.isdir(image_dir):
+            print(f"Error: Image directory '{image_dir}' does not exist.")
+            exit(1)
+    if os.path.exists(args.output) and not args.yes:
+        print(f"Error: Output file '{args.output}' already exists. Use -y to overwrite.")
+        exit(1)
+
+    store = build_store(args.corpus_file, cache_dir=args.cache_dir)
+    base_dir = os.path.dirname(os.path.abspath(args.output))
+    images = find_images(args.image_dirs, store['tables'].shape[1], base_dir)
+    rows = gallery_rows(store, images)
+    write_gallery(rows, INVARIANTS, args.output, title=args.title or os.path.basename(args.corpus_file), server=args.server)
+    with_images = sum(1 for row in rows if row['images'])
+    print(f"Gallery of {len(rows)} tables ({with_images} with images, {len(store['class_index'])} classes) saved as '{args.output}'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+# One entry point for the table workflow: parse, permute, transform, zeros, iso, plot and solve.
+#
+# Every command is a function taking a dict of parameters and returning a JSON-serializable
+# summary, so the same code runs from the command line ("python magma.py transform in out -o 1")
+# and from "batch", which reads one JSON job per line (from a file or stdin) and answers each
+# with one JSON line, e.g.
+#
+#   {"id": 1, "command": "transform", "input": "order_8_matrix_1.txt", "output": "t1.npy", "order": 1, "yes": true}
+#
+# Job keys are the long option names of the command line ("yes" allows overwriting).
+# A batch worker keeps the interpreter, the imported modules and every parsed input corpus
+# warm, so a stream of jobs pays for startup and parsing only once. Heavy modules are
+# imported by the commands that need them.
+
+# Parsed inputs, keyed by (path, kind) and invalidated when the file changes
+_CORPORA = {}
+
+def _file_key(path):
+    info = os.stat(path)
+    return info.st_mtime_ns, info.st_size
+
+def _cached(path, kind, load):
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Input file '{path}' does not exist.")
+    key = (os.path.realpath(path), kind)
+    stamp = _file_key(path)
+    entry = _CORPORA.get(key)
+    if entry is None or entry[0] != stamp:
+        entry = (stamp, load(path))
+        _CORPORA[key] = entry
+    return entry[1]
+
+def parse_tables(path):
+    """
+    Reads square tables, one Python list-of-lists literal per line (blank lines are skipped).
+
+    Returns:
+    - An integer array of shape (N, n, n).
+    """
+    import numpy as np
+    if path.endswith('.npy'):
+        return np.load(path)
+    tables = []
+    with open(path, 'r') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                table = ast.literal_eval(line)
+            except (SyntaxError, ValueError) as e:
+                raise ValueError(f"Line {line_number} of '{path}': {e}")
+            if not (isinstance(table, list) and all(isinstance(row, list) and len(row) == len(table) for row in table)):
+                raise ValueError(f"Line {line_number} of '{path}': not a square list of lists.")
+            if tables and len(table) != len(tables[0]):
+                raise ValueError(f"Line {line_number} of '{path}': expected a {len(tables[0])}x{len(tables[0])} table.")
+            tables.append(table)
+    if not tables:
+        raise ValueError(f"No tables found in '{path}'.")
+    return np.array(tables)
+
+def load_tables(path):
+    return _cached(path, 'tables', parse_tables)
+
+def load_matrices(path):
+    # Transformed files are plain integer lists, the streaming parser of zeros_report is enough
+    import numpy as np
+    from zeros_report import iter_matrix_chunks
+    return _cached(path, 'matrices', lambda path: np.concatenate(list(iter_matrix_chunks(path))))
+
+def _check_output(path, overwrite):
+    if os.path.exists(path) and not overwrite:
+        raise FileExistsError(f"Output file '{path}' already exists. Use -y to overwrite.")
+
+def _write_stack(path, stack):
+    # .npy keeps the dtype, anything else is the usual one-matrix-per-line text
+    from pipeline import write_output
+    write_output('transform', path, stack)
+
+# Step 1: Commands
+def run_parse(params):
+    """Validates a table corpus and writes it as text or as a .npy stack."""
+    from every_operation_fdiff import narrowest_int_dtype
+    _check_output(params['output'], params.get('yes'))
+    tables = load_tables(params['input'])
+    stack = tables.astype(narrowest_int_dtype(int(abs(tables).max())))
+    _write_stack(params['output'], stack)
+    return {'tables': len(stack), 'n': int(stack.shape[1]), 'output': params['output']}
+
+def run_permute(params):
+    """All relabelings of one table of the corpus (permutations.py)."""
+    from pipeline import permute_stage
+    _check_output(params['output'], params.get('yes'))
+    tables = load_tables(params['input'])
+    row = int(params.get('row', 1))
+    if not 1 <= row <= len(tables):
+        raise ValueError(f"Row {row} is out of range, '{params['input']}' has {len(tables)} tables.")
+    stack = permute_stage(tables, {'row': row})
+    _write_stack(params['output'], stack)
+    return {'tables': len(stack), 'output': params['output']}
+
+def run_transform(params):
+    """Finite difference transform of every matrix (every_operation_fdiff.py)."""
+    from pipeline import transform_stage
+    _check_output(params['output'], params.get('yes'))
+    order = int(params.get('order', 2))
+    if order < 1:
+        raise ValueError("Order must be a positive integer.")
+    jobs = int(params.get('jobs') or 1)
+    if jobs > 1:
+        # Large stacks: split over worker processes through shared memory
+        from parallel_transform import parallel_transform_stack
+        stack = parallel_transform_stack(load_matrices(params['input']), order=order, jobs=jobs)
+    else:
+        stack = transform_stage(load_matrices(params['input']), {'order': order})
+    _write_stack(params['output'], stack)
+    return {'matrices': len(stack), 'dtype': str(stack.dtype), 'output': params['output']}
+
+def run_zeros(params):
+    """Matrices with the most zeros (check_zeros.py), or with relabel the fused search of fused_zeros.py."""
+    from fused_zeros import max_zero_relabelings, write_zeros_file
+    _check_output(params['output'], params.get('yes'))
+    if params.get('relabel'):
+        table = load_tables(params['input'])[int(params.get('row', 1)) - 1]
+        max_zeros, rows, matrices = max_zero_relabelings(table.tolist(), order=int(params.get('order', 1)))
+    else:
+        from pipeline import zeros_stage
+        max_zeros, rows, matrices = zeros_stage(load_matrices(params['input']), {})
+    write_zeros_file(params['output'], max_zeros, rows, matrices)
+    return {'max_zeros': max_zeros, 'row_indices': rows, 'output': params['output']}
+
+def table_graph(M):
+    """
+    Directed graph of a table with the edges i -> M[i][j] and M[i][j] -> j, as built by the
+    plotting scripts (graph_<i>.pkl).
+    """
+    import networkx as nx
+    n = len(M)
+    G = nx.DiGraph()
+    G.add_nodes_from(range(n))
+    G.add_edges_from((i, int(M[i][j])) for i in range(n) for j in range(n))
+    G.add_edges_from((int(M[i][j]), j) for i in range(n) for j in range(n))
+    return G
+
+def load_graphs(path):
+    return _cached(path, 'graphs', lambda path: [table_graph(M) for M in load_tables(path)])
+
+def run_iso(params):
+    """Pairwise isomorphism of the table graphs (check_isomorphism.py), written as the same CSV."""
+    import networkx as nx
+    from itertools import combinations
+    graphs = load_graphs(params['input'])
+    output = params.get('output')
+    if output:
+        _check_output(output, params.get('yes'))
+
+    # Graphs with different degree sequences cannot be isomorphic
+    hashes = [sorted(zip(dict(G.in_degree()).values(), dict(G.out_degree()).values())) for G in graphs]
+    isomorphic_pairs = set()
+    melted_table = []
+    for i, j in combinations(range(len(graphs)), 2):
+        is_iso = hashes[i] == hashes[j] and nx.is_isomorphic(graphs[i], graphs[j])
+        if is_iso:
+            isomorphic_pairs.add((i, j))
+        melted_table.append({'Graph1': i + 1, 'Graph2': j + 1, 'Isomorphic': 'Yes' if is_iso else 'No'})
+
+    # Isomorphism classes, each listed from its first graph
+    classes = []
+    for i in range(len(graphs)):
+        for members in classes:
+            if (members[0], i) in isomorphic_pairs:
+                members.append(i)
+                break
+        else:
+            classes.append([i])
+
+    if output:
+        import csv
+        with open(output, 'w', newline='') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=['Graph1', 'Graph2', 'Isomorphic'])
+            writer.writeheader()
+            writer.writerows(melted_table)
+    return {'graphs': len(graphs), 'classes': [[i + 1 for i in members] for members in classes], 'output': output}
+
+def run_plot(params):
+    """
+    One heatmap per matrix (every_operation_fdiff.py --plot), mosaic contact sheets with 'mosaic',
+    or plain color PNGs without matplotlib figures with 'raw'.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    matrices = load_matrices(params['input'])
+    output_dir = params.get('output', 'matrix_plots')
+    if params.get('raw'):
+        from png_export import export_pngs
+        written = export_pngs(matrices, output_dir, jobs=params.get('jobs', 1))
+        return {'plots': written, 'output': output_dir}
+    if params.get('mosaic'):
+        from matrix_mosaic import save_contact_sheets
+        pages = save_contact_sheets(matrices, output_dir, per_page=params.get('per_page', 256), annotate=params.get('annotate', True))
+        return {'plots': len(matrices), 'pages': len(pages), 'output': output_dir}
+    from every_operation_fdiff import plot_and_save_matrices
+    plot_and_save_matrices(matrices, output_dir=output_dir, annotate=params.get('annotate', True))
+    return {'plots': len(matrices), 'output': output_dir}
+
+def run_solve(params):
+    """Forward (a -> a_star) or inverse (a_star -> a) coefficient solve of coeff.py, all tables in one batch."""
+    import coeff
+    _check_output(params['output'], params.get('yes'))
+    process = params.get('process', 'forward')
+    if process not in ('forward', 'inverse'):
+        raise ValueError(f"Unknown process: {process}")
+    tables = load_tables(params['input'])
+    n = int(tables.shape[1])
+    size = len(coeff.coeff_matrix)
+    if n != size:
+        raise ValueError(f"coeff.py has a {size}x{size} coefficient matrix, got {n}x{n} tables.")
+    results = coeff.apply_process(process, tables.tolist(), n, coeff.coeff_matrix)
+    coeff.write_matrices_to_file(results, params['output'])
+    return {'tables': len(results), 'output': params['output']}
+
+COMMANDS = {
+    'parse': run_parse,
+    'permute': run_permute,
+    'transform': run_transform,
+    'zeros': run_zeros,
+    'iso': run_iso,
+    'plot': run_plot,
+    'solve': run_solve,
+}
+
+# Step 2: Batch mode
+def run_job(job):
+    """
+    Runs one job dict and returns the reply dict: the job id, 'ok', and either the command's
+    'result' or the 'error' message, plus the elapsed 'seconds'.
+    """
+    start = time.perf_counter()
+    reply = {'id': job.get('id') if isinstance(job, dict) else None, 'ok': False}
+    try:
+        if not isinstance(job, dict):
+            raise ValueError(f"A job must be a JSON object, got {type(job).__name__}")
+        command = job.get('command')
+        if command not in COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+        # Progress output of the commands must not mix with the replies on stdout
+        with redirect_stdout(sys.stderr):
+            reply['result'] = COMMANDS[command](job)
+        reply['ok'] = True
+    except Exception as e:
+        reply['error'] = f"{type(e).__name__}: {e}"
+    reply['seconds'] = round(time.perf_counter() - start, 4)
+    return reply
+
+def run_batch(lines, out=sys.stdout):
+    """
+    Executes JSONL jobs as they arrive and writes one JSON reply line per job.
+    """
+    failed = 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            reply = {'id': None, 'ok': False, 'error': f"Line {line_number}: {e}"}
+        else:
+            reply = run_job(job)
+        failed += not reply['ok']
+        out.write(json.dumps(reply) + "\n")
+        out.flush()
+    return failed
+
+# Step 3: Command line
+def build_parser():
+    parser = argparse.ArgumentParser(description="Parse, permute, transform, count zeros, check isomorphism, plot and solve magma tables.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add(name, help_text, output_help="Output file (.npy for a binary stack, text otherwise).", output_nargs=None):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('input', type=str, help="Input file, one table per line (or a .npy stack).")
+        sub.add_argument('output', type=str, nargs=output_nargs, help=output_help)
+        sub.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite the output if it exists.")
+        return sub
+
+    add('parse', "Validate a table corpus and convert it.")
+    permute = add('permute', "All relabelings of one table.")
+    permute.add_argument("-r", "--row", type=int, default=1, help="1-based row of the table in the input file.")
+    transform = add('transform', "Finite difference transform.")
+    transform.add_argument("-o", "--order", type=int, default=2, help="Order of the transformation (positive integer).")
+    transform.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for the shared-memory parallel transform.")
+    zeros = add('zeros', "Matrices with the most zeros.", "Output file in the check_zeros.py layout.")
+    zeros.add_argument("--relabel", action="store_true", help="Treat the input as tables and search all relabelings of --row.")
+    zeros.add_argument("-r", "--row", type=int, default=1, help="1-based row of the table for --relabel.")
+    zeros.add_argument("-o", "--order", type=int, default=1, help="Transform order for --relabel.")
+    add('iso', "Pairwise isomorphism of the table graphs.", "Optional output CSV (Graph1, Graph2, Isomorphic).", output_nargs='?')
+    plot = add('plot', "One heatmap per matrix.", "Output directory of the PNG files.")
+    plot.add_argument("--no-annotate", dest='annotate', action="store_false", help="Do not print values in the cells.")
+    plot.add_argument("--mosaic", action="store_true", help="Tile the matrices into paged mosaic PNGs instead of one PNG each.")
+    plot.add_argument("--per-page", type=int, default=256, help="Matrices per mosaic page.")
+    plot.add_argument("--raw", action="store_true", help="Plain color PNGs without labels or colorbar, written without matplotlib figures.")
+    plot.add_argument("-j", "--jobs", type=int, default=1, help="Worker processes for --raw.")
+    solve = add('solve', "Coefficient solve of coeff.py.", "Output file, one matrix per line.")
+    solve.add_argument("-p", "--process", choices=['forward', 'inverse'], default='forward', help="'forward' for a -> a_star, 'inverse' for a_star -> a.")
+
+    batch = subparsers.add_parser('batch', help="Run JSONL jobs from a file or stdin, one JSON reply per line.")
+    batch.add_argument('jobs_file', nargs='?', default='-', help="JSONL job file ('-' for stdin, the default).")
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.command == 'batch':
+        if args.jobs_file == '-':
+            failed = run_batch(sys.stdin)
+        elif not os.path.isfile(args.jobs_file):
+            print(f"Error: Jobs file '{args.jobs_file}' does not exist.")
+            exit(1)
+        else:
+            with open(args.jobs_file, 'r') as file:
+                failed = run_batch(file)
+        exit(1 if failed else 0)
+
+    try:
+        result = COMMANDS[args.command](vars(args))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        exit(1)
+    except Exception as e:
+        print(f"Error: {type(e).__name__}: {e}")
+        exit(1)
+    print(json.dumps(result))
+
+if __name__ == '__main__':
+    main()
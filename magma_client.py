@@ -0,0 +1,67 @@
+import argparse
+import json
+import urllib.error
+import urllib.request
+
+# Client for magma_server.py. Every function sends one JSON query and returns the decoded
+# reply; errors reported by the server are raised as ValueError.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+
+def query(endpoint, payload=None, url=DEFAULT_URL, timeout=300):
+    """
+    Sends payload to /<endpoint> and returns the JSON reply.
+    """
+    request = urllib.request.Request(f"{url}/{endpoint}", data=json.dumps(payload or {}).encode(),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise ValueError(json.load(e).get('error', str(e)))
+
+def _table(table):
+    # Accepts lists of lists or arrays
+    return [[int(value) for value in row] for row in table]
+
+def stats(url=DEFAULT_URL):
+    """Corpus size, table size and number of isomorphism classes."""
+    return query('stats', url=url)
+
+def classify(table, url=DEFAULT_URL):
+    """Canonical form, class and invariants of a table, and the corpus rows in its class."""
+    return query('class', {'table': _table(table)}, url)
+
+def max_zero_relabeling(table, order=1, url=DEFAULT_URL):
+    """Max-zero relabelings of a table (fused_zeros.py), row indices in permutations.py order."""
+    return query('max_zeros', {'table': _table(table), 'order': order}, url)
+
+def containing(table, url=DEFAULT_URL):
+    """Corpus rows with a submagma isomorphic to table."""
+    return query('contains', {'table': _table(table)}, url)
+
+def info(row, url=DEFAULT_URL):
+    """Table, class and invariants of a 1-based corpus row."""
+    return query('info', {'row': row}, url)
+
+def filter_rows(url=DEFAULT_URL, **invariants):
+    """Corpus rows whose invariants equal the given values, e.g. filter_rows(commutative=True)."""
+    return query('filter', invariants, url)
+
+def main():
+    parser = argparse.ArgumentParser(description="Send one query to a running magma_server.py.")
+    parser.add_argument("endpoint", choices=['stats', 'class', 'max_zeros', 'contains', 'info', 'filter'], help="Query to run.")
+    parser.add_argument("payload", nargs='?', default='{}', help="JSON payload, e.g. '{\"table\": [[0, 1], [1, 0]]}'.")
+    parser.add_argument("-u", "--url", type=str, default=DEFAULT_URL, help="Server URL.")
+    args = parser.parse_args()
+
+    try:
+        print(json.dumps(query(args.endpoint, json.loads(args.payload), args.url)))
+    except (ValueError, urllib.error.URLError) as e:
+        print(f"Error: {e}")
+        exit(1)
+
+if __name__ == '__main__':
+    main()
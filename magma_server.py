@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import re
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import combinations
+import numpy as np
+from tqdm import tqdm
+from permutations import canonical_form, permutation_batches, factorial
+from fused_zeros import max_zero_relabelings
+from magma import parse_tables
+from gallery import DEFAULT_RENDER_CACHE, graph_png
+from magma_client import DEFAULT_HOST, DEFAULT_PORT
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, array_digest, cached_call
+
+# Local query server over a table corpus (one table per line, e.g. magmas8x8(WIP).txt).
+#
+# The store is built once at startup and kept in memory: the tables, their canonical forms
+# (which give the isomorphism classes) and invariant columns. Submagma indexes are built on
+# the first query for each submagma size. Canonical forms are stored in the result cache, so
+# restarting on the same corpus is fast. Queries are JSON POSTs to /<name>, see QUERIES;
+# magma_client.py wraps them. max_zeros searches all n! relabelings of the posted table, so
+# tables above the configured maximum order are rejected with 400 instead of pinning a worker.
+# GET /render/<row>.png returns the circular graph plot of a table, drawn on first request and
+# kept in the render cache (used by the thumbnails of gallery.py).
+
+INVARIANTS = ('idempotents', 'commutative', 'associative', 'image_size')
+DEFAULT_MAX_ORDER = 9
+
+# Step 1: Build the store
+def table_invariants(tables):
+    """
+    Isomorphism invariants of every table of a stack.
+
+    Returns:
+    - A dict with one array of length N per name in INVARIANTS.
+    """
+    N, n, _ = tables.shape
+    idx = np.arange(n)
+    t = np.arange(N)[:, None, None, None]
+    # (x*y)*z and x*(y*z) for every triple
+    left = tables[t, tables[:, :, :, None], idx[None, None, None, :]]
+    right = tables[t, idx[None, :, None, None], tables[:, None, :, :]]
+    return {
+        'idempotents': np.count_nonzero(tables[:, idx, idx] == idx, axis=1),
+        'commutative': (tables == tables.transpose(0, 2, 1)).all(axis=(1, 2)),
+        'associative': (left == right).all(axis=(1, 2, 3)),
+        'image_size': np.array([len(np.unique(table)) for table in tables]),
+    }
+
+def all_permutations(n):
+    return next(permutation_batches(n, factorial(n)))
+
+def _key(table):
+    return np.asarray(table, dtype=np.int16).tobytes()
+
+def build_store(corpus_file, cache_dir=DEFAULT_CACHE_DIR, cache_size=DEFAULT_MAX_BYTES, max_order=DEFAULT_MAX_ORDER):
+    tables = parse_tables(corpus_file)
+    n = tables.shape[1]
+    perms = all_permutations(n)
+
+    def compute():
+        return np.stack([canonical_form(table, perms) for table in tqdm(tables, desc="Canonical forms")])
+
+    if cache_dir:
+        canonical = cached_call(cache_dir, array_digest(tables), 'canonical', {}, compute, cache_size)
+    else:
+        canonical = compute()
+    class_forms, class_of = np.unique(canonical.reshape(len(tables), -1), axis=0, return_inverse=True)
+    return {
+        'corpus': corpus_file,
+        'tables': tables,
+        'perms': perms,
+        'canonical': canonical,
+        'class_of': class_of.reshape(-1),
+        'class_index': {_key(form): c for c, form in enumerate(class_forms)},
+        'invariants': table_invariants(tables),
+        'submagmas': {},
+        'max_zeros': {},
+        'max_order': max_order,
+    }
+
+def submagma_index(store, k):
+    """
+    Maps the canonical form of every k-element submagma to the sorted corpus rows containing it.
+    """
+    if k in store['submagmas']:
+        return store['submagmas'][k]
+    tables = store['tables']
+    n = tables.shape[1]
+    subsets = np.array(list(combinations(range(n), k)))
+    # closed[t, s]: subset s is closed under the operation of table t
+    sub = tables[:, subsets[:, :, None], subsets[:, None, :]]
+    closed = (sub[..., None] == subsets[None, :, None, None, :]).any(axis=-1).all(axis=(2, 3))
+    perms = all_permutations(k)
+    index = {}
+    for t, s in zip(*np.nonzero(closed)):
+        # Relabel the subset to 0..k-1 before taking the canonical form
+        position = np.full(n, -1)
+        position[subsets[s]] = np.arange(k)
+        rows = index.setdefault(_key(canonical_form(position[sub[t, s]], perms)), [])
+        if not rows or rows[-1] != t:
+            rows.append(int(t))
+    store['submagmas'][k] = index
+    return index
+
+# Step 2: Queries, each takes the store and the JSON payload
+def _table(payload, n=None):
+    table = np.array(payload['table'])
+    if table.ndim != 2 or table.shape[0] != table.shape[1]:
+        raise ValueError("'table' must be a square list of lists.")
+    if n is not None and len(table) != n:
+        raise ValueError(f"Expected a {n}x{n} table.")
+    if table.min() < 0 or table.max() >= len(table):
+        raise ValueError(f"Table entries must lie in 0..{len(table) - 1}.")
+    return table
+
+def _row_summary(store, row):
+    return {
+        'row': row + 1,
+        'class': int(store['class_of'][row]),
+        'invariants': {name: store['invariants'][name][row].item() for name in INVARIANTS},
+    }
+
+def query_stats(store, payload):
+    return {'corpus': store['corpus'], 'tables': len(store['tables']), 'n': int(store['tables'].shape[1]),
+            'classes': len(store['class_index'])}
+
+def query_class(store, payload):
+    table = _table(payload, store['tables'].shape[1])
+    form = canonical_form(table, store['perms'])
+    c = store['class_index'].get(_key(form))
+    rows = [] if c is None else (np.flatnonzero(store['class_of'] == c) + 1).tolist()
+    invariants = table_invariants(table[None])
+    return {'canonical': form.tolist(), 'class': c, 'rows': rows,
+            'invariants': {name: invariants[name][0].item() for name in INVARIANTS}}
+
+def query_max_zeros(store, payload):
+    table = _table(payload)
+    if len(table) > store['max_order']:
+        raise ValueError(f"Tables of order {len(table)} are above the server limit of {store['max_order']} ({len(table)}! relabelings).")
+    order = int(payload.get('order', 1))
+    key = (_key(table), order)
+    if key not in store['max_zeros']:
+        max_zeros, row_indices, matrices = max_zero_relabelings(table.tolist(), order=order)
+        store['max_zeros'][key] = {'max_zeros': max_zeros, 'row_indices': row_indices,
+                                   'matrices': [matrix.tolist() for matrix in matrices]}
+    return store['max_zeros'][key]
+
+def query_contains(store, payload):
+    table = _table(payload)
+    if len(table) > store['tables'].shape[1]:
+        raise ValueError("The submagma is larger than the corpus tables.")
+    rows = submagma_index(store, len(table)).get(_key(canonical_form(table)), [])
+    return {'rows': [row + 1 for row in rows], 'classes': sorted({int(store['class_of'][row]) for row in rows})}
+
+def query_info(store, payload):
+    row = int(payload['row']) - 1
+    if not 0 <= row < len(store['tables']):
+        raise ValueError(f"Row must lie in 1..{len(store['tables'])}.")
+    summary = _row_summary(store, row)
+    summary['table'] = store['tables'][row].tolist()
+    summary['class_rows'] = (np.flatnonzero(store['class_of'] == summary['class']) + 1).tolist()
+    return summary
+
+def query_filter(store, payload):
+    unknown = set(payload) - set(INVARIANTS)
+    if unknown:
+        raise ValueError(f"Unknown invariants: {sorted(unknown)}")
+    mask = np.ones(len(store['tables']), dtype=bool)
+    for name, value in payload.items():
+        mask &= store['invariants'][name] == value
+    return {'rows': (np.flatnonzero(mask) + 1).tolist()}
+
+QUERIES = {
+    'stats': query_stats,
+    'class': query_class,
+    'max_zeros': query_max_zeros,
+    'contains': query_contains,
+    'info': query_info,
+    'filter': query_filter,
+}
+
+# Step 3: HTTP handler
+class QueryHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        name = self.path.strip('/')
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if name not in QUERIES:
+                status, reply = 404, {'error': f"Unknown query: {name}"}
+            else:
+                status, reply = 200, QUERIES[name](self.server.store, payload)
+        except (ValueError, KeyError, TypeError) as e:
+            status, reply = 400, {'error': f"{type(e).__name__}: {e}"}
+        body = json.dumps(reply).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        match = re.fullmatch(r'/render/(\d+)\.png', self.path)
+        if match is None:
+            return self.do_POST()
+        row = int(match.group(1)) - 1
+        if not 0 <= row < len(self.server.store['tables']):
+            self.send_error(404, f"Row must lie in 1..{len(self.server.store['tables'])}.")
+            return
+        body = graph_png(self.server.store['tables'][row], row + 1, cache_dir=self.server.render_cache)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'max-age=86400')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve class, max-zero, submagma and invariant queries over a table corpus on localhost.")
+    parser.add_argument("corpus_file", type=str, help="Corpus of tables, one per line (or a .npy stack).")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="Port to listen on (localhost only).")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help="Result cache for the canonical forms ('' to disable).")
+    parser.add_argument("--render-cache", type=str, default=DEFAULT_RENDER_CACHE, help="Cache of the images drawn by /render ('' to disable).")
+    parser.add_argument("--max-order", type=int, default=DEFAULT_MAX_ORDER, help="Largest table order accepted by max_zeros queries.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request.")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.corpus_file):
+        print(f"Error: Corpus file '{args.corpus_file}' does not exist.")
+        exit(1)
+
+    server = HTTPServer((DEFAULT_HOST, args.port), QueryHandler)
+    server.store = build_store(args.corpus_file, cache_dir=args.cache_dir, max_order=args.max_order)
+    server.verbose = args.verbose
+    server.render_cache = args.render_cache
+    print(f"Serving {len(server.store['tables'])} tables ({len(server.store['class_index'])} classes) on http://{DEFAULT_HOST}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import math
+import os
+import numpy as np
+
+# Heatmaps of many matrices as one image.
+#
+# The whole stack is tiled into a single 2-D array (matrices side by side, separated by a
+# gap of empty cells), colored with one colormap call and scaled up so every cell is
+# cell_px pixels wide. Cell values are not drawn with one ax.text per cell: every distinct
+# label is rasterized once into a glyph atlas and stamped onto all cells that show it with
+# NumPy indexing. Contact sheets page large corpora into PNGs with one shared color scale.
+
+DEFAULT_CELL_PX = 24
+GLYPH_DPI = 100
+
+# Step 1: Tiling and colors
+def tile_matrices(matrices, columns, gap=1):
+    """
+    Arranges a stack of matrices in a grid.
+
+    Parameters:
+    - matrices: Array-like of shape (N, r, c).
+    - columns: Number of matrices per row of the grid.
+    - gap: Empty cells (NaN) between neighbouring matrices.
+
+    Returns:
+    - Float array of shape (rows * (r + gap) - gap, columns * (c + gap) - gap).
+    """
+    stack = np.asarray(matrices, dtype=float)
+    count, r, c = stack.shape
+    rows = max(-(-count // columns), 1)
+    padded = np.full((rows * columns, r + gap, c + gap), np.nan)
+    padded[:count, :r, :c] = stack
+    tiles = padded.reshape(rows, columns, r + gap, c + gap).transpose(0, 2, 1, 3)
+    return tiles.reshape(rows * (r + gap), columns * (c + gap))[:rows * (r + gap) - gap, :columns * (c + gap) - gap]
+
+def default_format(dtype):
+    """Cell label format: plain integers, or two decimals like plot_and_save_matrices."""
+    return '{:.0f}' if np.issubdtype(dtype, np.integer) else '{:.2f}'
+
+# Step 2: Glyph atlas
+def glyph_atlas(labels, cell_px=DEFAULT_CELL_PX, fontsize=None, weight='bold'):
+    """
+    Rasterizes every label once, centered in a cell.
+
+    Parameters:
+    - labels: Iterable of strings.
+    - cell_px: Cell size in pixels.
+    - fontsize: Font size in points (fit to the cell and the longest label if None).
+
+    Returns:
+    - Dict mapping each label to its coverage mask, a float array of shape (cell_px, cell_px).
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    labels = list(labels)
+    if fontsize is None:
+        longest = max((len(label) for label in labels), default=1)
+        fontsize = min(0.45 * cell_px, 0.9 * cell_px / (0.62 * longest)) * 72 / GLYPH_DPI
+
+    # All labels side by side on one strip, drawn once
+    figure = Figure(figsize=(cell_px * max(len(labels), 1) / GLYPH_DPI, cell_px / GLYPH_DPI), dpi=GLYPH_DPI)
+    canvas = FigureCanvasAgg(figure)
+    figure.patch.set_alpha(0)
+    for i, label in enumerate(labels):
+        figure.text((i + 0.5) / len(labels), 0.5, label, ha='center', va='center', fontsize=fontsize, weight=weight)
+    canvas.draw()
+    strip = np.asarray(canvas.buffer_rgba())[:cell_px, :, 3] / 255.0
+    return {label: strip[:, i * cell_px:(i + 1) * cell_px] for i, label in enumerate(labels)}
+
+def _stamp_labels(image, stack, columns, gap, cell_px, fmt, color):
+    # Blend the glyph of every distinct value into all cells holding it, indexing whole
+    # cells of a (cell row, pixel row, cell column, pixel column, channel) view of the image
+    count, r, c = stack.shape
+    labels = {value: fmt.format(value) for value in np.unique(stack).tolist()}
+    atlas = glyph_atlas(set(labels.values()), cell_px)
+    cells = image.reshape(image.shape[0] // cell_px, cell_px, image.shape[1] // cell_px, cell_px, 3)
+    ink = np.asarray(color, dtype=np.float32) * 255
+    for value, label in labels.items():
+        k, y, x = np.nonzero(stack == value)
+        top = (k // columns) * (r + gap) + y
+        left = (k % columns) * (c + gap) + x
+        alpha = atlas[label].astype(np.float32)[None, :, :, None]
+        cells[top, :, left, :] = (cells[top, :, left, :] * (1 - alpha) + ink * alpha + 0.5).astype(np.uint8)
+
+# Step 3: Mosaic image
+def mosaic_image(matrices, columns=None, cell_px=DEFAULT_CELL_PX, gap=1, annotate=True, fmt=None,
+                 cmap='viridis', vmin=None, vmax=None, text_color=(1, 1, 1), background=(1, 1, 1)):
+    """
+    Renders a stack of matrices as one RGB image.
+
+    Parameters:
+    - matrices: Array-like of shape (N, r, c).
+    - columns: Matrices per row of the grid (about square if None).
+    - cell_px: Pixels per matrix cell.
+    - gap: Empty cells between matrices.
+    - annotate: Print the value in every cell.
+    - fmt: Label format string (from the dtype if None).
+    - cmap, vmin, vmax: Color scale (the range of the stack if vmin/vmax are None).
+    - text_color, background: RGB colors of the labels and of the gaps.
+
+    Returns:
+    - uint8 array of shape (height, width, 3).
+    """
+    import matplotlib
+    stack = np.asarray(matrices)
+    columns = columns or max(math.ceil(math.sqrt(len(stack))), 1)
+    tiles = tile_matrices(stack, columns, gap)
+    vmin = stack.min() if vmin is None else vmin
+    vmax = stack.max() if vmax is None else vmax
+
+    # One colormap lookup at cell resolution, then one repeat to pixel resolution
+    colors = matplotlib.colormaps[cmap](matplotlib.colors.Normalize(vmin=vmin, vmax=vmax)(tiles))[..., :3]
+    colors[np.isnan(tiles)] = background
+    colors = (colors * 255).round().astype(np.uint8)
+    image = np.repeat(np.repeat(colors, cell_px, axis=0), cell_px, axis=1)
+
+    if annotate:
+        _stamp_labels(image, stack, columns, gap, cell_px, fmt or default_format(stack.dtype), text_color)
+    return image
+
+def show_mosaic(matrices, columns=None, annotate=True, fmt=None, cmap='viridis', title=None):
+    """
+    Draws a stack of matrices with a single imshow and one colorbar.
+
+    Returns:
+    - The matplotlib figure.
+    """
+    import matplotlib.pyplot as plt
+    stack = np.asarray(matrices)
+    columns = columns or max(math.ceil(math.sqrt(len(stack))), 1)
+    image = mosaic_image(stack, columns=columns, annotate=annotate, fmt=fmt, cmap=cmap)
+    height, width = image.shape[:2]
+    # About one screen pixel per image pixel, leaving room for the colorbar and the title
+    fig, ax = plt.subplots(figsize=(min(width / GLYPH_DPI / 0.7, 20), min(height / GLYPH_DPI / 0.8, 20)), dpi=GLYPH_DPI)
+    ax.imshow(image, interpolation='nearest')
+    ax.set_xticks([])
+    ax.set_yticks([])
+    if title:
+        ax.set_title(title, fontsize=10, weight='bold')
+    mappable = plt.cm.ScalarMappable(norm=plt.Normalize(vmin=stack.min(), vmax=stack.max()), cmap=cmap)
+    fig.colorbar(mappable, ax=ax, fraction=0.046, pad=0.04)
+    return fig
+
+# Step 4: Contact sheets
+def save_contact_sheets(matrices, output_dir, per_page=256, columns=16, prefix='mosaic', **options):
+    """
+    Writes a corpus as pages of mosaic PNGs with one color scale for all pages.
+
+    Parameters:
+    - matrices: Array-like of shape (N, r, c) (a memory-mapped .npy works).
+    - output_dir: Directory of the PNG files.
+    - per_page: Matrices per page.
+    - columns: Matrices per row of a page.
+    - prefix: File name prefix; pages are <prefix>_<page>.png, numbered from 1.
+    - options: Further mosaic_image arguments (cell_px, annotate, fmt, cmap, ...).
+
+    Returns:
+    - List of (filename, first, last), the 1-based matrix numbers on every page.
+    """
+    import matplotlib.image
+    stack = matrices if isinstance(matrices, np.ndarray) else np.asarray(matrices)
+    options.setdefault('vmin', stack.min())
+    options.setdefault('vmax', stack.max())
+    os.makedirs(output_dir, exist_ok=True)
+    pages = []
+    for page, start in enumerate(range(0, len(stack), per_page), 1):
+        stop = min(start + per_page, len(stack))
+        filename = os.path.join(output_dir, f"{prefix}_{page}.png")
+        matplotlib.image.imsave(filename, mosaic_image(stack[start:stop], columns=columns, **options))
+        pages.append((filename, start + 1, stop))
+    return pages
+
+def main():
+    from every_operation_fdiff import read_matrices
+    parser = argparse.ArgumentParser(description="Heatmaps of a matrix corpus as paged mosaic PNGs.")
+    parser.add_argument("input_file", type=str, help="Input matrices, one per line, or a .npy stack.")
+    parser.add_argument("output_dir", type=str, help="Output directory of the pages.")
+    parser.add_argument("--per-page", type=int, default=256, help="Matrices per page.")
+    parser.add_argument("--columns", type=int, default=16, help="Matrices per row of a page.")
+    parser.add_argument("--cell", type=int, default=DEFAULT_CELL_PX, help="Pixels per matrix cell.")
+    parser.add_argument("--no-annotate", dest='annotate', action="store_false", help="Do not print values in the cells.")
+    parser.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite pages in the output directory.")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.input_file):
+        print(f"Error: Input file '{args.input_file}' does not exist.")
+        exit(1)
+    if os.path.isfile(os.path.join(args.output_dir, 'mosaic_1.png')) and not args.yes:
+        print(f"Error: Output directory '{args.output_dir}' already has pages. Use -y to overwrite.")
+        exit(1)
+
+    pages = save_contact_sheets(np.asarray(read_matrices(args.input_file)), args.output_dir, per_page=args.per_page,
+                                columns=args.columns, cell_px=args.cell, annotate=args.annotate)
+    for filename, first, last in pages:
+        print(f"Matrices {first}-{last} saved as '{filename}'.")
+
+if __name__ == '__main__':
+    main()
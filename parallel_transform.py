@@ -0,0 +1,108 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from every_operation_fdiff import read_matrices, write_matrices, transform_value_bound, narrowest_int_dtype, finite_difference_transform_stack
+
+# Parallel finite difference transform of one large stack (e.g. all 8! relabelings of a table).
+#
+# The input and output stacks live in multiprocessing.shared_memory blocks. Workers attach
+# to both blocks once, when they start, and each task is only a (start, stop) slice: the
+# worker transforms input[start:stop] and writes the result into output[start:stop]. No
+# matrix is pickled in either direction.
+
+# Views of the shared blocks inside a worker, set by _attach
+_WORKER = {}
+
+def _attach(input_name, output_name, shape, input_dtype, output_dtype, order):
+    input_block = shared_memory.SharedMemory(name=input_name)
+    output_block = shared_memory.SharedMemory(name=output_name)
+    _WORKER.update({
+        'blocks': (input_block, output_block),
+        'input': np.ndarray(shape, dtype=input_dtype, buffer=input_block.buf),
+        'output': np.ndarray(shape, dtype=output_dtype, buffer=output_block.buf),
+        'order': order,
+    })
+
+def _transform_slice(bounds):
+    start, stop = bounds
+    output = _WORKER['output']
+    output[start:stop] = finite_difference_transform_stack(_WORKER['input'][start:stop], order=_WORKER['order'], dtype=output.dtype)
+    return stop - start
+
+def _shared_array(shape, dtype):
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def parallel_transform_stack(matrices, order=2, dtype=None, jobs=None, chunk_size=4096):
+    """
+    Finite difference transform of a stack, split over worker processes through shared memory.
+
+    Parameters:
+    - matrices: Array of shape (N, n, n) (a memory-mapped .npy works and is read once, while
+      it is copied into shared memory).
+    - order: Order of the transformation.
+    - dtype: Output dtype; chosen from the value bound of the input if None.
+    - jobs: Number of worker processes (all cores if None).
+    - chunk_size: Number of matrices per task.
+
+    Returns:
+    - The transformed stack, equal to finite_difference_transform_stack(matrices, order).
+    """
+    jobs = jobs or os.cpu_count()
+    shape = tuple(matrices.shape)
+    input_block, shared_input = _shared_array(shape, matrices.dtype)
+    output_block = shared_output = None
+    try:
+        # One pass over the input: copied into shared memory chunk by chunk, value range on the way
+        lows, highs = [], []
+        for start in range(0, shape[0], chunk_size):
+            chunk = shared_input[start:start + chunk_size]
+            chunk[...] = matrices[start:start + chunk_size]
+            lows.append(int(chunk.min()))
+            highs.append(int(chunk.max()))
+        if dtype is None:
+            low, high = (min(lows), max(highs)) if lows else (0, 0)
+            dtype = narrowest_int_dtype(transform_value_bound(order, low, high))
+        output_block, shared_output = _shared_array(shape, dtype)
+        bounds = [(start, min(start + chunk_size, shape[0])) for start in range(0, shape[0], chunk_size)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_attach,
+                                 initargs=(input_block.name, output_block.name, shape, matrices.dtype, dtype, order)) as executor:
+            for _ in executor.map(_transform_slice, bounds):
+                pass
+        return shared_output.copy()
+    finally:
+        del shared_input, shared_output
+        for block in (input_block, output_block):
+            if block is not None:
+                block.close()
+                block.unlink()
+
+def main():
+    parser = argparse.ArgumentParser(description="Finite difference transform of a large matrix stack on all cores through shared memory.")
+    parser.add_argument("input_file", type=str, help="Input matrices, one per line, or a .npy stack.")
+    parser.add_argument("output_file", type=str, help="Output file (.npy for a binary stack, text otherwise).")
+    parser.add_argument("-o", "--order", type=int, default=2, help="Order of the transformation (positive integer).")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes (default: all cores).")
+    parser.add_argument("--chunk-size", type=int, default=4096, help="Number of matrices per task.")
+    parser.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite output file if it exists.")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.input_file):
+        print(f"Error: Input file '{args.input_file}' does not exist.")
+        exit(1)
+    if os.path.isfile(args.output_file) and not args.yes:
+        print(f"Error: Output file '{args.output_file}' already exists. Use -y to overwrite.")
+        exit(1)
+
+    if args.input_file.endswith('.npy'):
+        matrices = np.load(args.input_file, mmap_mode='r')
+    else:
+        matrices = np.stack(read_matrices(args.input_file))
+    transformed = parallel_transform_stack(matrices, order=args.order, jobs=args.jobs, chunk_size=args.chunk_size)
+    write_matrices(args.output_file, transformed)
+    print(f"{len(transformed)} matrices transformed and saved to '{args.output_file}'.")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import itertools
 import ast
 import os
+import numpy as np
 from tqdm import tqdm
 
 def invert_permutation(p):
@@ -44,6 +45,69 @@ def generate_alternative_matrices(m, output_filename):
             # Write the permuted matrix to the output file
             f_output.write(str(m_p) + '\n')
 
+def permutation_batches(n, batch_size):
+    """
+    Yields all permutations of range(n) in itertools order, as arrays of shape (batch, n).
+
+    Parameters:
+    - n: Number of elements.
+    - batch_size: Maximum number of permutations per batch.
+    """
+    iterator = itertools.permutations(range(n))
+    while True:
+        batch = np.fromiter(itertools.chain.from_iterable(itertools.islice(iterator, batch_size)), dtype=np.intp)
+        if batch.size == 0:
+            return
+        yield batch.reshape(-1, n)
+
+def relabel_batch(m, perms):
+    """
+    Applies every permutation in perms to the operation table m at once.
+
+    Row b of the result equals the table generate_alternative_matrices builds for perms[b].
+
+    Parameters:
+    - m: Original operation table (array-like of shape (n, n)).
+    - perms: Array of permutations with shape (batch, n).
+
+    Returns:
+    - Array of relabeled tables with shape (batch, n, n).
+    """
+    m = np.asarray(m)
+    batch, n = perms.shape
+    p_inv = np.argsort(perms, axis=1)
+    # m_p[x][y] = p[m[p_inv[x]][p_inv[y]]]
+    pre_values = m[p_inv[:, :, None], p_inv[:, None, :]]
+    return np.take_along_axis(perms, pre_values.reshape(batch, n * n), axis=1).reshape(batch, n, n)
+
+def canonical_form(m, perms=None):
+    """
+    Canonical representative of the isomorphism class of an operation table: the relabeling
+    that is lexicographically smallest when read row by row. Two tables are isomorphic
+    exactly when their canonical forms are equal.
+
+    Parameters:
+    - m: Operation table (array-like of shape (n, n)).
+    - perms: Optional array of all permutations of range(n), to reuse across many tables.
+
+    Returns:
+    - The canonical table as an array of shape (n, n).
+    """
+    m = np.asarray(m)
+    n = len(m)
+    if perms is None:
+        perms = next(permutation_batches(n, factorial(n)))
+    tables = relabel_batch(m, perms).reshape(len(perms), n * n)
+    # Keep only the candidates that are smallest in every column so far
+    rows = np.arange(len(tables))
+    for column in range(n * n):
+        values = tables[rows, column]
+        rows = rows[values == values.min()]
+        if len(rows) == 1:
+            break
+    # Copy, so the result does not keep the whole relabeling batch alive
+    return tables[rows[0]].reshape(n, n).copy()
+
 def read_matrices_from_file(filename):
     """
     Reads multiple matrices from a file, each row as a separate matrix.
@@ -0,0 +1,202 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from permutations import read_matrices_from_file, permutation_batches, relabel_batch
+from every_operation_fdiff import read_matrices, narrowest_int_dtype, transform_dtype, finite_difference_transform_stack
+from fused_zeros import write_zeros_file
+from result_cache import DEFAULT_MAX_BYTES, data_digest, cached_call, report_stats
+
+# In-process replacement for run_all_bash.sh / run_all_bash_zeros.sh.
+#
+# A pipeline file lists the items to run (a list, or {"range": [first, last]} for an
+# inclusive range such as matrix indices 1..24) and the stages applied to every item.
+# Input/output paths and string parameters may contain "{i}", which is replaced by the item.
+# Stages of one item run in the same process and hand their arrays to the next stage in
+# memory; "write": false keeps an output in memory only.
+#
+# A stage is skipped when its output exists and the manifest records the same stage,
+# parameters and input digest that produced it (make-style incremental execution). The
+# input digest is taken from the data the stage consumes, which may come from memory rather
+# than from the file at its input path, so a stale file there never causes a wrong skip.
+# With a cache directory, array results of permute/transform are also looked up in
+# result_cache by input content, so identical work in other items or runs is reused.
+
+MANIFEST_FILE = '.pipeline_manifest.json'
+
+# Step 1: Stage implementations, each takes the input array and the stage parameters
+def permute_stage(tables, params):
+    """All relabelings of one operation table, in permutations.py line order."""
+    table = np.asarray(tables[int(params.get('row', 1)) - 1])
+    dtype = narrowest_int_dtype(len(table) - 1)
+    return np.concatenate([relabel_batch(table, perms).astype(dtype) for perms in permutation_batches(len(table), 8192)])
+
+def transform_stage(matrices, params):
+    """Finite difference transform of the whole stack (every_operation_fdiff.py)."""
+    order = int(params.get('order', 2))
+    return finite_difference_transform_stack(matrices, order=order, dtype=transform_dtype(matrices, order))
+
+def zeros_stage(matrices, params):
+    """Matrices with the most zeros (check_zeros.py); returns (max_zeros, row_indices, matrices)."""
+    zero_counts = np.count_nonzero(matrices == 0, axis=(1, 2))
+    max_zeros = int(zero_counts.max())
+    rows = np.flatnonzero(zero_counts == max_zeros)
+    return max_zeros, (rows + 1).tolist(), matrices[rows]
+
+STAGES = {
+    'permute': permute_stage,
+    'transform': transform_stage,
+    'zeros': zeros_stage,
+}
+
+CACHEABLE_STAGES = ('permute', 'transform')
+
+def cache_params(stage, params):
+    # Same key as every_operation_fdiff.py --cache-dir, so both share cached transforms
+    if stage == 'transform':
+        return {'method': 'finite_difference', 'order': int(params.get('order', 2))}
+    return params
+
+# Step 2: Reading and writing stage data
+def load_input(stage, path):
+    if stage == 'permute':
+        return read_matrices_from_file(path)
+    return np.asarray(np.stack(list(read_matrices(path))))
+
+def write_output(stage, path, result):
+    if stage == 'zeros':
+        write_zeros_file(path, *result)
+    elif path.endswith('.npy'):
+        np.save(path, result)
+    else:
+        # Same text layout as permutations.py and every_operation_fdiff.py
+        with open(path, 'w') as file:
+            for matrix in result:
+                file.write(f"{matrix.tolist()}\n")
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def expand(value, item):
+    if isinstance(value, str):
+        return value.replace('{i}', str(item))
+    return value
+
+# Step 3: Run all stages for one item
+def run_item(item, stages, manifest, force=False, cache_dir=None, cache_size=DEFAULT_MAX_BYTES):
+    """
+    Runs the stage chain for one item and returns (log lines, manifest updates).
+    """
+    memory = {}
+    log = []
+    updates = {}
+    for spec in stages:
+        stage = spec['stage']
+        input_path = expand(spec['input'], item)
+        output_path = expand(spec['output'], item)
+        write = spec.get('write', True)
+        params = {key: expand(value, item) for key, value in spec.get('params', {}).items()}
+
+        if input_path in memory:
+            data = memory[input_path]
+        elif os.path.isfile(input_path):
+            data = load_input(stage, input_path)
+        else:
+            raise FileNotFoundError(f"Input file '{input_path}' does not exist.")
+
+        record = None
+        # Only outputs written to disk can be checked for staleness
+        if write:
+            record = {'stage': stage, 'params': params, 'input': input_path, 'input_digest': data_digest(data)}
+            previous = manifest.get(output_path)
+            if (not force and previous is not None and os.path.isfile(output_path)
+                    and {key: previous.get(key) for key in record} == record
+                    and previous.get('output_digest') == file_digest(output_path)):
+                log.append(f"[{item}] {stage}: '{output_path}' is up to date, skipped")
+                continue
+
+        if cache_dir and stage in CACHEABLE_STAGES:
+            result = cached_call(cache_dir, data_digest(data), stage, cache_params(stage, params),
+                                 lambda: STAGES[stage](data, params), cache_size)
+        else:
+            result = STAGES[stage](data, params)
+        memory[output_path] = result
+        if not write:
+            log.append(f"[{item}] {stage}: '{input_path}' -> '{output_path}' (kept in memory)")
+            continue
+
+        write_output(stage, output_path, result)
+        if record is not None:
+            record['output_digest'] = file_digest(output_path)
+            updates[output_path] = record
+        log.append(f"[{item}] {stage}: '{input_path}' -> '{output_path}'")
+    return log, updates
+
+def _run_item_job(job):
+    return run_item(*job)
+
+def load_manifest(path):
+    if os.path.isfile(path):
+        with open(path, 'r') as file:
+            return json.load(file)
+    return {}
+
+def parse_items(items):
+    # {"range": [first, last]} is an inclusive range, a list is taken as it is
+    if isinstance(items, dict):
+        first, last = items['range']
+        return list(range(first, last + 1))
+    return list(items)
+
+def run_pipeline(config, jobs=1, force=False, manifest_path=MANIFEST_FILE, cache_dir=None, cache_size=DEFAULT_MAX_BYTES):
+    manifest = load_manifest(manifest_path)
+    items = parse_items(config.get('items', [None]))
+    stages = config['stages']
+    for spec in stages:
+        if spec['stage'] not in STAGES:
+            raise ValueError(f"Unknown stage: {spec['stage']}")
+
+    job_list = [(item, stages, manifest, force, cache_dir, cache_size) for item in items]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_run_item_job, job_list))
+    else:
+        results = [_run_item_job(job) for job in job_list]
+
+    for log, updates in results:
+        for line in log:
+            print(line)
+        manifest.update(updates)
+    with open(manifest_path, 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    if cache_dir:
+        report_stats(cache_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the permute/transform/zeros stages for every item in one process (or a worker pool).")
+    parser.add_argument("pipeline_file", nargs='?', default='pipeline.json', help="JSON file with 'items' and the list of 'stages'.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes (one item per task).")
+    parser.add_argument("-f", "--force", action="store_true", help="Rerun every stage even if its output is up to date.")
+    parser.add_argument("-m", "--manifest", type=str, default=MANIFEST_FILE, help="Path of the manifest used for incremental runs.")
+    parser.add_argument("--cache-dir", type=str, default=None, help="Directory of the result cache (disabled if not given).")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2, help="Maximum cache size in MB.")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.pipeline_file):
+        print(f"Error: Pipeline file '{args.pipeline_file}' does not exist.")
+        exit(1)
+    with open(args.pipeline_file, 'r') as file:
+        config = json.load(file)
+
+    run_pipeline(config, jobs=args.jobs, force=args.force, manifest_path=args.manifest,
+                 cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 ** 2)
+    print("All items completed.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Headless bulk export: one plain heatmap PNG per matrix, without figures, axes or text.
+#
+# Colors come from a lookup table with one entry per integer value, built once from the
+# matplotlib colormap and norm so they match the plotting scripts. When the corpus has at
+# most 256 distinct values the table is the PNG palette and the pixels are its indices (one
+# byte per pixel, a third of the data to compress); otherwise pixels are 8-bit RGB. Cells
+# are upscaled by an integer factor with np.repeat and the PNGs are written with zlib.
+# Batches of matrices are converted together and can be spread over worker processes.
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Step 1: Colors
+def color_scheme(name, vmin, vmax):
+    """
+    Colormap and norm of a plotting script.
+
+    Parameters:
+    - name: 'viridis' (plot_and_save_matrices, scaled to [vmin, vmax]) or 'boundary'
+      (the ListedColormap/BoundaryNorm of every_operation.py).
+    - vmin, vmax: Value range of the corpus.
+    """
+    import matplotlib
+    import matplotlib.colors as mcolors
+    if name == 'viridis':
+        return matplotlib.colormaps['viridis'], mcolors.Normalize(vmin=vmin, vmax=vmax)
+    if name == 'boundary':
+        cmap = mcolors.ListedColormap(["#f7f7f7", "#add8e6", "#87ceeb", "#4682b4", "#4169e1"])
+        return cmap, mcolors.BoundaryNorm([-2, -1, 0, 1, 2, 4], cmap.N)
+    raise ValueError(f"Unknown color scheme: {name}")
+
+def color_lut(cmap, norm, vmin, vmax):
+    """
+    RGB colors of the integers vmin..vmax, as a uint8 array of shape (vmax - vmin + 1, 3).
+    """
+    return cmap(norm(np.arange(vmin, vmax + 1)), bytes=True)[:, :3]
+
+def _upscale(images, scale):
+    if scale > 1:
+        images = np.repeat(np.repeat(images, scale, axis=1), scale, axis=2)
+    return images
+
+def color_batch(matrices, lut, vmin, scale=1):
+    """
+    Colors a stack of integer matrices and upscales every cell to scale x scale pixels.
+
+    Returns:
+    - uint8 array of shape (N, r * scale, c * scale, 3).
+    """
+    return _upscale(lut[np.asarray(matrices, dtype=np.intp) - vmin], scale)
+
+def index_batch(matrices, vmin, scale=1):
+    """
+    Palette indices (value - vmin) of a stack with at most 256 distinct values, upscaled.
+
+    Returns:
+    - uint8 array of shape (N, r * scale, c * scale).
+    """
+    return _upscale((np.asarray(matrices) - vmin).astype(np.uint8), scale)
+
+# Step 2: PNG encoding
+def _chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+def png_bytes(pixels, palette=None, compress_level=6):
+    """
+    Encodes an image as a PNG file.
+
+    Parameters:
+    - pixels: uint8 array, (height, width, 3) RGB or, with a palette, (height, width) indices.
+    - palette: Optional uint8 array of shape (colors, 3), at most 256 colors.
+    - compress_level: zlib level of the image data (0-9).
+    """
+    height, width = pixels.shape[:2]
+    row_bytes = pixels[0].size
+    # Every scanline starts with filter type 0 (none)
+    raw = np.zeros((height, 1 + row_bytes), dtype=np.uint8)
+    raw[:, 1:] = pixels.reshape(height, row_bytes)
+    color_type = 2 if palette is None else 3
+    data = PNG_SIGNATURE + _chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+    if palette is not None:
+        data += _chunk(b'PLTE', np.ascontiguousarray(palette, dtype=np.uint8).tobytes())
+    return data + _chunk(b'IDAT', zlib.compress(raw.tobytes(), compress_level)) + _chunk(b'IEND', b'')
+
+def _write_batch(batch):
+    # batch: (matrices, first index, output_dir, prefix, lut, vmin, scale, compress_level)
+    matrices, first, output_dir, prefix, lut, vmin, scale, compress_level = batch
+    if len(lut) <= 256:
+        images, palette = index_batch(matrices, vmin, scale), lut
+    else:
+        images, palette = color_batch(matrices, lut, vmin, scale), None
+    for i, pixels in enumerate(images, first):
+        with open(os.path.join(output_dir, f"{prefix}_{i}.png"), 'wb') as file:
+            file.write(png_bytes(pixels, palette, compress_level))
+    return len(matrices)
+
+# Step 3: Bulk export
+def export_pngs(matrices, output_dir='matrix_plots', scheme='viridis', scale=32, jobs=1, batch_size=1024,
+                prefix='matrix', compress_level=6):
+    """
+    Writes one heatmap PNG per matrix, named <prefix>_<i>.png from 1 like plot_and_save_matrices.
+
+    Parameters:
+    - matrices: Integer array-like of shape (N, r, c) (a memory-mapped .npy works).
+    - output_dir: Directory of the PNG files.
+    - scheme: Color scheme name, see color_scheme.
+    - scale: Pixels per matrix cell.
+    - jobs: Number of worker processes (1 writes in this process).
+    - batch_size: Matrices colored and written per task.
+    - compress_level: zlib level of the PNG data (0-9).
+
+    Returns:
+    - The number of files written.
+    """
+    stack = matrices if isinstance(matrices, np.ndarray) else np.asarray(matrices)
+    if not np.issubdtype(stack.dtype, np.integer):
+        raise ValueError(f"PNG export needs integer matrices, got {stack.dtype}.")
+    vmin, vmax = int(stack.min()), int(stack.max())
+    lut = color_lut(*color_scheme(scheme, vmin, vmax), vmin, vmax)
+    os.makedirs(output_dir, exist_ok=True)
+
+    batches = ((np.asarray(stack[start:start + batch_size]), start + 1, output_dir, prefix, lut, vmin, scale, compress_level)
+               for start in range(0, len(stack), batch_size))
+    if jobs <= 1:
+        return sum(map(_write_batch, batches))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return sum(executor.map(_write_batch, batches))
+
+def main():
+    from every_operation_fdiff import read_matrices
+    parser = argparse.ArgumentParser(description="Write one plain heatmap PNG per matrix, without matplotlib figures.")
+    parser.add_argument("input_file", type=str, help="Input matrices, one per line, or a .npy stack.")
+    parser.add_argument("output_dir", type=str, nargs='?', default='matrix_plots', help="Output directory of the PNG files.")
+    parser.add_argument("-c", "--cmap", choices=['viridis', 'boundary'], default='viridis', help="Color scheme: viridis over the value range, or the fixed bounds of every_operation.py.")
+    parser.add_argument("-s", "--scale", type=int, default=32, help="Pixels per matrix cell.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of worker processes.")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Matrices per task.")
+    parser.add_argument("-y", "--yes", action="store_true", help="Automatically overwrite PNG files in the output directory.")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.input_file):
+        print(f"Error: Input file '{args.input_file}' does not exist.")
+        exit(1)
+    if os.path.isfile(os.path.join(args.output_dir, 'matrix_1.png')) and not args.yes:
+        print(f"Error: Output directory '{args.output_dir}' already has PNG files. Use -y to overwrite.")
+        exit(1)
+
+    written = export_pngs(np.asarray(read_matrices(args.input_file)), args.output_dir, scheme=args.cmap, scale=args.scale,
+                          jobs=args.jobs, batch_size=args.batch_size)
+    print(f"{written} PNG files saved in '{args.output_dir}'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # No advisory locks (e.g. Windows): writes stay atomic, stats may race
+    fcntl = None
+
+# Content-addressed cache for stage results.
+#
+# An entry is keyed by the digest of the stage input values (data_digest, so the same tables
+# hit whether they come as int8 or int64), the stage name and its parameters and stored as
+# <cache_dir>/<key[:2]>/<key>.npy. Entries are written to a temporary file and
+# renamed into place, so concurrent workers never see partial files. Hits refresh the entry's
+# mtime and eviction removes the least recently used entries once the cache exceeds its size
+# limit. Hit/miss counters live in <cache_dir>/stats.json, which is read and replaced (never
+# rewritten in place) under a file lock.
+
+DEFAULT_CACHE_DIR = '.magma_cache'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+def array_digest(array):
+    """
+    Digest of an array's dtype, shape and contents.
+    """
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256()
+    digest.update(f"{array.dtype.str}{array.shape}".encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def data_digest(data):
+    """
+    Digest of the values of an array: integer arrays are digested as int64, so a narrowed
+    stack and the same matrices read back from a text file share cache entries.
+    """
+    array = np.asarray(data)
+    if np.issubdtype(array.dtype, np.integer):
+        array = array.astype(np.int64)
+    return array_digest(array)
+
+def cache_key(input_digest, stage, params):
+    """
+    Key of a stage result: input digest, stage name and canonical JSON of the parameters.
+    """
+    payload = json.dumps([input_digest, stage, params], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _entry_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f"{key}.npy")
+
+@contextmanager
+def _locked(cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, '.lock'), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _read_stats(cache_dir):
+    # Callers hold the lock
+    stats = {'hits': 0, 'misses': 0}
+    stats_path = os.path.join(cache_dir, 'stats.json')
+    if os.path.isfile(stats_path):
+        with open(stats_path, 'r') as file:
+            stats.update(json.load(file))
+    return stats
+
+def _record(cache_dir, field):
+    with _locked(cache_dir):
+        try:
+            stats = _read_stats(cache_dir)
+        except ValueError:
+            # Unreadable counters (e.g. written in place by an older version) start over
+            stats = {'hits': 0, 'misses': 0}
+        stats[field] += 1
+        # Replaced atomically, so a reader without the lock never sees a half-written file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(stats, file)
+        os.replace(tmp_path, os.path.join(cache_dir, 'stats.json'))
+
+def cache_get(cache_dir, key):
+    """
+    Returns the cached array for key, or None on a miss.
+    """
+    path = _entry_path(cache_dir, key)
+    try:
+        array = np.load(path)
+        os.utime(path)  # Mark as recently used
+    except (FileNotFoundError, ValueError, EOFError):
+        # Missing, or evicted/replaced while being read
+        _record(cache_dir, 'misses')
+        return None
+    _record(cache_dir, 'hits')
+    return array
+
+def _entries(cache_dir):
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            if name.endswith('.npy'):
+                path = os.path.join(root, name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, info.st_size, info.st_mtime
+
+def evict(cache_dir, max_bytes):
+    """
+    Removes least recently used entries until the cache holds at most max_bytes.
+    """
+    with _locked(cache_dir):
+        entries = sorted(_entries(cache_dir), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def cache_put(cache_dir, key, array, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Stores array under key (atomically) and evicts old entries if the cache is over max_bytes.
+    """
+    path = _entry_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    evict(cache_dir, max_bytes)
+
+def cached_call(cache_dir, input_digest, stage, params, compute, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Returns the cached result of stage(params) on the input with input_digest, running
+    compute() and storing its array result on a miss.
+    """
+    key = cache_key(input_digest, stage, params)
+    result = cache_get(cache_dir, key)
+    if result is None:
+        result = compute()
+        cache_put(cache_dir, key, result, max_bytes)
+    return result
+
+def cache_stats(cache_dir):
+    with _locked(cache_dir):
+        stats = _read_stats(cache_dir)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    entries = list(_entries(cache_dir))
+    stats['entries'] = len(entries)
+    stats['bytes'] = sum(size for _, size, _ in entries)
+    return stats
+
+def format_stats(stats):
+    return (f"Cache: {stats['hits']} hits, {stats['misses']} misses ({100 * stats['hit_rate']:.1f}% hit rate), "
+            f"{stats['entries']} entries, {stats['bytes'] / 1024 ** 2:.1f} MB")
+
+def report_stats(cache_dir):
+    """
+    Prints the cache statistics. Called after a run's outputs are written, so a failure here
+    is only reported and never loses results.
+    """
+    try:
+        print(format_stats(cache_stats(cache_dir)))
+    except (OSError, ValueError) as e:
+        print(f"Warning: Cache statistics of '{cache_dir}' are unavailable: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the stage result cache.")
+    parser.add_argument("command", choices=['stats', 'clear'], help="'stats' prints hit rate and size, 'clear' removes every entry.")
+    parser.add_argument("cache_dir", nargs='?', default=DEFAULT_CACHE_DIR, help="Cache directory.")
+    args = parser.parse_args()
+
+    if args.command == 'clear':
+        evict(args.cache_dir, 0)
+        if os.path.isfile(os.path.join(args.cache_dir, 'stats.json')):
+            os.remove(os.path.join(args.cache_dir, 'stats.json'))
+    print(format_stats(cache_stats(args.cache_dir)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import numpy as np
+import sympy as sp
+from functools import reduce
+from coeff import apply_operator
+
+# Disk-backed memo of the solved forward/inverse systems of expression.py and
+# expression_matrix_information.py.
+#
+#     a_star[i, j] = offset(i, j) - sum_{i' <= i, j' <= j} C[i', j'] * a[i', j']
+#
+# is solved with sp.solve for a_star (forward) or a (inverse). The solution only depends on
+# the process, n, the coefficient matrix C and the offset formula, so it is solved once and
+# stored as <cache_dir>/<key[:2]>/<key>.json, keyed by those four (the offset in canonical
+# SymPy form, so "(i + 1) + (j + 1) - 1" and "i + j + 1" share an entry). An entry holds the
+# solution as text and the same solution as an exact affine map (P, q, d) with
+# result = (P x + q) / d over row-major flattened matrices. That map is the compiled
+# evaluator: apply_operator runs it on a whole batch with one NumPy product, so later runs
+# neither solve nor substitute. Entries are written to a temporary file and renamed into
+# place, and solved systems are also kept in memory for the rest of the process.
+
+DEFAULT_SOLVED_DIR = '.solved_systems'
+DEFAULT_OFFSET = 'i + j + 1'
+SOLVER_VERSION = 1
+
+# Solved systems of this process, keyed like the cache entries
+_SOLVED = {}
+
+# Step 1: The system
+def _canonical(n, coeff_matrix, offset):
+    # All-ones coefficients when none are given (the plain prefix sums of the expression scripts)
+    rows = coeff_matrix.tolist() if hasattr(coeff_matrix, 'tolist') else coeff_matrix
+    coeffs = [[sp.Rational(1 if rows is None else rows[i][j]) for j in range(n)] for i in range(n)]
+    i, j = sp.symbols('i j')
+    return coeffs, sp.sympify(offset, locals={'i': i, 'j': j})
+
+def system_equations(n, coeffs, offset_expr):
+    """
+    Equations a_star[i, j] = offset(i, j) - weighted prefix sum of a, in row-major order.
+    """
+    a = sp.MatrixSymbol('a', n, n)
+    a_star = sp.MatrixSymbol('a_star', n, n)
+    i, j = sp.symbols('i j')
+    equations = []
+    for row in range(n):
+        for col in range(n):
+            sum_expr = sum(coeffs[i_prime][j_prime] * a[i_prime, j_prime]
+                           for i_prime in range(row + 1) for j_prime in range(col + 1))
+            equations.append(sp.Eq(a_star[row, col], offset_expr.subs({i: row, j: col}) - sum_expr))
+    return equations
+
+def _solve(process, n, coeffs, offset_expr):
+    a = sp.MatrixSymbol('a', n, n)
+    a_star = sp.MatrixSymbol('a_star', n, n)
+    unknowns, variables = (a_star, a) if process == 'forward' else (a, a_star)
+    unknowns = [unknowns[i, j] for i in range(n) for j in range(n)]
+    variables = [variables[i, j] for i in range(n) for j in range(n)]
+    solution = sp.solve(system_equations(n, coeffs, offset_expr), unknowns)
+    if len(solution) != len(unknowns):
+        raise ValueError(f"The {process} process has no unique solution for these coefficients.")
+    expressions = [solution[unknown] for unknown in unknowns]
+
+    # expressions = A x - b, scaled to integers by the common denominator d
+    A, b = sp.linear_eq_to_matrix(expressions, variables)
+    d = reduce(sp.ilcm, [x.q for x in A] + [x.q for x in b], 1)
+    operator = {'P': [[int(x * d) for x in A.row(k)] for k in range(n * n)],
+                'q': [int(-x * d) for x in b], 'd': int(d)}
+    return {'unknowns': [str(unknown) for unknown in unknowns], 'solution': [str(expr) for expr in expressions],
+            'operator': operator}
+
+# Step 2: Cached solutions
+def _entry_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], f"{key}.json")
+
+def solve_system(process, n, coeff_matrix=None, offset=DEFAULT_OFFSET, cache_dir=DEFAULT_SOLVED_DIR):
+    """
+    The solved forward or inverse system, from memory, the disk cache or sp.solve.
+
+    Parameters:
+    - process: 'forward' (a_star in terms of a) or 'inverse' (a in terms of a_star).
+    - n: The size of the matrices.
+    - coeff_matrix: n x n coefficients of the prefix sums (None for all ones).
+    - offset: Formula of the constant term in the row i and column j (0-based).
+    - cache_dir: Directory of the cache ('' or None solves without the disk cache).
+
+    Returns:
+    - Dict with 'unknowns' and 'solution' (names and expressions as text, row-major) and
+      'operator', the solution as the affine map (P, q, d) for apply_operator.
+    """
+    coeffs, offset_expr = _canonical(n, coeff_matrix, offset)
+    payload = json.dumps([SOLVER_VERSION, process, n, [[str(x) for x in row] for row in coeffs], sp.srepr(offset_expr)])
+    key = hashlib.sha256(payload.encode()).hexdigest()
+    if key in _SOLVED:
+        return _SOLVED[key]
+
+    path = _entry_path(cache_dir, key) if cache_dir else None
+    entry = None
+    if path and os.path.isfile(path):
+        with open(path, 'r') as file:
+            entry = json.load(file)
+    if entry is None:
+        entry = _solve(process, n, coeffs, offset_expr)
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, path)
+
+    operator = entry['operator']
+    _SOLVED[key] = dict(entry, operator=(np.array(operator['P'], dtype=object), np.array(operator['q'], dtype=object), operator['d']))
+    return _SOLVED[key]
+
+def solution_expressions(solved, n):
+    """
+    The solution as {unknown: SymPy expression}, like the dictionary returned by sp.solve.
+    """
+    names = {'a': sp.MatrixSymbol('a', n, n), 'a_star': sp.MatrixSymbol('a_star', n, n)}
+    return {sp.parse_expr(unknown, local_dict=names): sp.parse_expr(expr, local_dict=names)
+            for unknown, expr in zip(solved['unknowns'], solved['solution'])}
+
+def evaluate_system(process, matrices, n, coeff_matrix=None, offset=DEFAULT_OFFSET, cache_dir=DEFAULT_SOLVED_DIR):
+    """
+    Applies the solved system to a batch of n x n matrices (lists of lists or SymPy matrices).
+
+    Returns:
+    - List of n x n lists with exact entries, see coeff.apply_process.
+    """
+    return apply_operator(solve_system(process, n, coeff_matrix, offset, cache_dir)['operator'], matrices, n)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from bnb_zeros import search_max_zero_relabelings, permutation_rank
+from fused_zeros import max_zero_relabelings
+
+def tables():
+    rng = np.random.default_rng(28)
+    yield [[0]]
+    for n in (2, 3, 4, 5, 6):
+        yield rng.integers(0, n, (n, n)).tolist()
+    yield [[(i + j) % 6 for j in range(6)] for i in range(6)]
+    yield [[max(i, j) for j in range(5)] for i in range(5)]
+    yield [[0] * 4 for _ in range(4)]
+
+@pytest.mark.parametrize('M', list(tables()))
+def test_matches_brute_force(M):
+    max_zeros, row_indices, _ = max_zero_relabelings(M)
+    best, perms, nodes, complete = search_max_zero_relabelings(M, block_size=7)
+    assert complete
+    assert best == max_zeros
+    assert sorted(permutation_rank(p) + 1 for p in perms) == row_indices
+
+@pytest.mark.parametrize('M', list(tables()))
+def test_first_is_optimal(M):
+    max_zeros, row_indices, _ = max_zero_relabelings(M)
+    best, perms, nodes, complete = search_max_zero_relabelings(M, keep_ties=False)
+    assert complete and best == max_zeros
+    assert len(perms) == 1 and permutation_rank(perms[0]) + 1 in row_indices
+
+def test_node_budget():
+    M = np.random.default_rng(1).integers(0, 7, (7, 7)).tolist()
+    best, perms, nodes, complete = search_max_zero_relabelings(M, max_nodes=10)
+    assert not complete
@@ -0,0 +1,47 @@
+from fractions import Fraction
+
+import numpy as np
+import pytest
+import sympy as sp
+
+import coeff
+
+def solve_reference(process, values, n, coeffs):
+    # The original per-matrix computation of coeff.py: build the system, sp.solve, substitute
+    a = sp.MatrixSymbol('a', n, n)
+    a_star = sp.MatrixSymbol('a_star', n, n)
+    equations = [sp.Eq(a_star[i, j], (i + 1) + (j + 1) - sum(coeffs[i_prime][j_prime] * a[i_prime, j_prime]
+                                                           for i_prime in range(i + 1) for j_prime in range(j + 1)))
+                 for i in range(n) for j in range(n)]
+    unknowns, known = (a_star, a) if process == 'forward' else (a, a_star)
+    solution = sp.solve(equations, [unknowns[i, j] for i in range(n) for j in range(n)])
+    subs = {known[i, j]: values[i][j] for i in range(n) for j in range(n)}
+    return [[sp.nsimplify(solution[unknowns[i, j]].subs(subs)) for j in range(n)] for i in range(n)]
+
+def matrices(n, count, seed):
+    return np.random.default_rng(seed).integers(-4, 5, (count, n, n)).tolist()
+
+def test_forward_matches_sp_solve():
+    tables = matrices(4, 5, 47)
+    assert coeff.apply_process('forward', tables, 4, coeff.coeff_matrix) == \
+        [solve_reference('forward', table, 4, coeff.coeff_matrix) for table in tables]
+
+@pytest.mark.parametrize('coeffs', [[[1, 2, 1], [3, 1, 1], [1, 1, 2]], [[2, -1, 1], [1, 3, 1], [1, 1, 5]]])
+def test_inverse_matches_sp_solve(coeffs):
+    tables = matrices(3, 4, 48)
+    results = coeff.apply_process('inverse', tables, 3, coeffs)
+    assert results == [solve_reference('inverse', table, 3, coeffs) for table in tables]
+    # Forward after inverse gives the input back
+    assert coeff.apply_process('forward', results, 3, coeffs) == tables
+
+def test_rational_input():
+    coeffs = [[2, 1], [1, 3]]
+    table = [[Fraction(1, 2), sp.Rational(-2, 3)], [1, sp.Rational(5, 7)]]
+    assert coeff.apply_process('forward', [table], 2, coeffs) == [solve_reference('forward', table, 2, coeffs)]
+
+def test_inverse_needs_nonzero_coefficients():
+    with pytest.raises(ValueError):
+        coeff.process_operator('inverse', 4, coeff.coeff_matrix)
+
+def test_empty_batch():
+    assert coeff.apply_process('forward', [], 4, coeff.coeff_matrix) == []
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from coeff_extensive import generate_binary_matrices, prefix_residuals, search_coefficients, forward_a_star, is_valid_matrix
+
+def brute_force(a_values, n):
+    # Every coefficient matrix in generate_binary_matrices order, kept when a_star is in {-1, 0, 1}
+    coeff_matrices = np.array(generate_binary_matrices(n))
+    residuals = prefix_residuals(a_values, coeff_matrices)
+    valid = (np.abs(residuals) <= 1).all(axis=(1, 2))
+    return [(int(index), coeff_matrices[index], residuals[index]) for index in np.flatnonzero(valid)]
+
+def inputs(n, count=6):
+    rng = np.random.default_rng(48 + n)
+    yield np.add.outer(np.arange(n), np.arange(n)).tolist()
+    for _ in range(count):
+        yield rng.integers(0, 3, (n, n)).tolist()
+
+@pytest.mark.parametrize('n', [2, 3])
+def test_matches_brute_force(n):
+    for a_values in inputs(n):
+        expected = brute_force(a_values, n)
+        for block_size in (1, 3, 65536):
+            found = search_coefficients(a_values, n, find_all=True, block_size=block_size)
+            assert [index for index, _, _ in found] == [index for index, _, _ in expected]
+            assert all(np.array_equal(c, d) and np.array_equal(r, s) for (_, c, r), (_, d, s) in zip(found, expected))
+            first = search_coefficients(a_values, n, block_size=block_size)
+            assert [index for index, _, _ in first] == [index for index, _, _ in found[:1]]
+
+def test_some_inputs_have_hits():
+    assert any(brute_force(a_values, 3) for a_values in inputs(3))
+
+def test_residuals_match_sp_solve():
+    # prefix_residuals against the sp.solve forward process it replaces
+    a_values = [[1, 2], [0, 1]]
+    for coeff_matrix in generate_binary_matrices(2):
+        expected = forward_a_star(a_values, 2, coeff_matrix).tolist()
+        assert prefix_residuals(a_values, [coeff_matrix])[0].tolist() == expected
+        assert is_valid_matrix(sum(expected, [])) == bool((np.abs(expected) <= 1).all())
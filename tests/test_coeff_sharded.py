@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from coeff_sharded import open_state, run_search, _shard_path
+from test_coeff_extensive import brute_force, inputs
+
+# Three of these inputs have valid coefficient matrices, four have none
+MATRICES = list(inputs(3))
+
+def expected(stop_when_found=False):
+    hits = [[index for index, _, _ in brute_force(matrix, 3)] for matrix in MATRICES]
+    return [found[:1] for found in hits] if stop_when_found else hits
+
+def test_empty_input(tmp_path):
+    state_dir = str(tmp_path / 'state')
+    for stop_when_found in (False, True):
+        records = open_state(state_dir, 2, 4, [], restart=True)
+        assert run_search([], 2, 4, state_dir, records, stop_when_found=stop_when_found) == []
+
+@pytest.mark.parametrize('shards', [1, 8, 64])
+@pytest.mark.parametrize('stop_when_found', [False, True])
+def test_matches_brute_force(tmp_path, shards, stop_when_found):
+    assert any(expected())
+    state_dir = str(tmp_path / 'state')
+    records = open_state(state_dir, 3, shards, MATRICES)
+    assert run_search(MATRICES, 3, shards, state_dir, records, stop_when_found=stop_when_found) == expected(stop_when_found)
+
+def test_parallel_matches_brute_force(tmp_path):
+    state_dir = str(tmp_path / 'state')
+    records = open_state(state_dir, 3, 16, MATRICES)
+    assert run_search(MATRICES, 3, 16, state_dir, records, jobs=2) == expected()
+
+def test_resume(tmp_path):
+    # An interrupted search leaves some shard files; the rerun only searches the missing ones
+    state_dir = str(tmp_path / 'state')
+    run_search(MATRICES, 3, 16, state_dir, open_state(state_dir, 3, 16, MATRICES))
+    for shard in (0, 5, 6, 15):
+        os.remove(_shard_path(state_dir, shard))
+    records = open_state(state_dir, 3, 16, MATRICES)
+    assert sorted(records) == [shard for shard in range(16) if shard not in (0, 5, 6, 15)]
+    assert run_search(MATRICES, 3, 16, state_dir, records) == expected()
+
+def test_resume_after_stop_when_found(tmp_path):
+    # Shards searched for the first hit only are searched again for all of them
+    state_dir = str(tmp_path / 'state')
+    first = run_search(MATRICES, 3, 16, state_dir, open_state(state_dir, 3, 16, MATRICES), stop_when_found=True)
+    assert first == expected(stop_when_found=True)
+    assert run_search(MATRICES, 3, 16, state_dir, open_state(state_dir, 3, 16, MATRICES)) == expected()
+
+def test_other_search_is_not_resumed(tmp_path):
+    state_dir = str(tmp_path / 'state')
+    run_search(MATRICES, 3, 16, state_dir, open_state(state_dir, 3, 16, MATRICES))
+    assert open_state(state_dir, 3, 16, MATRICES[:-1]) is None
+    records = open_state(state_dir, 3, 16, MATRICES[:-1], restart=True)
+    assert records == {}
+    assert run_search(MATRICES[:-1], 3, 16, state_dir, records) == expected()[:-1]
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from fused_zeros import max_zero_relabelings
+
+TABLES = [
+    [[0, 1, 2], [1, 2, 0], [2, 0, 1]],
+    [[3, 3, 2, 2], [1, 1, 0, 0], [3, 3, 2, 2], [1, 1, 0, 0]],
+    np.random.default_rng(27).integers(0, 5, (5, 5)).tolist(),
+]
+
+def script(name, *args, cwd):
+    run = subprocess.run([sys.executable, os.path.join(ROOT, name), *args], cwd=cwd, capture_output=True, text=True)
+    assert run.returncode == 0, run.stdout + run.stderr
+
+@pytest.mark.parametrize('order', [1, 2])
+def test_matches_check_zeros(tmp_path, order):
+    # The three-step pipeline of run_all_bash.sh against the fused script, file by file
+    (tmp_path / 'tables.txt').write_text("".join(f"{table}\n" for table in TABLES))
+    script('permutations.py', 'tables.txt', 'perm', cwd=tmp_path)
+    script('fused_zeros.py', 'tables.txt', 'fused', '-o', str(order), '-b', '7', cwd=tmp_path)
+    for idx in range(1, len(TABLES) + 1):
+        script('every_operation_fdiff.py', f'perm_matrix_{idx}.txt', f'transformed_{idx}.txt', '-o', str(order), cwd=tmp_path)
+        script('check_zeros.py', f'transformed_{idx}.txt', f'check_{idx}_zeros.txt', cwd=tmp_path)
+        assert (tmp_path / f'fused_matrix_{idx}_zeros.txt').read_text() == (tmp_path / f'check_{idx}_zeros.txt').read_text()
+
+def test_batch_size_does_not_matter():
+    expected = max_zero_relabelings(TABLES[2], batch_size=8192)
+    for batch_size in (1, 7, 120):
+        max_zeros, row_indices, matrices = max_zero_relabelings(TABLES[2], batch_size=batch_size)
+        assert (max_zeros, row_indices) == expected[:2]
+        assert all(np.array_equal(a, b) for a, b in zip(matrices, expected[2]))
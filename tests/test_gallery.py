@@ -0,0 +1,24 @@
+import importlib
+import os
+
+from gallery import PLOT_DIR, graph_png
+
+TABLE = [[(i * j + 1) % 8 for j in range(8)] for i in range(8)]
+
+def test_on_demand_image_is_the_graph_plot(tmp_path, monkeypatch):
+    # The fallback draws what 8x8_plotting_loop.py writes as graph_<row>_8x8_circular.png,
+    # under the render cache key of that script
+    cache_dir = str(tmp_path / 'cache')
+    data = graph_png(TABLE, 3, cache_dir=cache_dir)
+    assert data.startswith(b'\x89PNG')
+
+    script = importlib.import_module('8x8_plotting_loop')
+    from render_pool import params_digest, render_params
+    digest = params_digest(render_params(TABLE, 'circle', script.STYLE))
+    with open(os.path.join(cache_dir, digest[:2], f"{digest}.png"), 'rb') as file:
+        assert file.read() == data
+
+    monkeypatch.chdir(tmp_path)
+    script.plot_graph_from_multiplication_table(script.build_graph(TABLE), 3, 'graph_3_8x8_circular.png')
+    assert (tmp_path / 'graph_3_8x8_circular.png').read_bytes() == data
+    assert graph_png(TABLE, 3, cache_dir=cache_dir) == data
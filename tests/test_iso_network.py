@@ -0,0 +1,35 @@
+import os
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, '8mult8'))
+from iso_network import isomorphic_pairs, isomorphism_graph, isomorphism_classes, class_grid, draw_contracted
+
+def results(pairs, yes):
+    return pd.DataFrame({'Graph1': [i for i, _ in pairs], 'Graph2': [j for _, j in pairs],
+                         'Isomorphic': ['Yes' if i in yes else 'No' for i in range(len(pairs))]})
+
+def test_classes_are_connected_components():
+    rng = np.random.default_rng(0)
+    pairs = [tuple(sorted(rng.choice(40, 2, replace=False).tolist())) for _ in range(60)]
+    df = results(pairs, set(rng.choice(60, 25, replace=False).tolist()))
+    nodes, labels = isomorphism_classes(*isomorphic_pairs(df))
+    classes = {frozenset(nodes[labels == k].tolist()) for k in range(labels.max() + 1)}
+    assert classes == {frozenset(c) for c in nx.connected_components(isomorphism_graph(df))}
+
+def test_contracted_plot_without_pairs(tmp_path):
+    nodes, labels = isomorphism_classes(*isomorphic_pairs(results([(1, 2), (1, 3)], set())))
+    sizes = np.bincount(labels)
+    plt.figure()
+    draw_contracted(plt.gca(), [], sizes, class_grid(sizes))
+    plt.savefig(tmp_path / 'classes.png')
+    plt.close()
+    assert len(nodes) == 0 and os.path.isfile(tmp_path / 'classes.png')
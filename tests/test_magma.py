@@ -0,0 +1,76 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+
+TABLES = [
+    [[2, 2, 3, 3], [1, 1, 0, 0], [1, 1, 0, 0], [2, 2, 3, 3]],
+    [[3, 3, 2, 2], [1, 1, 0, 0], [3, 3, 2, 2], [1, 1, 0, 0]],
+    [[1, 3, 1, 3], [2, 0, 2, 0], [2, 0, 2, 0], [1, 3, 1, 3]],
+]
+
+def magma(*args, cwd):
+    return subprocess.run([sys.executable, os.path.join(ROOT, 'magma.py'), *args],
+                          cwd=cwd, capture_output=True, text=True)
+
+def write_tables(path, tables=TABLES):
+    path.write_text("".join(f"{table}\n" for table in tables))
+    return str(path)
+
+def test_solve_forward(tmp_path):
+    import coeff
+    tables = write_tables(tmp_path / 'tables.txt')
+    run = magma('solve', tables, 'solved.txt', cwd=tmp_path)
+    assert run.returncode == 0, run.stderr
+    assert json.loads(run.stdout.splitlines()[-1])['tables'] == len(TABLES)
+    lines = (tmp_path / 'solved.txt').read_text().split()
+    expected = coeff.apply_process('forward', TABLES, 4, coeff.coeff_matrix)
+    assert [ast.literal_eval(line) for line in lines] == expected
+
+# One smoke test per subcommand: arguments after the input file and the files it must write
+SUBCOMMANDS = [
+    ('parse', ['tables.npy'], 'tables.npy'),
+    ('permute', ['perms.txt', '-r', '2'], 'perms.txt'),
+    ('transform', ['transformed.txt', '-o', '1'], 'transformed.txt'),
+    ('transform', ['transformed.npy', '-j', '2'], 'transformed.npy'),
+    ('zeros', ['zeros.txt'], 'zeros.txt'),
+    ('zeros', ['zeros.txt', '--relabel', '-r', '2'], 'zeros.txt'),
+    ('iso', ['iso.csv'], 'iso.csv'),
+    ('plot', ['plots'], 'plots'),
+    ('plot', ['plots', '--mosaic'], 'plots'),
+    ('plot', ['plots', '--raw'], 'plots'),
+    ('solve', ['solved.txt'], 'solved.txt'),
+]
+
+@pytest.mark.parametrize('command, args, output', SUBCOMMANDS)
+def test_subcommand(tmp_path, command, args, output):
+    tables = write_tables(tmp_path / 'tables.txt')
+    run = magma(command, tables, *args, cwd=tmp_path)
+    assert run.returncode == 0, run.stderr
+    assert json.loads(run.stdout.splitlines()[-1])
+    assert os.path.exists(tmp_path / output)
+
+def test_batch(tmp_path):
+    tables = write_tables(tmp_path / 'tables.txt')
+    jobs = [{'id': 1, 'command': 'iso', 'input': tables}, {'id': 2, 'command': 'nope'}, [1, 2]]
+    run = subprocess.run([sys.executable, os.path.join(ROOT, 'magma.py'), 'batch'], cwd=tmp_path, text=True,
+                         input="".join(json.dumps(job) + "\n" for job in jobs), capture_output=True)
+    replies = [json.loads(line) for line in run.stdout.splitlines()]
+    assert [(reply['id'], reply['ok']) for reply in replies] == [(1, True), (2, False), (None, False)]
+    assert replies[0]['result']['classes'] == [[1, 2, 3]]
+    assert run.returncode == 1
+
+def test_errors_without_traceback(tmp_path):
+    # A ValueError of the command and an unexpected failure (1-D stack) both end in one error line
+    tables = write_tables(tmp_path / 'tables.txt')
+    np.save(tmp_path / 'flat.npy', np.arange(4))
+    for args in (['solve', tables, 'inverse.txt', '-p', 'inverse'], ['solve', 'flat.npy', 'out.txt']):
+        run = magma(*args, cwd=tmp_path)
+        assert run.returncode == 1
+        assert run.stdout.startswith("Error: ") and 'Traceback' not in run.stdout + run.stderr
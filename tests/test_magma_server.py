@@ -0,0 +1,43 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import HTTPServer
+
+import pytest
+
+from magma_server import QueryHandler, build_store
+
+TABLES = [
+    [[2, 2, 3, 3], [1, 1, 0, 0], [1, 1, 0, 0], [2, 2, 3, 3]],
+    [[3, 3, 2, 2], [1, 1, 0, 0], [3, 3, 2, 2], [1, 1, 0, 0]],
+]
+
+@pytest.fixture
+def server(tmp_path):
+    corpus = tmp_path / 'corpus.txt'
+    corpus.write_text("".join(f"{table}\n" for table in TABLES))
+    server = HTTPServer(('127.0.0.1', 0), QueryHandler)
+    server.store = build_store(str(corpus), cache_dir='', max_order=5)
+    server.verbose = False
+    server.render_cache = ''
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+def test_max_zeros_order_limit(server):
+    status, reply = post(f"{server}/max_zeros", {'table': TABLES[0]})
+    assert status == 200 and reply['max_zeros'] == 16
+    cyclic = [[(i + j) % 6 for j in range(6)] for i in range(6)]
+    status, reply = post(f"{server}/max_zeros", {'table': cyclic})
+    assert status == 400 and 'above the server limit of 5' in reply['error']
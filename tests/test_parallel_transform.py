@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from every_operation_fdiff import finite_difference_transform, finite_difference_transform_stack
+from parallel_transform import parallel_transform_stack
+
+@pytest.mark.parametrize('order', [1, 2, 3])
+def test_matches_serial(order):
+    matrices = np.random.default_rng(36).integers(-3, 8, (101, 5, 5))
+    expected = finite_difference_transform_stack(matrices, order=order)
+    result = parallel_transform_stack(matrices, order=order, jobs=2, chunk_size=16)
+    assert result.dtype == expected.dtype
+    assert np.array_equal(result, expected)
+    assert all(np.array_equal(r, finite_difference_transform(m, order=order)) for r, m in zip(result, matrices))
+
+def test_memory_mapped_input(tmp_path):
+    path = str(tmp_path / 'stack.npy')
+    np.save(path, np.random.default_rng(1).integers(0, 8, (40, 8, 8), dtype=np.int8))
+    matrices = np.load(path, mmap_mode='r')
+    assert np.array_equal(parallel_transform_stack(matrices, order=1, jobs=2, chunk_size=7),
+                          finite_difference_transform_stack(np.asarray(matrices), order=1))
+
+def test_empty_stack():
+    result = parallel_transform_stack(np.zeros((0, 4, 4), dtype=np.int64), order=2, jobs=2)
+    assert result.shape == (0, 4, 4)
@@ -0,0 +1,56 @@
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+import every_operation_fdiff
+import pipeline
+from result_cache import _record, cache_stats, data_digest
+
+TABLE = [[2, 2, 3, 3], [1, 1, 0, 0], [1, 1, 0, 0], [2, 2, 3, 3]]
+
+def _hammer(cache_dir):
+    for _ in range(50):
+        _record(cache_dir, 'hits')
+
+def test_stats_under_concurrent_writers(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    with Pool(8) as pool:
+        writers = pool.map_async(_hammer, [cache_dir] * 8)
+        while not writers.ready():
+            cache_stats(cache_dir)
+        writers.get()
+    assert cache_stats(cache_dir)['hits'] == 8 * 50
+
+def test_digest_ignores_integer_width():
+    stack = np.array([TABLE] * 3)
+    assert data_digest(stack.astype(np.int8)) == data_digest(stack.astype(np.int64))
+    assert data_digest(stack) != data_digest(stack + 1)
+
+def test_pipeline_and_fdiff_share_transforms(tmp_path, monkeypatch):
+    # The pipeline transforms the narrowed permute stack in memory, every_operation_fdiff.py
+    # reads the same relabelings back from text as int64: the second run must be a hit
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'tables.txt').write_text(f"{TABLE}\n")
+    cache_dir = str(tmp_path / 'cache')
+    config = {'items': [1], 'stages': [
+        {'stage': 'permute', 'input': 'tables.txt', 'output': 'perms.txt', 'params': {'row': 1}},
+        {'stage': 'transform', 'input': 'perms.txt', 'output': 'transformed.txt', 'params': {'order': 1}},
+    ]}
+    pipeline.run_pipeline(config, cache_dir=cache_dir)
+    misses = cache_stats(cache_dir)['misses']
+    every_operation_fdiff.main('perms.txt', 'fdiff.txt', 'finite_difference', 1, cache_dir=cache_dir)
+    stats = cache_stats(cache_dir)
+    assert (stats['misses'], stats['hits']) == (misses, 1)
+    assert (tmp_path / 'fdiff.txt').read_text() == (tmp_path / 'transformed.txt').read_text()
+
+def test_output_written_when_stats_fail(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'matrices.txt').write_text(f"{TABLE}\n")
+    cache_dir = tmp_path / 'cache'
+    cache_dir.mkdir()
+    (cache_dir / 'stats.json').write_text('{"hits": 1')
+    # A broken stats file only warns, the transformed matrices are still written
+    every_operation_fdiff.main('matrices.txt', 'out.txt', 'finite_difference', 1, cache_dir=str(cache_dir))
+    assert os.path.isfile(tmp_path / 'out.txt')
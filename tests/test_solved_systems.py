@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pytest
+
+import solved_systems
+from solved_systems import solve_system, evaluate_system, solution_expressions, DEFAULT_OFFSET
+from test_coeff import solve_reference
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    monkeypatch.setattr(solved_systems, '_SOLVED', {})
+
+def cache_entries(cache_dir):
+    return [name for _, _, names in os.walk(cache_dir) for name in names if name.endswith('.json')]
+
+@pytest.mark.parametrize('process, coeffs', [('forward', None), ('forward', [[1, 0, 1], [0, 1, 0], [1, 1, 1]]),
+                                             ('inverse', None), ('inverse', [[2, 1, 1], [1, 3, 1], [1, -1, 2]])])
+def test_cached_solutions_match_sp_solve(tmp_path, monkeypatch, process, coeffs):
+    tables = np.random.default_rng(50).integers(-3, 4, (4, 3, 3)).tolist()
+    expected = [solve_reference(process, table, 3, coeffs or [[1] * 3] * 3) for table in tables]
+    # The offset of coeff.py, so the systems are the same
+    offset = '(i + 1) + (j + 1)'
+    cache_dir = str(tmp_path / 'solved')
+    assert evaluate_system(process, tables, 3, coeffs, offset, cache_dir) == expected
+    assert len(cache_entries(cache_dir)) == 1
+    # A new process reads the entry from disk instead of solving
+    monkeypatch.setattr(solved_systems, '_SOLVED', {})
+    monkeypatch.setattr(solved_systems, '_solve', None)
+    assert evaluate_system(process, tables, 3, coeffs, offset, cache_dir) == expected
+
+def test_equivalent_offsets_share_an_entry(tmp_path):
+    cache_dir = str(tmp_path / 'solved')
+    first = solve_system('forward', 2, offset=DEFAULT_OFFSET, cache_dir=cache_dir)
+    assert solve_system('forward', 2, offset='(i + 1) + (j + 1) - 1', cache_dir=cache_dir) is first
+    assert len(cache_entries(cache_dir)) == 1
+    solve_system('forward', 2, offset='i + j', cache_dir=cache_dir)
+    assert len(cache_entries(cache_dir)) == 2
+
+def test_solution_expressions_round_trip(tmp_path):
+    import sympy as sp
+    n = 2
+    solved = solve_system('inverse', n, cache_dir=str(tmp_path / 'solved'))
+    a = sp.MatrixSymbol('a', n, n)
+    a_star = sp.MatrixSymbol('a_star', n, n)
+    expressions = solution_expressions(solved, n)
+    assert set(expressions) == {a[i, j] for i in range(n) for j in range(n)}
+    values = {a_star[i, j]: 3 * i - j for i in range(n) for j in range(n)}
+    assert [[expressions[a[i, j]].subs(values) for j in range(n)] for i in range(n)] == \
+        evaluate_system('inverse', [[[3 * i - j for j in range(n)] for i in range(n)]], n, cache_dir='')[0]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from zero_bitmask import (pack_zero_patterns, zero_counts, build_zero_index, superset_query,
+                          hamming_query, max_zero_rows, popcount)
+
+def stack(n, count=300, seed=29):
+    # Few distinct values, so zero patterns overlap and the queries have hits
+    return np.random.default_rng(seed + n).integers(-1, 2, (count, n, n))
+
+@pytest.mark.parametrize('n', [3, 8, 9, 16])
+def test_counts_match_dense(n):
+    matrices = stack(n)
+    assert zero_counts(pack_zero_patterns(matrices)).tolist() == np.count_nonzero(matrices == 0, axis=(1, 2)).tolist()
+
+@pytest.mark.parametrize('n', [3, 8, 9])
+def test_queries_match_dense(n):
+    matrices = stack(n)
+    zeros = (matrices == 0).reshape(len(matrices), -1)
+    index = build_zero_index(pack_zero_patterns(matrices))
+    counts = zeros.sum(axis=1)
+    max_zeros, rows = max_zero_rows(index)
+    assert max_zeros == counts.max() and rows.tolist() == np.flatnonzero(counts == counts.max()).tolist()
+    for row in (0, 5, 17):
+        # A sparser query, so the superset query is not trivially empty
+        query = zeros[row] & (np.arange(n * n) % 3 == 0)
+        packed = pack_zero_patterns(np.where(query, 0, 1).reshape(1, n, n))
+        assert superset_query(index, packed).tolist() == np.flatnonzero((zeros | ~query).all(axis=1)).tolist()
+        for radius in (0, 2, n):
+            distances = (zeros != zeros[row]).sum(axis=1)
+            assert hamming_query(index, pack_zero_patterns(matrices[row]), radius).tolist() == np.flatnonzero(distances <= radius).tolist()
+
+@pytest.mark.parametrize('builtin', [True, False])
+def test_popcount(monkeypatch, builtin):
+    if not builtin:
+        monkeypatch.delattr(np, 'bitwise_count', raising=False)
+    words = np.random.default_rng(0).integers(0, 2 ** 63, 1000, dtype=np.uint64)
+    assert popcount(words).astype(int).tolist() == [bin(int(w)).count('1') for w in words]
@@ -0,0 +1,14 @@
+import numpy as np
+
+from zeros_report import build_report
+
+def test_top_k(tmp_path):
+    rng = np.random.default_rng(0)
+    stack = rng.integers(-1, 2, (50, 3, 3))
+    np.save(tmp_path / 'stack.npy', stack)
+    zeros = np.count_nonzero(stack == 0, axis=(1, 2))
+    report = build_report([str(tmp_path / 'stack.npy')], k=5, chunk_size=7)
+    # Most zeros first, earlier rows first among equal counts
+    expected = sorted(range(len(stack)), key=lambda row: (-zeros[row], row))[:5]
+    assert [entry['row_index'] - 1 for entry in report['top_k']] == expected
+    assert build_report([str(tmp_path / 'stack.npy')], k=0)['top_k'] == []
@@ -0,0 +1,145 @@
+import argparse
+import ast
+import numpy as np
+from every_operation_fdiff import read_matrices
+
+# Zero patterns of transformed tables packed into uint64 words: bit r*n + c (little-endian
+# within each word) is set when cell (r, c) is zero, so an 8x8 table is one word and a
+# 16x16 table four.
+
+# Byte popcount table for NumPy versions without np.bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount(words):
+    """
+    Number of set bits of every uint64 word, same shape as words.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    as_bytes = np.ascontiguousarray(words).view(np.uint8).reshape(words.shape + (8,))
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+def pack_zero_patterns(matrices):
+    """
+    Packs the zero cells of a stack of matrices into bitmasks.
+
+    Parameters:
+    - matrices: Array of shape (N, n, n) (or a single (n, n) matrix).
+
+    Returns:
+    - Array of shape (N, words) with dtype uint64, words = ceil(n*n / 64).
+    """
+    matrices = np.asarray(matrices)
+    if matrices.ndim == 2:
+        matrices = matrices[None]
+    bits = (matrices == 0).reshape(len(matrices), -1)
+    words = -(-bits.shape[1] // 64)
+    padded = np.zeros((len(bits), words * 64), dtype=bool)
+    padded[:, :bits.shape[1]] = bits
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+def zero_counts(patterns):
+    """
+    Zero count of every table, as the popcount of its packed zero pattern.
+    """
+    return popcount(patterns).sum(axis=1, dtype=np.int64)
+
+def build_zero_index(patterns):
+    """
+    Sorts packed patterns by zero count so queries only scan the counts that can match.
+
+    Returns:
+    - A dict with the sorted 'patterns', their 'counts', the original row 'order' and the
+      'starts' offsets where each zero count begins.
+    """
+    counts = zero_counts(patterns)
+    order = np.argsort(counts, kind='stable')
+    sorted_counts = counts[order]
+    max_bits = patterns.shape[1] * 64
+    starts = np.searchsorted(sorted_counts, np.arange(max_bits + 2))
+    return {'patterns': patterns[order], 'counts': sorted_counts, 'order': order, 'starts': starts}
+
+def _count_range(index, low, high):
+    starts = index['starts']
+    low = max(low, 0)
+    high = min(high, len(starts) - 2)
+    if low > high:
+        return slice(0, 0)
+    return slice(starts[low], starts[high + 1])
+
+def superset_query(index, query):
+    """
+    Rows whose zero set contains every zero of query.
+
+    Parameters:
+    - index: Output of build_zero_index.
+    - query: Packed pattern of shape (words,) or (1, words).
+
+    Returns:
+    - Sorted 0-based row indices into the original stack.
+    """
+    query = np.asarray(query).reshape(-1)
+    # A superset has at least as many zeros as the query
+    rows = _count_range(index, int(zero_counts(query[None])[0]), len(index['starts']))
+    candidates = index['patterns'][rows]
+    hits = np.flatnonzero(((candidates & query) == query).all(axis=1))
+    return np.sort(index['order'][rows][hits])
+
+def hamming_query(index, query, radius):
+    """
+    Rows whose zero pattern differs from query in at most radius cells.
+
+    Returns:
+    - Sorted 0-based row indices into the original stack.
+    """
+    query = np.asarray(query).reshape(-1)
+    count = int(zero_counts(query[None])[0])
+    # |popcount(a) - popcount(b)| <= hamming(a, b)
+    rows = _count_range(index, count - radius, count + radius)
+    distances = popcount(index['patterns'][rows] ^ query).sum(axis=1, dtype=np.int64)
+    hits = np.flatnonzero(distances <= radius)
+    return np.sort(index['order'][rows][hits])
+
+def max_zero_rows(index):
+    """
+    Maximum zero count and the sorted 0-based rows that reach it (the selection of check_zeros.py).
+    """
+    max_zeros = int(index['counts'][-1])
+    return max_zeros, np.sort(index['order'][_count_range(index, max_zeros, max_zeros)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack zero patterns of transformed matrices into bitmasks and query them.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = subparsers.add_parser('pack', help="Pack the zero patterns of a transformed matrix file into a .npy file.")
+    pack_parser.add_argument('input_file', type=str, help="Transformed matrices, one per line, or a .npy stack.")
+    pack_parser.add_argument('output_file', type=str, help="Output .npy file of packed uint64 patterns.")
+
+    query_parser = subparsers.add_parser('query', help="Query a packed pattern file.")
+    query_parser.add_argument('patterns_file', type=str, help=".npy file written by 'pack'.")
+    query_parser.add_argument('--max', action='store_true', help="Report the rows with the most zeros.")
+    query_parser.add_argument('--superset', type=str, help="Matrix (list of lists) whose zero cells must all be zero.")
+    query_parser.add_argument('--hamming', type=str, help="Matrix (list of lists) to compare zero patterns with.")
+    query_parser.add_argument('-r', '--radius', type=int, default=0, help="Hamming radius for --hamming.")
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        patterns = pack_zero_patterns(np.stack(list(read_matrices(args.input_file))))
+        np.save(args.output_file, patterns)
+        print(f"Packed {len(patterns)} zero patterns ({patterns.shape[1]} words each) into '{args.output_file}'.")
+        return
+
+    index = build_zero_index(np.load(args.patterns_file))
+    # Row indices are reported 1-based, like check_zeros.py
+    if args.max:
+        max_zeros, rows = max_zero_rows(index)
+        print(f"{len(rows)} matrices with {max_zeros} zeros at row indices: {(rows + 1).tolist()}")
+    if args.superset:
+        rows = superset_query(index, pack_zero_patterns(ast.literal_eval(args.superset)))
+        print(f"{len(rows)} matrices contain the zero pattern at row indices: {(rows + 1).tolist()}")
+    if args.hamming:
+        rows = hamming_query(index, pack_zero_patterns(ast.literal_eval(args.hamming)), args.radius)
+        print(f"{len(rows)} matrices within Hamming radius {args.radius} at row indices: {(rows + 1).tolist()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import csv
+import heapq
+import json
+import math
+import os
+from collections import Counter
+from itertools import islice
+import numpy as np
+from tqdm import tqdm
+
+# Stream matrices from a transformed file in chunks of at most chunk_size rows
+def iter_matrix_chunks(file_path, chunk_size=4096):
+    if file_path.endswith('.npy'):
+        stack = np.load(file_path, mmap_mode='r')
+        for start in range(0, len(stack), chunk_size):
+            yield np.asarray(stack[start:start + chunk_size])
+        return
+    with open(file_path, 'r') as file:
+        while True:
+            lines = [line for line in islice(file, chunk_size) if line.strip()]
+            if not lines:
+                return
+            # Lines look like "[[a, b], [c, d]]"; parse the flat entries without ast
+            rows = [np.fromiter(map(int, line.replace('[', '').replace(']', '').split(',')), dtype=np.int64) for line in lines]
+            n = math.isqrt(len(rows[0]))
+            yield np.stack(rows).reshape(-1, n, n)
+
+def new_summary(file_path):
+    return {'file': file_path, 'matrices': 0, 'min_zeros': None, 'max_zeros': None, 'zero_sum': 0,
+            'max_zero_matrices': 0, 'first_max_row': None, 'min_value': None, 'max_value': None}
+
+# Fold one chunk into the per-file summary, the global histograms and the top-k heap
+def update_report(summary, chunk, first_row, file_index, zero_histogram, value_histogram, top_k, k):
+    zero_counts = np.count_nonzero(chunk == 0, axis=(1, 2))
+    zero_histogram.update(dict(zip(*(values.tolist() for values in np.unique(zero_counts, return_counts=True)))))
+    value_histogram.update(dict(zip(*(values.tolist() for values in np.unique(chunk, return_counts=True)))))
+
+    chunk_max = int(zero_counts.max())
+    chunk_max_rows = np.flatnonzero(zero_counts == chunk_max)
+    if summary['max_zeros'] is None or chunk_max > summary['max_zeros']:
+        summary['max_zeros'] = chunk_max
+        summary['max_zero_matrices'] = 0
+        summary['first_max_row'] = int(chunk_max_rows[0]) + first_row
+    if chunk_max == summary['max_zeros']:
+        summary['max_zero_matrices'] += len(chunk_max_rows)
+    chunk_min = int(zero_counts.min())
+    summary['min_zeros'] = chunk_min if summary['min_zeros'] is None else min(summary['min_zeros'], chunk_min)
+    summary['zero_sum'] += int(zero_counts.sum())
+    summary['matrices'] += len(chunk)
+    summary['min_value'] = int(chunk.min()) if summary['min_value'] is None else min(summary['min_value'], int(chunk.min()))
+    summary['max_value'] = int(chunk.max()) if summary['max_value'] is None else max(summary['max_value'], int(chunk.max()))
+
+    # Heap entries order by zeros, then earlier file, then earlier row
+    if k < 1:
+        return
+    threshold = top_k[0][0] if len(top_k) == k else -1
+    for row in np.flatnonzero(zero_counts >= threshold):
+        row_index = int(row) + first_row
+        entry = (int(zero_counts[row]), -file_index, -row_index, chunk[row].tolist())
+        if len(top_k) < k:
+            heapq.heappush(top_k, entry)
+        elif entry[:3] > top_k[0][:3]:
+            heapq.heapreplace(top_k, entry)
+
+def build_report(input_files, k=10, chunk_size=4096):
+    """
+    One pass over all input files with memory bounded by chunk_size and k.
+
+    Returns:
+    - A dict with per-file summaries, exact zero-count and entry-value histograms and the
+      top-k matrices by zero count (row indices are 1-based, like check_zeros.py).
+    """
+    zero_histogram = Counter()
+    value_histogram = Counter()
+    top_k = []
+    summaries = []
+    for file_index, file_path in enumerate(input_files):
+        summary = new_summary(file_path)
+        first_row = 1
+        for chunk in tqdm(iter_matrix_chunks(file_path, chunk_size), desc=f"Scanning {os.path.basename(file_path)}", leave=False):
+            update_report(summary, chunk, first_row, file_index, zero_histogram, value_histogram, top_k, k)
+            first_row += len(chunk)
+        zero_sum = summary.pop('zero_sum')
+        summary['mean_zeros'] = round(zero_sum / summary['matrices'], 4) if summary['matrices'] else None
+        summaries.append(summary)
+
+    top = [{'file': input_files[-neg_file], 'row_index': -neg_row, 'zeros': zeros, 'matrix': matrix}
+           for zeros, neg_file, neg_row, matrix in sorted(top_k, reverse=True)]
+    return {
+        'files': summaries,
+        'zero_count_histogram': {str(key): zero_histogram[key] for key in sorted(zero_histogram)},
+        'value_histogram': {str(key): value_histogram[key] for key in sorted(value_histogram)},
+        'top_k': top,
+    }
+
+def write_summary_csv(summaries, output_file):
+    fieldnames = ['file', 'matrices', 'min_zeros', 'max_zeros', 'mean_zeros', 'max_zero_matrices', 'first_max_row', 'min_value', 'max_value']
+    with open(output_file, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for summary in summaries:
+            writer.writerow(summary)
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate zero counts and entry values over transformed matrix files in one streaming pass.")
+    parser.add_argument("input_files", nargs='+', help="Transformed matrix files (one matrix per line, or .npy stacks).")
+    parser.add_argument("-j", "--json", type=str, default='zeros_report.json', help="Path of the JSON report.")
+    parser.add_argument("-c", "--csv", type=str, default=None, help="Optional path of a per-file summary CSV.")
+    parser.add_argument("-k", "--top-k", type=int, default=10, help="Number of matrices with the most zeros to keep.")
+    parser.add_argument("--chunk-size", type=int, default=4096, help="Number of matrices read at once.")
+    args = parser.parse_args()
+
+    if args.top_k < 1 or args.chunk_size < 1:
+        print("Error: --top-k and --chunk-size must be positive integers.")
+        exit(1)
+    for file_path in args.input_files:
+        if not os.path.isfile(file_path):
+            print(f"Error: Input file '{file_path}' does not exist.")
+            exit(1)
+
+    report = build_report(args.input_files, k=args.top_k, chunk_size=args.chunk_size)
+    with open(args.json, 'w') as file:
+        json.dump(report, file, separators=(',', ':'))
+    print(f"Report saved to {args.json}")
+    if args.csv:
+        write_summary_csv(report['files'], args.csv)
+        print(f"Per-file summary saved to {args.csv}")
+
+if __name__ == "__main__":
+    main()